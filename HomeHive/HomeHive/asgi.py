@@ -12,5 +12,7 @@ import os
 from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'HomeHive.settings')
+# Serve the async versions of the read views (see Housing.async_views).
+os.environ.setdefault('HOMEHIVE_ASYNC_VIEWS', '1')
 
 application = get_asgi_application()
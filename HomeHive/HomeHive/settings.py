@@ -10,8 +10,11 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/4.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -42,16 +45,28 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'Housing.middleware.ReplicaReadMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'Housing.middleware.QueryStatsMiddleware',
 ]
 
+# Per-route query and latency statistics (see Housing.middleware.QueryStatsMiddleware).
+# Set HOMEHIVE_QUERY_STATS=1 to enable; HOMEHIVE_QUERY_STATS_DIR makes them readable by
+# `manage.py query_stats` across worker processes.
+HOUSING_QUERY_STATS = os.environ.get('HOMEHIVE_QUERY_STATS') == '1'
+HOUSING_QUERY_STATS_DIR = os.environ.get('HOMEHIVE_QUERY_STATS_DIR')
+
 ROOT_URLCONF = 'HomeHive.urls'
 
+# Serve the read-heavy views by their async versions (see Housing.async_views). HomeHive/asgi.py
+# sets HOMEHIVE_ASYNC_VIEWS=1 unless told otherwise; under WSGI the sync views are served.
+HOUSING_ASYNC_VIEWS = os.environ.get('HOMEHIVE_ASYNC_VIEWS') == '1'
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -63,6 +78,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'Housing.context_processors.navbar_buildings',
             ],
         },
     },
@@ -74,12 +90,122 @@ WSGI_APPLICATION = 'HomeHive.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/4.2/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# HOMEHIVE_DB_PROFILE selects the database: "sqlite" (the default) or "postgres" (needs psycopg installed).
+# Connections are kept open between requests for HOMEHIVE_DB_CONN_MAX_AGE seconds (0 closes them
+# after every request) and checked before reuse.
+
+DB_PROFILE = os.environ.get('HOMEHIVE_DB_PROFILE', 'sqlite')
+DB_CONN_MAX_AGE = int(os.environ.get('HOMEHIVE_DB_CONN_MAX_AGE', '600'))
+
+if DB_PROFILE == 'sqlite':
+    DATABASES = {
+        'default': {
+            # Django's SQLite backend plus the PRAGMAs and transaction mode below.
+            'ENGINE': 'Housing.backends.sqlite3',
+            'NAME': os.environ.get('HOMEHIVE_SQLITE_PATH', BASE_DIR / 'db.sqlite3'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {'timeout': 20},
+        }
+    }
+elif DB_PROFILE == 'postgres':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('HOMEHIVE_DB_NAME', 'homehive'),
+            'USER': os.environ.get('HOMEHIVE_DB_USER', 'homehive'),
+            'PASSWORD': os.environ.get('HOMEHIVE_DB_PASSWORD', ''),
+            'HOST': os.environ.get('HOMEHIVE_DB_HOST', 'localhost'),
+            'PORT': os.environ.get('HOMEHIVE_DB_PORT', '5432'),
+            'CONN_MAX_AGE': DB_CONN_MAX_AGE,
+            'CONN_HEALTH_CHECKS': True,
+            # Behind PgBouncer in transaction pooling mode, server-side cursors (used by the NDJSON
+            # export) can't span transactions.
+            'DISABLE_SERVER_SIDE_CURSORS': os.environ.get('HOMEHIVE_DB_PGBOUNCER') == '1',
+            'OPTIONS': {'connect_timeout': 5},
+        }
     }
+else:
+    raise ImproperlyConfigured(f'Unknown HOMEHIVE_DB_PROFILE {DB_PROFILE!r}; use "sqlite" or "postgres".')
+
+# Read replicas: HOMEHIVE_DB_REPLICAS is a comma separated list of SQLite files (sqlite profile)
+# or database hosts (postgres profile) holding copies of the primary. GET and HEAD requests read
+# from them, see Housing.routers. A SQLite replica is refreshed with the refresh_sqlite_replica
+# command. Clients read from the primary for HOUSING_REPLICA_PIN_SECONDS after a request of theirs wrote.
+
+HOUSING_READ_REPLICAS = []
+for index, target in enumerate(filter(None, os.environ.get('HOMEHIVE_DB_REPLICAS', '').split(',')), start=1):
+    replica = dict(DATABASES['default'], TEST={'MIRROR': 'default'})
+    replica['NAME' if DB_PROFILE == 'sqlite' else 'HOST'] = target.strip()
+    DATABASES[f'replica{index}'] = replica
+    HOUSING_READ_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['Housing.routers.ReplicaRouter']
+HOUSING_REPLICA_PIN_SECONDS = 5
+
+# PRAGMAs run on every new SQLite connection: fewer fsyncs, a busy timeout instead of immediate
+# "database is locked" errors, a memory-mapped read path and a 64 MiB page cache.
+HOUSING_SQLITE_PRAGMAS = {
+    'synchronous': 'NORMAL',
+    'busy_timeout': 20000,
+    'mmap_size': 268435456,
+    'cache_size': -65536,
+    'temp_store': 'MEMORY',
 }
+# Write-ahead logging lets readers run alongside the writer. The journal mode is stored in the
+# database file, so it is switched on only for databases given by HOMEHIVE_SQLITE_PATH and not for
+# the dev database tracked in the repository, unless HOMEHIVE_SQLITE_JOURNAL_MODE says otherwise.
+SQLITE_JOURNAL_MODE = os.environ.get('HOMEHIVE_SQLITE_JOURNAL_MODE',
+                                     'WAL' if os.environ.get('HOMEHIVE_SQLITE_PATH') else '')
+if SQLITE_JOURNAL_MODE:
+    HOUSING_SQLITE_PRAGMAS['journal_mode'] = SQLITE_JOURNAL_MODE
+# Transactions opened with Housing.transactions.write_atomic take the SQLite write lock at BEGIN,
+# where the busy timeout applies; other transactions begin deferred.
+HOUSING_SQLITE_TRANSACTION_MODE = 'IMMEDIATE'
+
+# Buildings with more tenants than this are deleted by a background thread, one chunk of
+# tenants per transaction, instead of within the delete request.
+HOUSING_BACKGROUND_DELETE_TENANTS = int(os.environ.get('HOMEHIVE_BACKGROUND_DELETE_TENANTS', 5000))
+
+# Local gazetteer (CSV of name, latitude, longitude) used to geocode building locations offline.
+HOUSING_GAZETTEER_PATH = os.environ.get('HOMEHIVE_GAZETTEER_PATH', BASE_DIR / 'Housing' / 'data' / 'gazetteer.csv')
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+
+# HOMEHIVE_CACHE_PROFILE selects the cache: "locmem" (the default) keeps one per process and is
+# meant for tests and the development server; "redis" (needs redis installed) and "memcached"
+# (needs pymemcache installed) share one between all worker processes, at HOMEHIVE_CACHE_LOCATION.
+# The navbar, the building details and conditional GETs are only cached with a shared cache, since
+# their invalidation has to reach every worker (see Housing.cache).
+
+CACHE_PROFILE = os.environ.get('HOMEHIVE_CACHE_PROFILE', 'locmem')
+
+if CACHE_PROFILE == 'locmem':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'homehive',
+            'OPTIONS': {'MAX_ENTRIES': 10000},
+        }
+    }
+elif CACHE_PROFILE == 'redis':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ.get('HOMEHIVE_CACHE_LOCATION', 'redis://localhost:6379/0'),
+        }
+    }
+elif CACHE_PROFILE == 'memcached':
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.memcached.PyMemcacheCache',
+            'LOCATION': os.environ.get('HOMEHIVE_CACHE_LOCATION', '127.0.0.1:11211'),
+        }
+    }
+else:
+    raise ImproperlyConfigured(f'Unknown HOMEHIVE_CACHE_PROFILE {CACHE_PROFILE!r}; use "locmem", "redis" or "memcached".')
 
 
 # Password validation
@@ -0,0 +1,159 @@
+"""
+The amenity catalog, bulk maintenance of building amenities and amenity search.
+
+Amenity names come from the fixed set in AmenityChoices.CHOICES. The catalog is seeded by a
+migration and its name -> id map is held per process, so resolving the amenities of a form
+submit costs no queries. Amenity save and delete signals drop the map.
+
+Building.amenity_mask mirrors the amenity M2M as one bit per choice, so amenity filters are
+bitwise tests on the building row instead of joins, and the facet counts of a search are
+conditional counts over a single scan.
+"""
+
+import threading
+
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed
+
+from Housing.choices import AmenityChoices
+from Housing.models import Amenity, Building
+from Housing.transactions import write_atomic
+
+# The bit of each amenity in Building.amenity_mask, by its position in AmenityChoices.CHOICES.
+AMENITY_BITS = {name: 1 << index for index, (name, _) in enumerate(AmenityChoices.CHOICES)}
+
+_lock = threading.Lock()
+_catalog = None
+
+
+def clear_amenity_cache():
+    """
+    Forget the process-level name -> id map; it is reloaded on next use.
+    """
+    global _catalog
+    with _lock:
+        _catalog = None
+
+
+def get_amenity_ids(names):
+    """
+    Map amenity names to IDs, creating catalog entries for names that don't exist yet.
+
+    :param names: An iterable of amenity names.
+    :return: A dictionary of name to amenity ID.
+    """
+    global _catalog
+    names = set(names)
+    with _lock:
+        if _catalog is None:
+            _catalog = dict(Amenity.objects.values_list('name', 'id'))
+        missing = names - _catalog.keys()
+        if missing:
+            Amenity.objects.bulk_create([Amenity(name=name) for name in missing], ignore_conflicts=True)
+            _catalog = dict(Amenity.objects.values_list('name', 'id'))
+        catalog = _catalog
+    return {name: catalog[name] for name in names}
+
+
+def set_building_amenities(building, names):
+    """
+    Make the amenities of a building exactly the given names, writing only the difference.
+
+    Costs one query to read the current links, at most one bulk INSERT and one DELETE on the
+    through table. m2m_changed is sent like the related manager would, so receivers of the
+    amenity M2M see these changes too.
+
+    :param building: The Building instance; it must be saved.
+    :param names: An iterable of amenity names.
+    """
+    through = Building.amenities.through
+    wanted = set(get_amenity_ids(names).values())
+    current = set(through.objects.filter(building_id=building.pk).values_list('amenity_id', flat=True))
+    added = wanted - current
+    removed = current - wanted
+
+    with write_atomic():
+        if removed:
+            _send(building, 'pre_remove', removed)
+            through.objects.filter(building_id=building.pk, amenity_id__in=removed).delete()
+            _send(building, 'post_remove', removed)
+        if added:
+            _send(building, 'pre_add', added)
+            through.objects.bulk_create([through(building_id=building.pk, amenity_id=pk) for pk in added])
+            _send(building, 'post_add', added)
+
+    # Anything prefetched on the instance is stale now.
+    getattr(building, '_prefetched_objects_cache', {}).pop('amenities', None)
+
+
+def _send(building, action, pk_set):
+    m2m_changed.send(
+        sender=Building.amenities.through, instance=building, action=action, reverse=False,
+        model=Amenity, pk_set=set(pk_set), using=building._state.db or 'default',
+    )
+
+
+def amenity_mask(names):
+    """
+    Return the amenity_mask bits of amenity names.
+
+    :raises ValueError: If a name is not one of AmenityChoices.CHOICES.
+    """
+    unknown = sorted(set(names) - AMENITY_BITS.keys())
+    if unknown:
+        raise ValueError(f'Unknown amenities: {", ".join(unknown)}')
+    mask = 0
+    for name in names:
+        mask |= AMENITY_BITS[name]
+    return mask
+
+
+def refresh_amenity_masks(building_ids=None):
+    """
+    Recompute Building.amenity_mask from the amenity links with one UPDATE.
+
+    :param building_ids: Optional iterable of building IDs; all buildings when None.
+    """
+    bits = Case(*(When(amenity__name=name, then=Value(bit)) for name, bit in AMENITY_BITS.items()), default=Value(0))
+    # Every amenity is linked at most once per building, so the sum of the bits is their union.
+    masks = (Building.amenities.through.objects.filter(building_id=OuterRef('pk')).order_by()
+             .values('building_id').annotate(mask=Sum(bits)).values('mask'))
+    buildings = Building.objects.all()
+    if building_ids is not None:
+        buildings = buildings.filter(pk__in=list(building_ids))
+    buildings.update(amenity_mask=Coalesce(Subquery(masks), 0))
+
+
+def filter_by_amenities(queryset, required=(), any_of=(), excluded=()):
+    """
+    Filter a Building queryset by amenities with bitwise tests on amenity_mask.
+
+    :param required: Amenity names a building must all have.
+    :param any_of: Amenity names a building must have at least one of.
+    :param excluded: Amenity names a building must have none of.
+    :raises ValueError: If a name is not one of AmenityChoices.CHOICES.
+    """
+    if required:
+        mask = amenity_mask(required)
+        queryset = queryset.alias(required_amenities=F('amenity_mask').bitand(mask)).filter(required_amenities=mask)
+    if any_of:
+        queryset = queryset.alias(any_amenities=F('amenity_mask').bitand(amenity_mask(any_of))).filter(any_amenities__gt=0)
+    if excluded:
+        queryset = queryset.alias(excluded_amenities=F('amenity_mask').bitand(amenity_mask(excluded))).filter(excluded_amenities=0)
+    return queryset
+
+
+def amenity_facets(queryset):
+    """
+    Count the buildings of a queryset and, per amenity, those that have it, in one aggregate query.
+
+    :return: A tuple (total, facets); facets maps every amenity name to its count.
+    """
+    aliases = {f'has_{name}': F('amenity_mask').bitand(bit) for name, bit in AMENITY_BITS.items()}
+    counts = queryset.order_by().alias(**aliases).aggregate(
+        total=Count('pk'),
+        **{name: Count('pk', filter=Q(**{f'has_{name}__gt': 0})) for name in AMENITY_BITS},
+    )
+    total = counts.pop('total')
+    return total, counts
@@ -0,0 +1,131 @@
+"""
+Portfolio occupancy analytics backed by the BuildingOccupancySummary table.
+
+The summary table holds one row per building with its tenant aggregates. The Tenant signals
+move single rows by the change of the saved or deleted tenant, and rebuild_occupancy_summary
+recomputes any number of rows with one INSERT ... SELECT ... GROUP BY, for Building saves, bulk
+tenant changes and the reconcile command. The dashboard queries aggregate the summary table
+only, so their cost depends on the number of buildings, not on the number of tenants.
+"""
+
+from django.db import connections, router
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Sum
+from django.db.models.functions import Coalesce, NullIf
+
+from Housing.models import Building, BuildingOccupancySummary
+from Housing.transactions import write_atomic
+
+# Number of rows in each table of the dashboard.
+ANALYTICS_ROWS = 20
+
+
+def rebuild_occupancy_summary(building_ids=None):
+    """
+    Recompute summary rows from the Building and Tenant tables in the database.
+
+    :param building_ids: Optional iterable of building IDs to rebuild; the whole table when None.
+    """
+    using = router.db_for_write(BuildingOccupancySummary)
+    buildings = Building.objects.using(using).order_by()
+    summaries = BuildingOccupancySummary.objects.using(using)
+    if building_ids is not None:
+        building_ids = list(building_ids)
+        buildings = buildings.filter(pk__in=building_ids)
+        summaries = summaries.filter(building_id__in=building_ids)
+
+    rows = buildings.values('pk', 'owner', 'location', 'total_number_of_houses').annotate(
+        occupied=Count('tenants'),
+        people=Coalesce(Sum('tenants__number_of_people'), 0),
+        rooms=Coalesce(Sum('tenants__number_of_rooms'), 0),
+    )
+    select, params = rows.query.get_compiler(using).as_sql()
+    quote = connections[using].ops.quote_name
+    columns = ', '.join(quote(BuildingOccupancySummary._meta.get_field(name).column) for name in (
+        'building', 'owner', 'location', 'total_houses', 'occupied_houses', 'total_people', 'total_rooms'))
+    with write_atomic(using=using):
+        summaries.delete()
+        with connections[using].cursor() as cursor:
+            cursor.execute(f'INSERT INTO {quote(BuildingOccupancySummary._meta.db_table)} ({columns}) {select}', params)
+
+
+def adjust_tenant_totals(building_id, occupied_delta=0, people_delta=0, rooms_delta=0):
+    """
+    Move the tenant aggregates of one summary row by the given deltas with a single UPDATE.
+
+    The row is rebuilt from the tenants of the building if it doesn't exist yet.
+    """
+    updated = BuildingOccupancySummary.objects.filter(building_id=building_id).update(
+        occupied_houses=F('occupied_houses') + occupied_delta,
+        total_people=F('total_people') + people_delta,
+        total_rooms=F('total_rooms') + rooms_delta,
+    )
+    if not updated:
+        rebuild_occupancy_summary([building_id])
+
+
+def _rate(part, whole):
+    return ExpressionWrapper(part * 100.0 / NullIf(whole, 0), output_field=FloatField())
+
+
+def _people_per_room(people, rooms):
+    return ExpressionWrapper(people * 1.0 / NullIf(rooms, 0), output_field=FloatField())
+
+
+def portfolio_totals():
+    """
+    Return the houses, occupied houses, people, rooms, occupancy rate and people per room of the whole portfolio.
+    """
+    totals = BuildingOccupancySummary.objects.aggregate(
+        buildings=Count('pk'),
+        houses=Coalesce(Sum('total_houses'), 0),
+        occupied=Coalesce(Sum('occupied_houses'), 0),
+        people=Coalesce(Sum('total_people'), 0),
+        rooms=Coalesce(Sum('total_rooms'), 0),
+    )
+    totals['vacant'] = max(totals['houses'] - totals['occupied'], 0)
+    totals['occupancy_rate'] = totals['occupied'] * 100.0 / totals['houses'] if totals['houses'] else None
+    totals['people_per_room'] = totals['people'] / totals['rooms'] if totals['rooms'] else None
+    return totals
+
+
+def _grouped(field):
+    return BuildingOccupancySummary.objects.order_by().values(field).annotate(
+        buildings=Count('pk'),
+        houses=Sum('total_houses'),
+        occupied=Sum('occupied_houses'),
+        vacant=Sum(F('total_houses') - F('occupied_houses')),
+        people=Sum('total_people'),
+        rooms=Sum('total_rooms'),
+        occupancy_rate=_rate(Sum('occupied_houses'), Sum('total_houses')),
+        people_per_room=_people_per_room(Sum('total_people'), Sum('total_rooms')),
+    )
+
+
+def occupancy_by_owner(limit=ANALYTICS_ROWS):
+    """
+    Return the owners with the most houses and their occupancy figures.
+    """
+    return list(_grouped('owner').order_by('-houses', 'owner')[:limit])
+
+
+def vacancies_by_location(limit=ANALYTICS_ROWS):
+    """
+    Return the locations with the most vacant houses and their occupancy figures.
+    """
+    return list(_grouped('location').order_by('-vacant', 'location')[:limit])
+
+
+def least_occupied_buildings(limit=ANALYTICS_ROWS):
+    """
+    Return the buildings with the lowest occupancy rate and their occupancy figures.
+    """
+    return list(
+        BuildingOccupancySummary.objects.annotate(
+            building_name=F('building__building_name'),
+            occupancy_rate=_rate(F('occupied_houses'), F('total_houses')),
+            people_per_room=_people_per_room(F('total_people'), F('total_rooms')),
+        ).order_by('occupancy_rate', 'pk').values(
+            'building_id', 'building_name', 'owner', 'location', 'total_houses', 'occupied_houses',
+            'total_people', 'total_rooms', 'occupancy_rate', 'people_per_room',
+        )[:limit]
+    )
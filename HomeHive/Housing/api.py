@@ -0,0 +1,160 @@
+"""
+Read-only, versioned JSON API for the Housing models.
+
+Every resource supports field selection (?fields=a,b), exact filters on a fixed set of
+parameters, keyset pagination by id (?cursor=...) and a streaming NDJSON export (?format=ndjson)
+that runs in constant memory however many rows are exported.
+"""
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
+
+from Housing.models import Building, Caretaker, Tenant, TotalTenants
+from Housing.pagination import InvalidCursor, keyset_page
+
+API_PAGE_SIZE = 100
+MAX_API_PAGE_SIZE = 1000
+EXPORT_CHUNK_SIZE = 2000
+
+
+class ReadOnlyResourceView(View):
+    """
+    Base view class for a read-only API resource.
+
+    Subclasses set the model, the fields that may be selected, the default selection, and a
+    mapping of query parameters to (ORM lookup, converter) pairs.
+    """
+    model = None
+    fields = ()
+    default_fields = ()
+    filters = {}
+
+    def get(self, request, pk=None):
+        """
+        Return one object, a page of objects, or a streaming NDJSON export.
+
+        :param request: The HTTP request object.
+        :param pk: The ID of a single object to return, if any.
+        :return: JsonResponse or StreamingHttpResponse.
+        """
+        try:
+            fields = self.get_fields(request)
+            queryset = self.get_queryset(request)
+        except ValueError as exc:
+            return JsonResponse({'error': str(exc)}, status=400)
+
+        if pk is not None:
+            row = queryset.filter(pk=pk).values(*fields).first()
+            if row is None:
+                return JsonResponse({'error': f'{self.model.__name__} not found'}, status=404)
+            return JsonResponse(row, encoder=DjangoJSONEncoder)
+
+        if request.GET.get('format') == 'ndjson':
+            response = StreamingHttpResponse(self.stream(queryset, fields), content_type='application/x-ndjson')
+            response['Content-Disposition'] = f'attachment; filename="{self.model._meta.model_name}.ndjson"'
+            return response
+
+        try:
+            page_size = min(int(request.GET.get('page_size', API_PAGE_SIZE)), MAX_API_PAGE_SIZE)
+            # Paginate on id even if it wasn't selected, so the cursor can always be built.
+            rows, next_cursor = keyset_page(
+                queryset.values(*dict.fromkeys(['id', *fields])), ('id',),
+                cursor=request.GET.get('cursor'), page_size=max(page_size, 1),
+            )
+        except (ValueError, InvalidCursor):
+            return JsonResponse({'error': 'Invalid cursor or page_size'}, status=400)
+        if 'id' not in fields:
+            for row in rows:
+                del row['id']
+        return JsonResponse({'results': rows, 'next_cursor': next_cursor}, encoder=DjangoJSONEncoder)
+
+    def get_fields(self, request):
+        """
+        Return the fields selected with the fields parameter, or the default selection.
+        """
+        requested = [field.strip() for field in request.GET.get('fields', '').split(',') if field.strip()]
+        if not requested:
+            return list(self.default_fields or self.fields)
+        unknown = sorted(set(requested) - set(self.fields))
+        if unknown:
+            raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+        return list(dict.fromkeys(requested))
+
+    def get_queryset(self, request):
+        """
+        Return the queryset filtered by the supported filter parameters present in the request.
+        """
+        queryset = self.model.objects.order_by('id')
+        for param, (lookup, convert) in self.filters.items():
+            if param in request.GET:
+                try:
+                    value = convert(request.GET[param])
+                except (TypeError, ValueError):
+                    raise ValueError(f'Invalid value for {param}')
+                queryset = queryset.filter(**{lookup: value})
+        return queryset
+
+    def stream(self, queryset, fields):
+        """
+        Yield the queryset as NDJSON, one chunk of lines at a time.
+        """
+        encoder = DjangoJSONEncoder()
+        lines = []
+        for row in queryset.values(*fields).iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            lines.append(encoder.encode(row))
+            if len(lines) >= EXPORT_CHUNK_SIZE:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+
+class BuildingResourceView(ReadOnlyResourceView):
+    """
+    API view class for buildings.
+    """
+    model = Building
+    fields = ('id', 'building_name', 'owner', 'location', 'total_number_of_houses', 'available_houses')
+    filters = {
+        'owner': ('owner', str),
+        'location': ('location', str),
+        'building_name': ('building_name', str),
+        'min_available': ('available_houses__gte', int),
+    }
+
+
+class TenantResourceView(ReadOnlyResourceView):
+    """
+    API view class for tenants.
+    """
+    model = Tenant
+    fields = ('id', 'name', 'house_number', 'phone_number', 'building_id', 'number_of_rooms', 'number_of_people')
+    filters = {
+        'building': ('building_id', int),
+        'house_number': ('house_number', str),
+        'number_of_rooms': ('number_of_rooms', int),
+        'number_of_people': ('number_of_people', int),
+    }
+
+
+class CaretakerResourceView(ReadOnlyResourceView):
+    """
+    API view class for caretakers.
+    """
+    model = Caretaker
+    fields = ('id', 'name', 'phone_number', 'building_id')
+    filters = {
+        'building': ('building_id', int),
+    }
+
+
+class TotalTenantsResourceView(ReadOnlyResourceView):
+    """
+    API view class for the per-building tenant totals.
+    """
+    model = TotalTenants
+    fields = ('id', 'building_id', 'total_count')
+    filters = {
+        'building': ('building_id', int),
+    }
@@ -7,4 +7,5 @@ class HousingConfig(AppConfig):
     name = 'Housing'
 
     def ready(self):
+        import Housing.checks
         import Housing.signals
\ No newline at end of file
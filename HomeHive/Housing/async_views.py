@@ -0,0 +1,176 @@
+"""
+Async versions of the read-heavy Housing views, served on the same routes under ASGI.
+
+Housing.urls serves them instead of their sync counterparts when HOUSING_ASYNC_VIEWS is set,
+which HomeHive/asgi.py does. They use the async ORM methods and load everything the templates
+touch before rendering, so rendering never reaches the database from the event loop. The navbar
+list is loaded here as well instead of through the lazy context processor.
+
+Database work stays on the request's thread-sensitive executor thread, which owns its
+connections, so the queries of one request run one after another; the gain is that the event
+loop serves many requests while they wait, instead of one thread per request.
+"""
+
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import Http404, JsonResponse
+from django.shortcuts import redirect, render
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.utils.http import http_date
+from django.views import View
+
+from Housing.context_processors import get_navbar_buildings
+from Housing.models import Building, Tenant
+from Housing.pagination import InvalidCursor, keyset_queryset, keyset_result
+from Housing.views import (BUILDINGS_ORDERING, BUILDINGS_PAGE_SIZE, building_card, building_details_etag,
+                           building_details_last_modified, get_lookup_house_numbers, get_request_building_details,
+                           tenant_detail_etag, tenant_detail_last_modified)
+
+aget_navbar_buildings = sync_to_async(get_navbar_buildings)
+aget_request_building_details = sync_to_async(get_request_building_details)
+
+
+def revalidated_page(etag_func, last_modified_func):
+    """
+    Async counterpart of the cache_control(private=True, no_cache=True) and condition decorators
+    of the sync page views, for the get method of an async view class.
+
+    Django's condition decorator calls the ETag and Last-Modified functions on the event loop,
+    where they can't query the database, and method_decorator doesn't keep a method async; here
+    the functions run on the request's executor thread.
+    """
+    def decorator(method):
+        @wraps(method)
+        async def inner(view, request, *args, **kwargs):
+            def validators():
+                return etag_func(request, *args, **kwargs), last_modified_func(request, *args, **kwargs)
+
+            etag, last_modified = await sync_to_async(validators)()
+            etag = quote_etag(etag) if etag is not None else None
+            last_modified = int(last_modified.timestamp()) if last_modified else None
+            response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+            if response is None:
+                response = await method(view, request, *args, **kwargs)
+            if request.method in ('GET', 'HEAD'):
+                if last_modified and not response.has_header('Last-Modified'):
+                    response.headers['Last-Modified'] = http_date(last_modified)
+                if etag:
+                    response.headers.setdefault('ETag', etag)
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return inner
+    return decorator
+
+
+async def aget_buildings_page(request):
+    """
+    Async counterpart of views.get_buildings_page.
+
+    :raises InvalidCursor: If the cursor parameter is malformed.
+    """
+    queryset = keyset_queryset(Building.objects.prefetch_related('amenities'), BUILDINGS_ORDERING,
+                               cursor=request.GET.get('cursor'))
+    rows = [building async for building in queryset[:BUILDINGS_PAGE_SIZE + 1]]
+    return keyset_result(rows, BUILDINGS_ORDERING, BUILDINGS_PAGE_SIZE)
+
+
+async def aget_or_404(queryset, **kwargs):
+    try:
+        return await queryset.aget(**kwargs)
+    except queryset.model.DoesNotExist:
+        raise Http404(f'No {queryset.model._meta.object_name} matches the given query.')
+
+
+class AsyncBuildingClassView(View):
+    """
+    Async view class for displaying a page of buildings.
+    """
+    template_name = 'main.html'
+
+    async def get(self, request, *args, **kwargs):
+        """
+        Load the page of buildings and the navbar list and render the main template.
+
+        :param request: The HTTP request object.
+        :return: Rendered HTML template with the list of buildings.
+        """
+        try:
+            buildings, next_cursor = await aget_buildings_page(request)
+        except InvalidCursor:
+            return redirect('building-view')
+        return render(request, self.template_name,
+                      {'buildings': buildings, 'next_cursor': next_cursor, 'navbar_buildings': await aget_navbar_buildings()})
+
+
+class AsyncBuildingDetailView(View):
+    """
+    Async view class for displaying details of a building.
+    """
+    template_name = 'building_details.html'
+
+    @revalidated_page(etag_func=building_details_etag, last_modified_func=building_details_last_modified)
+    async def get(self, request, building_id):
+        """
+        Load the cached building details and the navbar list and render the building details template.
+
+        :param request: The HTTP request object.
+        :param building_id: The ID of the building to retrieve details for.
+        :return: Rendered HTML template with the building details.
+        """
+        # Already loaded for the ETag when the cache is shared.
+        details = await aget_request_building_details(request, building_id)
+        if details is None:
+            raise Http404('No Building matches the given query.')
+        return render(request, self.template_name, {'building': details['building'], 'fragments': details['fragments'],
+                                                    'navbar_buildings': await aget_navbar_buildings()})
+
+
+class AsyncTenantDetailView(View):
+    """
+    Async view class for displaying details of a tenant.
+    """
+    template_name = 'tenant_detail.html'
+
+    @revalidated_page(etag_func=tenant_detail_etag, last_modified_func=tenant_detail_last_modified)
+    async def get(self, request, tenant_id):
+        """
+        Load the tenant and the navbar list and render the tenant details template.
+
+        :param request: The HTTP request object.
+        :param tenant_id: The ID of the tenant to retrieve details for.
+        :return: Rendered HTML template with the tenant details.
+        """
+        tenant = await aget_or_404(Tenant.objects.select_related('building'), pk=tenant_id)
+        return render(request, self.template_name, {'tenant': tenant, 'navbar_buildings': await aget_navbar_buildings()})
+
+
+async def list_buildings(request):
+    """
+    Async counterpart of views.list_buildings.
+
+    :param request: The HTTP request object with an optional cursor parameter.
+    :return: JsonResponse with the buildings of the page and the cursor of the next page.
+    """
+    try:
+        buildings, next_cursor = await aget_buildings_page(request)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({'results': [building_card(building) for building in buildings], 'next_cursor': next_cursor})
+
+
+async def lookup_building_tenants(request, building_id):
+    """
+    Async counterpart of views.lookup_building_tenants.
+
+    :param request: The HTTP request object.
+    :param building_id: The ID of the building the house numbers belong to.
+    :return: JsonResponse mapping each found house number to its tenant ID and listing the missing ones.
+    """
+    house_numbers, error = get_lookup_house_numbers(request)
+    if error:
+        return error
+    rows = Tenant.objects.filter(building_id=building_id, house_number__in=house_numbers).values_list('house_number', 'id')
+    found = {house_number: pk async for house_number, pk in rows}
+    missing = [number for number in house_numbers if number not in found]
+    return JsonResponse({'building_id': building_id, 'tenants': found, 'missing': missing})
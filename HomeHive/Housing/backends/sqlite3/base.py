@@ -0,0 +1,31 @@
+"""
+SQLite database backend tuned for concurrent writers.
+
+It differs from Django's backend in two ways:
+
+* Every new connection runs the HOUSING_SQLITE_PRAGMAS settings (busy timeout, page cache, ...).
+* Transactions opened with Housing.transactions.write_atomic start with
+  BEGIN <HOUSING_SQLITE_TRANSACTION_MODE>, IMMEDIATE by default. A deferred transaction takes the
+  write lock only at its first write, and when another connection committed in between SQLite
+  fails it with "database is locked" at once instead of waiting for the busy timeout. IMMEDIATE
+  takes the lock at BEGIN, where the busy timeout applies. Other transactions begin deferred, so
+  read-only ones don't take the write lock.
+"""
+
+from django.conf import settings
+from django.db.backends.sqlite3 import base
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    # Set by write_atomic for the BEGIN of the transaction it opens.
+    begin_immediate = False
+
+    def get_new_connection(self, conn_params):
+        conn = super().get_new_connection(conn_params)
+        for name, value in getattr(settings, 'HOUSING_SQLITE_PRAGMAS', {}).items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _start_transaction_under_autocommit(self):
+        mode = getattr(settings, 'HOUSING_SQLITE_TRANSACTION_MODE', 'IMMEDIATE') if self.begin_immediate else ''
+        self.cursor().execute(f'BEGIN {mode}'.strip())
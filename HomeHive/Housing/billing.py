@@ -0,0 +1,158 @@
+"""
+Monthly rent invoicing.
+
+A billing run walks the tenants in primary-key chunks. For each chunk the tenants without an
+invoice for the period are read with one query, their rent is computed from the rates of their
+buildings in Python and the invoices are written with one bulk_create. Chunks are independent,
+so they can be spread over a process pool; only the inserts take the write lock. SQLite runs
+one writer at a time, so the pool only pays off on PostgreSQL.
+
+Runs are idempotent: the unique (tenant, period) constraint rejects a second invoice, so a run
+that is repeated, resumed after a failure or racing another run never bills a tenant twice.
+"""
+
+import datetime
+import time
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+
+import django
+from django.apps import apps
+from django.db import connections
+from django.db.models import Exists, OuterRef
+
+from Housing.models import Invoice, RentRate, Tenant
+from Housing.transactions import write_atomic
+
+BILLING_CHUNK_SIZE = 5000
+
+
+def billing_period(value):
+    """
+    Parse a "YYYY-MM" period into the first day of the month.
+
+    :raises ValueError: If the value isn't a valid month.
+    """
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m').date()
+    except (TypeError, ValueError):
+        raise ValueError(f'Invalid period {value!r}, expected YYYY-MM') from None
+
+
+def load_rates(building_ids):
+    """
+    Fetch the rent rates of buildings with one query.
+
+    :return: A dictionary of building ID to (base_amount, per_room, per_person), with the
+             default rate under the key None if there is one.
+    """
+    rates = RentRate.objects.filter(building_id__in=building_ids) | RentRate.objects.filter(building__isnull=True)
+    return {building_id: (base, room, person)
+            for building_id, base, room, person in rates.values_list('building_id', 'base_amount', 'per_room', 'per_person')}
+
+
+def rent_amount(rate, number_of_rooms, number_of_people):
+    base, per_room, per_person = rate
+    return base + per_room * number_of_rooms + per_person * number_of_people
+
+
+def tenant_chunks(chunk_size=BILLING_CHUNK_SIZE):
+    """
+    Split the tenants into primary-key ranges of chunk_size tenants, one index query per range.
+
+    :return: A generator of (after, until) tuples covering pk > after and pk <= until; until
+             is None for the last range, which also covers tenants created during the run.
+    """
+    after = 0
+    while True:
+        until = (Tenant.objects.filter(pk__gt=after).order_by('pk')
+                 .values_list('pk', flat=True)[chunk_size - 1:chunk_size].first())
+        yield after, until
+        if until is None:
+            return
+        after = until
+
+
+def bill_tenants(period, after=0, until=None):
+    """
+    Issue the invoices of a range of tenants for a period.
+
+    :param period: The first day of the invoiced month.
+    :param after: Only tenants with a primary key greater than this.
+    :param until: Only tenants with a primary key up to this; no upper bound when None.
+    :return: A (number of invoices inserted, number of tenants without a rent rate) tuple.
+    """
+    tenants = Tenant.objects.filter(pk__gt=after)
+    if until is not None:
+        tenants = tenants.filter(pk__lte=until)
+    rows = list(tenants.filter(~Exists(Invoice.objects.filter(tenant=OuterRef('pk'), period=period)))
+                .values_list('pk', 'building_id', 'house_number', 'number_of_rooms', 'number_of_people'))
+    rates = load_rates({row[1] for row in rows})
+    default = rates.get(None)
+
+    invoices, unpriced = [], 0
+    for pk, building_id, house_number, rooms, people in rows:
+        rate = rates.get(building_id, default)
+        if rate is None:
+            unpriced += 1
+            continue
+        invoices.append(Invoice(tenant_id=pk, building_id=building_id, period=period, house_number=house_number,
+                                number_of_rooms=rooms, number_of_people=people, amount=rent_amount(rate, rooms, people)))
+    if not invoices:
+        return 0, unpriced
+    with write_atomic():
+        # A concurrent run may have invoiced some of these tenants since they were read, and the
+        # insert skips them silently, so the new rows of the range and period are counted; runs for
+        # other periods may insert rows of the same tenants meanwhile.
+        last_pk = Invoice.objects.order_by('-pk').values_list('pk', flat=True).first() or 0
+        Invoice.objects.bulk_create(invoices, ignore_conflicts=True)
+        inserted = Invoice.objects.filter(pk__gt=last_pk, tenant_id__gt=after, period=period)
+        if until is not None:
+            inserted = inserted.filter(tenant_id__lte=until)
+        return inserted.count(), unpriced
+
+
+def _start_worker():
+    # Spawned workers start from scratch; forked ones must not share the parent's connections.
+    if not apps.ready:
+        django.setup()
+    connections.close_all()
+
+
+def _bill_chunk(arguments):
+    return bill_tenants(*arguments)
+
+
+def run_billing(period, chunk_size=BILLING_CHUNK_SIZE, workers=1, log=None):
+    """
+    Issue the invoices of every tenant for a period.
+
+    :param period: The first day of the invoiced month.
+    :param chunk_size: The number of tenants read and invoiced at a time.
+    :param workers: The number of processes billing chunks in parallel; 1 bills in this process.
+                    More only help on PostgreSQL, SQLite serializes the inserts.
+    :param log: Optional callable receiving progress messages.
+    :return: A dictionary with the number of invoices issued and of tenants without a rent rate.
+    """
+    log = log or (lambda message: None)
+    start = time.perf_counter()
+    totals = {'invoices': 0, 'unpriced': 0}
+    chunks = ((period, after, until) for after, until in tenant_chunks(chunk_size))
+
+    def add(result):
+        totals['invoices'] += result[0]
+        totals['unpriced'] += result[1]
+        log(f'{totals["invoices"]} invoices issued ({time.perf_counter() - start:.1f}s)')
+
+    if workers <= 1:
+        for chunk in chunks:
+            add(bill_tenants(*chunk))
+        return totals
+
+    chunks = list(chunks)
+    # Connections must not be carried into forked workers.
+    connections.close_all()
+    with ProcessPoolExecutor(max_workers=workers, initializer=_start_worker) as pool:
+        for result in pool.map(_bill_chunk, chunks):
+            add(result)
+    return totals
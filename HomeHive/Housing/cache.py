@@ -0,0 +1,63 @@
+"""
+Helpers for versioned cache keys.
+
+Each namespace has a version number stored in the cache. Cached values are stored under a key
+that includes the current version, so bumping the version invalidates every value of the
+namespace at once without having to know which keys exist.
+
+A missing version (never set, or evicted by the cache) starts from the current time in
+nanoseconds rather than from 1, so it can never come back to a version whose values are
+still cached.
+
+Bumping a version only invalidates values for the processes that share the cache, so values are
+only cached under versioned keys when the cache is shared by every worker process.
+"""
+
+import time
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def cache_is_shared():
+    """
+    Return whether the default cache is shared by every worker process.
+
+    A LocMemCache lives in the memory of one process, so the other workers never see its version
+    bumps and would keep serving what they cached before a change.
+    """
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def _version_key(namespace):
+    return f'housing:{namespace}:version'
+
+
+def get_version(namespace):
+    """
+    Return the current version of a cache namespace.
+    """
+    version = cache.get(_version_key(namespace))
+    if version is None:
+        initial = time.time_ns()
+        cache.add(_version_key(namespace), initial, timeout=None)
+        version = cache.get(_version_key(namespace), initial)
+    return version
+
+
+def bump_version(namespace):
+    """
+    Invalidate every value cached under a namespace by moving it to a new version.
+    """
+    try:
+        cache.incr(_version_key(namespace))
+    except ValueError:
+        cache.set(_version_key(namespace), time.time_ns(), timeout=None)
+
+
+def versioned_key(namespace, *parts):
+    """
+    Build the cache key for a value in a namespace at its current version.
+    """
+    suffix = ':'.join(str(part) for part in parts)
+    return f'housing:{namespace}:v{get_version(namespace)}:{suffix}'
@@ -0,0 +1,37 @@
+"""
+System checks of the data in the Housing tables.
+
+They are tagged database, so they run before migrate and with check --database, and report data
+the migrations change to be able to add their constraints.
+"""
+
+from django.core.checks import Tags, Warning, register
+from django.db import connections, router
+from django.db.models import Count
+
+from Housing.models import Tenant
+
+
+@register(Tags.database)
+def check_duplicate_house_numbers(app_configs, databases=None, **kwargs):
+    """
+    Warn about tenants sharing a house number within a building, which migration 0011 renumbers
+    to "<number>-<tenant id>" or "#<tenant id>", keeping the number of the earliest tenant.
+    """
+    warnings = []
+    for alias in databases or ():
+        if not router.allow_migrate_model(alias, Tenant):
+            continue
+        if Tenant._meta.db_table not in connections[alias].introspection.table_names():
+            continue
+        duplicates = (Tenant.objects.using(alias).order_by().values('building_id', 'house_number')
+                      .annotate(tenants=Count('pk')).filter(tenants__gt=1).order_by('building_id', 'house_number'))
+        for duplicate in duplicates:
+            warnings.append(Warning(
+                f'{duplicate["tenants"]} tenants of building {duplicate["building_id"]} share house number '
+                f'{duplicate["house_number"]!r} in database {alias!r}.',
+                hint='Migration 0011 renumbers all but the earliest of them; give them their real house numbers afterwards.',
+                obj=Tenant,
+                id='Housing.W001',
+            ))
+    return warnings
@@ -0,0 +1,52 @@
+"""
+Template context processors for the Housing application.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject
+
+from Housing.cache import cache_is_shared, versioned_key
+from Housing.models import Building
+from Housing.routers import primary_reads
+
+NAVBAR_NAMESPACE = 'navbar'
+# The dropdown lists this many buildings by name and links to the paginated listing for the rest.
+NAVBAR_MAX_BUILDINGS = 20
+
+
+def get_navbar_buildings():
+    """
+    Return the buildings listed in the navbar dropdown, served from the cache when possible.
+
+    Only the first NAVBAR_MAX_BUILDINGS buildings by name are listed, so the page and the cache
+    entry don't grow with the portfolio, and only the fields the menu needs are stored, read from
+    the primary database. The cache namespace is bumped by the Building signals, so a cached list
+    is never served after a building is created, renamed or deleted. With a per-process cache the
+    other workers would miss those bumps, so the list is read from the database every time.
+    """
+    if not cache_is_shared():
+        return load_navbar_buildings()
+    key = versioned_key(NAVBAR_NAMESPACE, 'buildings')
+    buildings = cache.get(key)
+    if buildings is None:
+        buildings = load_navbar_buildings()
+        cache.set(key, buildings, getattr(settings, 'HOUSING_NAVBAR_CACHE_TIMEOUT', 3600))
+    return buildings
+
+
+def load_navbar_buildings():
+    """
+    Read the navbar buildings from the primary database.
+    """
+    with primary_reads():
+        return list(Building.objects.order_by('building_name', 'id').values('pk', 'building_name')[:NAVBAR_MAX_BUILDINGS])
+
+
+def navbar_buildings(request):
+    """
+    Add the navbar building list to every template context.
+
+    The list is loaded lazily so templates that don't render the navbar pay nothing.
+    """
+    return {'navbar_buildings': SimpleLazyObject(get_navbar_buildings)}
@@ -0,0 +1,195 @@
+"""
+Atomic maintenance of the occupancy counters stored on Building and TotalTenants.
+
+The counters are changed with single UPDATE statements using F() expressions so
+that concurrent tenant sign-ups cannot overwrite each other's changes. Every counter
+write also stamps Building.updated_at, which the incremental reconciliation relies on.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest, Now
+
+from Housing.analytics import rebuild_occupancy_summary
+from Housing.fragments import invalidate_all_building_details, invalidate_building_details
+from Housing.models import Building, Tenant, TotalTenants
+from Housing.transactions import write_atomic
+from Housing.units import sync_units
+
+# Set while a bulk operation maintains the counters of the tenants it changes itself.
+_bulk_tenant_changes = ContextVar('housing_bulk_tenant_changes', default=False)
+
+
+@contextmanager
+def bulk_tenant_changes():
+    """
+    Make the per-tenant signal receivers skip their counter, summary and cache updates.
+
+    For bulk operations that apply one aggregated update per building instead; they are
+    responsible for leaving the counters consistent with the Tenant table.
+    """
+    token = _bulk_tenant_changes.set(True)
+    try:
+        yield
+    finally:
+        _bulk_tenant_changes.reset(token)
+
+
+def in_bulk_tenant_changes():
+    """
+    Return True inside bulk_tenant_changes().
+    """
+    return _bulk_tenant_changes.get()
+
+
+def adjust_occupancy(building_id, houses_delta=0, people_delta=0):
+    """
+    Atomically apply a change to the occupancy counters of a building.
+
+    :param building_id: The ID of the building whose counters change.
+    :param houses_delta: Change to Building.available_houses (negative when a house is taken).
+    :param people_delta: Change to TotalTenants.total_count.
+    """
+    if houses_delta:
+        houses = Building.objects.filter(pk=building_id)
+        if houses_delta > 0:
+            # Never free more houses than the building has; taking a house below zero is
+            # rejected by the column's CHECK constraint and rolls the tenant insert back.
+            houses = houses.filter(available_houses__lte=F('total_number_of_houses') - houses_delta)
+        houses.update(available_houses=F('available_houses') + houses_delta, updated_at=Now())
+
+    if people_delta:
+        totals = TotalTenants.objects.filter(building_id=building_id)
+        if people_delta < 0:
+            totals = totals.filter(total_count__gte=-people_delta)
+        updated = totals.update(total_count=F('total_count') + people_delta)
+        if not updated and people_delta > 0:
+            # The row is normally created with the building; recover if it is missing.
+            TotalTenants.objects.get_or_create(building_id=building_id, defaults={'total_count': people_delta})
+
+
+def resize_building(building_id, houses_delta):
+    """
+    Atomically move the available houses of a building along with a change to its number of houses.
+
+    Occupied houses stay occupied, so shrinking a building below its tenants leaves no house available.
+
+    :param building_id: The ID of the building being resized.
+    :param houses_delta: Change to Building.total_number_of_houses.
+    """
+    Building.objects.filter(pk=building_id).update(
+        available_houses=Greatest(F('available_houses') + houses_delta, 0), updated_at=Now(),
+    )
+
+
+def touch_buildings(building_ids):
+    """
+    Stamp Building.updated_at for changes shown on a building's page that don't go through its
+    counters, such as caretaker, amenity and tenant detail edits.
+
+    :param building_ids: An iterable of building IDs.
+    """
+    Building.objects.filter(pk__in=list(building_ids)).update(updated_at=Now())
+
+
+def recompute_occupancy(building_ids=None):
+    """
+    Recompute the occupancy counters from the Tenant table with set-based statements.
+
+    Used after bulk operations that bypass the per-tenant signals. The units and occupancy summary
+    rows of the buildings are brought up to date and their cached details pages invalidated as well.
+
+    :param building_ids: Optional iterable of building IDs to restrict the recompute to; all buildings when None.
+    """
+    buildings = Building.objects.all()
+    if building_ids is not None:
+        building_ids = list(building_ids)
+        buildings = buildings.filter(pk__in=building_ids)
+
+    occupied = (Tenant.objects.filter(building_id=OuterRef('pk')).order_by()
+                .values('building_id').annotate(n=Count('pk')).values('n'))
+    people = (Tenant.objects.filter(building_id=OuterRef('building_id')).order_by()
+              .values('building_id').annotate(n=Sum('number_of_people')).values('n'))
+
+    buildings.update(
+        available_houses=Greatest(F('total_number_of_houses') - Coalesce(Subquery(occupied), 0), 0),
+        updated_at=Now(),
+    )
+
+    missing = buildings.filter(totaltenants__isnull=True).values_list('pk', flat=True)
+    TotalTenants.objects.bulk_create([TotalTenants(building_id=pk) for pk in missing], ignore_conflicts=True)
+    TotalTenants.objects.filter(building__in=buildings).update(
+        total_count=Coalesce(Subquery(people), 0),
+    )
+    sync_units(building_ids)
+    rebuild_occupancy_summary(building_ids)
+    if building_ids is None:
+        invalidate_all_building_details()
+    else:
+        for building_id in building_ids:
+            invalidate_building_details(building_id)
+
+
+def changed_building_ids(since):
+    """
+    Return a queryset of the IDs of buildings whose counters or tenants changed at or after since.
+    """
+    changed_tenants = Tenant.objects.filter(updated_at__gte=since).values('building_id')
+    return Building.objects.filter(Q(updated_at__gte=since) | Q(pk__in=changed_tenants)).values('pk')
+
+
+def find_occupancy_drift(building_ids=None):
+    """
+    Compare the stored occupancy counters with the counts derived from the Tenant table.
+
+    The true counts of all buildings come from a single GROUP BY over Tenant; the stored values
+    are read with one query per table.
+
+    :param building_ids: Optional iterable or queryset of building IDs to check; all buildings when None.
+    :return: A list of dictionaries with building_id, total_tenants_id (None when the row is missing)
+             and the stored and expected values of available_houses and total_count, for the drifted buildings only.
+    """
+    buildings = Building.objects.order_by()
+    tenants = Tenant.objects.order_by()
+    totals = TotalTenants.objects.order_by()
+    if building_ids is not None:
+        if not hasattr(building_ids, 'query'):
+            building_ids = list(building_ids)
+        buildings = buildings.filter(pk__in=building_ids)
+        tenants = tenants.filter(building_id__in=building_ids)
+        totals = totals.filter(building_id__in=building_ids)
+
+    actual = {row['building_id']: (row['houses'], row['people'])
+              for row in tenants.values('building_id').annotate(houses=Count('pk'), people=Sum('number_of_people')).iterator()}
+    stored_totals = {building_id: (pk, count) for building_id, pk, count in totals.values_list('building_id', 'pk', 'total_count').iterator()}
+
+    drift = []
+    for pk, total_houses, available in buildings.values_list('pk', 'total_number_of_houses', 'available_houses').iterator():
+        occupied, people = actual.get(pk, (0, 0))
+        total_tenants_id, total_count = stored_totals.get(pk, (None, None))
+        expected_available = max(total_houses - occupied, 0)
+        if available != expected_available or total_count != people:
+            drift.append({
+                'building_id': pk,
+                'total_tenants_id': total_tenants_id,
+                'available_houses': available,
+                'expected_available_houses': expected_available,
+                'total_count': total_count,
+                'expected_total_count': people,
+            })
+    return drift
+
+
+def fix_occupancy_drift(drift, batch_size=1000):
+    """
+    Repair the buildings returned by find_occupancy_drift, batch_size buildings per statement.
+
+    The counters are recomputed from the Tenant table at write time rather than copied from the
+    report, so tenants that sign up or leave between the check and the fix are not lost.
+    """
+    building_ids = [row['building_id'] for row in drift]
+    for offset in range(0, len(building_ids), batch_size):
+        with write_atomic():
+            recompute_occupancy(building_ids[offset:offset + batch_size])
@@ -0,0 +1,84 @@
+"""
+Cached data and rendered fragments of the building details page.
+
+A cache hit serves the whole page without touching the database: the building itself and the
+rendered caretaker, amenity and tenant total fragments are stored together under a key that
+includes a per-building version and a version shared by all buildings. The Tenant, Caretaker,
+Building and amenity signals bump the per-building version after their transaction commits, and
+bulk operations and amenity catalog changes bump the shared one. Those bumps only reach the
+workers that share the cache, so with a per-process cache the details are never cached.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+
+from Housing.cache import bump_version, cache_is_shared, get_version, versioned_key
+from Housing.models import Building, TotalTenants
+from Housing.routers import primary_reads
+
+BUILDING_DETAILS_NAMESPACE = 'building-details'
+FRAGMENT_TEMPLATES = {
+    'caretakers': 'building_details_caretakers.html',
+    'amenities': 'building_details_amenities.html',
+    'total_tenants': 'building_details_total_tenants.html',
+}
+
+
+def _building_namespace(building_id):
+    return f'{BUILDING_DETAILS_NAMESPACE}:{building_id}'
+
+
+def building_details_key(building_id):
+    """
+    Build the cache key of a building's details at the current shared and per-building versions.
+    """
+    return versioned_key(BUILDING_DETAILS_NAMESPACE, building_id, get_version(_building_namespace(building_id)))
+
+
+def invalidate_building_details(building_id):
+    """
+    Invalidate the cached details of one building once the current transaction commits.
+    """
+    transaction.on_commit(lambda: bump_version(_building_namespace(building_id)))
+
+
+def invalidate_all_building_details():
+    """
+    Invalidate the cached details of every building once the current transaction commits.
+    """
+    transaction.on_commit(lambda: bump_version(BUILDING_DETAILS_NAMESPACE))
+
+
+def load_building_details(building_id):
+    """
+    Load a building and render its fragments from the database.
+
+    :raises Building.DoesNotExist: If there is no building with the given ID.
+    :return: A dictionary with the building instance and the rendered fragments by name.
+    """
+    # Read from the primary: a lagging replica would pin stale data in the cache until the next change.
+    with primary_reads():
+        building = Building.objects.prefetch_related('caretaker', 'amenities').get(pk=building_id)
+        context = {'building': building, 'total_tenants': TotalTenants.objects.filter(building_id=building_id).first()}
+    fragments = {name: render_to_string(template, context) for name, template in FRAGMENT_TEMPLATES.items()}
+    # The prefetched relations are rendered already; the cached instance doesn't need them.
+    building._prefetched_objects_cache = {}
+    return {'building': building, 'fragments': fragments}
+
+
+def get_building_details(building_id):
+    """
+    Return the building and its rendered fragments, from the cache when it is shared.
+
+    :raises Building.DoesNotExist: If there is no building with the given ID.
+    """
+    if not cache_is_shared():
+        return load_building_details(building_id)
+    key = building_details_key(building_id)
+    details = cache.get(key)
+    if details is None:
+        details = load_building_details(building_id)
+        cache.set(key, details, getattr(settings, 'HOUSING_BUILDING_DETAILS_CACHE_TIMEOUT', 3600))
+    return details
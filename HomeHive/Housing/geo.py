@@ -0,0 +1,255 @@
+"""
+Offline geocoding of building locations and proximity search.
+
+Locations are resolved against a local gazetteer, a CSV file of place names and coordinates
+(HOUSING_GAZETTEER_PATH), so no network service is involved. Every building with coordinates also
+stores the cell of a fixed latitude/longitude grid in Building.grid_cell, indexed together with
+the coordinates. A radius query turns the bounding box of its circle into one range of cell
+numbers per grid row and joins them to that index, so the candidates are read from the index
+alone; exact great-circle distances are only computed for the candidates that can be in the
+result. Nearest-neighbour queries first look for any k buildings in boxes of growing size, which
+bounds the distance of the k nearest, then run one radius query of that size.
+"""
+
+import csv
+import math
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connections, router
+
+from Housing.models import Building
+
+# Grid cells are CELL_DEGREES wide in latitude and longitude, about 550 m at the equator.
+CELL_DEGREES = 0.005
+LONGITUDE_CELLS = round(360 / CELL_DEGREES)
+# Radius queries spanning more grid rows than this (about 100 km) filter on the bounding box alone.
+MAX_CELL_ROWS = 180
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = EARTH_RADIUS_KM * math.pi / 180
+# Slack for the error of flat-earth distances, which is far below 1% over a few hundred km.
+FLAT_DISTANCE_MARGIN = 1.01
+# The first radius tried by nearest_buildings, doubled until enough buildings are found, then narrowed.
+NEAREST_START_RADIUS_KM = 0.25
+NEAREST_BISECTIONS = 3
+HALF_EARTH_CIRCUMFERENCE_KM = math.pi * EARTH_RADIUS_KM
+
+NEARBY_FIELDS = ('pk', 'building_name', 'location', 'available_houses', 'latitude', 'longitude')
+
+
+def normalize_place(name):
+    return ' '.join(name.casefold().split())
+
+
+@lru_cache(maxsize=None)
+def load_gazetteer(path):
+    """
+    Read a gazetteer CSV with name, latitude and longitude columns into a dictionary of
+    normalized place name to (latitude, longitude).
+    """
+    with open(path, newline='', encoding='utf-8') as handle:
+        return {normalize_place(row['name']): (float(row['latitude']), float(row['longitude']))
+                for row in csv.DictReader(handle)}
+
+
+def geocode(location):
+    """
+    Resolve a free-text location to coordinates with the gazetteer.
+
+    The whole text is looked up first, then each comma separated part in order, so
+    "Kilimani, Nairobi" resolves to Kilimani.
+
+    :return: A (latitude, longitude) tuple, or None if the place is unknown.
+    """
+    gazetteer = load_gazetteer(str(settings.HOUSING_GAZETTEER_PATH))
+    for name in [location, *location.split(',')]:
+        coordinates = gazetteer.get(normalize_place(name))
+        if coordinates:
+            return coordinates
+    return None
+
+
+def _row(latitude):
+    return math.floor((latitude + 90) / CELL_DEGREES)
+
+
+def _column(longitude):
+    return math.floor((longitude + 180) / CELL_DEGREES) % LONGITUDE_CELLS
+
+
+def grid_cell(latitude, longitude):
+    """
+    Return the number of the grid cell containing a point; cells are numbered row by row.
+    """
+    return _row(latitude) * LONGITUDE_CELLS + _column(longitude)
+
+
+def distance_km(latitude1, longitude1, latitude2, longitude2):
+    """
+    Return the great-circle distance between two points with the haversine formula.
+    """
+    phi1, phi2 = math.radians(latitude1), math.radians(latitude2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(longitude2 - longitude1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def candidate_sql(latitude, longitude, radius_km):
+    """
+    Build the query of the candidate buildings of a radius search.
+
+    It selects the id, latitude, longitude and distance_bound of the buildings in the bounding
+    box of the circle whose distance_bound is within the radius. distance_bound is a lower bound
+    of the squared distance in km computed with flat-earth arithmetic. While the box spans at
+    most MAX_CELL_ROWS grid rows, its cell ranges are joined to the grid index, which covers the
+    coordinates; the ORM can't join a list of values, hence the SQL.
+
+    :return: A (sql, params) tuple.
+    """
+    quote = connections[router.db_for_read(Building)].ops.quote_name
+    table = quote(Building._meta.db_table)
+    pk, lat, lon, cell = (f'b.{quote(Building._meta.get_field(name).column)}' for name in ('id', 'latitude', 'longitude', 'grid_cell'))
+
+    delta_latitude = radius_km / KM_PER_DEGREE
+    # The longitude span of the box is widest on its edge nearest to a pole.
+    widest = math.cos(math.radians(min(abs(latitude) + delta_latitude, 90)))
+    delta_longitude = radius_km / (KM_PER_DEGREE * widest) if widest > 1e-9 else 360
+    west, east = longitude - delta_longitude, longitude + delta_longitude
+    south, north = latitude - delta_latitude, latitude + delta_latitude
+
+    if west < -180 or east > 180:
+        # Crosses the antimeridian (or covers a pole): longitude doesn't prune and there's no bound.
+        return (f'SELECT {pk}, {lat}, {lon}, 0.0 AS distance_bound FROM {table} b '
+                f'WHERE {lat} BETWEEN %s AND %s AND {lon} IS NOT NULL', [south, north])
+
+    # Longitude degrees measured at the widest latitude of the box are the shortest, and the
+    # margin covers the error of the flat-earth formula, so the bound never exceeds the distance.
+    scale = KM_PER_DEGREE / FLAT_DISTANCE_MARGIN
+    bound = f'({lat} - %s) * ({lat} - %s) * %s + ({lon} - %s) * ({lon} - %s) * %s'
+    bound_params = [latitude, latitude, scale * scale, longitude, longitude, (scale * widest) ** 2]
+
+    first_row, last_row = _row(south), _row(north)
+    if last_row - first_row >= MAX_CELL_ROWS:
+        sql = (f'SELECT {pk}, {lat}, {lon}, {bound} AS distance_bound FROM {table} b '
+               f'WHERE {lat} BETWEEN %s AND %s AND {lon} BETWEEN %s AND %s')
+        params = bound_params + [south, north, west, east]
+    else:
+        # Each row spans the chord of the circle at the row edge nearest to the centre, not the
+        # whole box; the chord is measured the way distance_bound is, so it keeps every candidate.
+        reach = radius_km * FLAT_DISTANCE_MARGIN / KM_PER_DEGREE
+        ranges = []
+        for row in range(first_row, last_row + 1):
+            row_south = row * CELL_DEGREES - 90
+            offset = max(0.0, row_south - latitude, latitude - row_south - CELL_DEGREES)
+            half_chord = math.sqrt(max(0.0, reach * reach - offset * offset)) / widest
+            first_column = _column(max(west, longitude - half_chord))
+            last_column = _column(min(east, longitude + half_chord))
+            ranges.append((row * LONGITUDE_CELLS + first_column, row * LONGITUDE_CELLS + last_column))
+        sql = (f'WITH cells(low, high) AS (VALUES {", ".join(["(%s, %s)"] * len(ranges))}) '
+               f'SELECT {pk}, {lat}, {lon}, {bound} AS distance_bound FROM cells CROSS JOIN {table} b '
+               f'WHERE {cell} BETWEEN cells.low AND cells.high')
+        params = [value for cell_range in ranges for value in cell_range] + bound_params
+    return f'SELECT * FROM ({sql}) candidates WHERE distance_bound <= %s', params + [radius_km * radius_km]
+
+
+def candidates_within(latitude, longitude, radius_km, limit=None, offset=0):
+    """
+    Return the candidate buildings of a radius search, a superset of those in the circle.
+
+    :param limit: Optional number of candidates to return; with it, they are returned in
+                  distance_bound order, starting at offset.
+    :return: A list of (id, latitude, longitude, distance_bound) tuples.
+    """
+    sql, params = candidate_sql(latitude, longitude, radius_km)
+    if limit:
+        sql, params = f'{sql} ORDER BY distance_bound, 1 LIMIT %s OFFSET %s', params + [limit, offset]
+    with connections[router.db_for_read(Building)].cursor() as cursor:
+        cursor.execute(sql, params)
+        return cursor.fetchall()
+
+
+def buildings_within(latitude, longitude, radius_km, limit=None):
+    """
+    Return the buildings within radius_km of a point, nearest first.
+
+    Exact distances are computed for the coordinates of the candidates; the other fields are
+    only read for the buildings returned. With a limit, the candidates are read in batches in
+    distance_bound order, until the bound of the last one read exceeds the distance of the
+    limit-th nearest building found: no building left can be nearer.
+
+    :return: A list of dictionaries with the NEARBY_FIELDS of each building and its distance_km.
+    """
+    distances, offset, batch = {}, 0, limit and 2 * limit
+    while True:
+        rows = candidates_within(latitude, longitude, radius_km, limit=batch, offset=offset)
+        for pk, building_latitude, building_longitude, _ in rows:
+            distance = distance_km(latitude, longitude, building_latitude, building_longitude)
+            if distance <= radius_km:
+                distances[pk] = distance
+        if not batch or len(rows) < batch:
+            break
+        if len(distances) >= limit and math.sqrt(rows[-1][3]) > sorted(distances.values())[limit - 1]:
+            break
+        offset, batch = offset + batch, batch * 4
+
+    pks = sorted(distances, key=lambda pk: (distances[pk], pk))[:limit]
+    rows = {row['pk']: row for row in Building.objects.filter(pk__in=pks).values(*NEARBY_FIELDS)}
+    return [dict(rows[pk], distance_km=distances[pk]) for pk in pks]
+
+
+def _first_candidates(latitude, longitude, radius_km, k):
+    # Unordered, so the database stops reading the box after k buildings.
+    sql, params = candidate_sql(latitude, longitude, radius_km)
+    with connections[router.db_for_read(Building)].cursor() as cursor:
+        cursor.execute(f'{sql} LIMIT %s', params + [k])
+        return [(row[1], row[2]) for row in cursor.fetchall()]
+
+
+def nearest_buildings(latitude, longitude, k):
+    """
+    Return the k buildings nearest to a point, nearest first.
+
+    The radius around the point doubles from NEAREST_START_RADIUS_KM until it holds k buildings,
+    then is bisected NEAREST_BISECTIONS times towards the smallest such radius. These queries stop
+    after k buildings, so they stay cheap in dense areas. The farthest of the k buildings found
+    bounds the distance of the k nearest, so one radius query of that size gives the result.
+    """
+    radius = NEAREST_START_RADIUS_KM
+    while True:
+        found = _first_candidates(latitude, longitude, radius, k)
+        if len(found) == k:
+            break
+        if radius >= HALF_EARTH_CIRCUMFERENCE_KM:
+            return buildings_within(latitude, longitude, radius, limit=k)
+        radius *= 2
+
+    low, high = radius / 2, radius
+    for _ in range(NEAREST_BISECTIONS if radius > NEAREST_START_RADIUS_KM else 0):
+        middle = (low + high) / 2
+        candidates = _first_candidates(latitude, longitude, middle, k)
+        if len(candidates) == k:
+            high, found = middle, candidates
+        else:
+            low = middle
+    reach = max(distance_km(latitude, longitude, *point) for point in found)
+    return buildings_within(latitude, longitude, reach, limit=k)
+
+
+def geocode_buildings(only_missing=True):
+    """
+    Set the coordinates of buildings from the gazetteer with one UPDATE per distinct location.
+
+    :param only_missing: Only geocode buildings without coordinates; all buildings when False.
+    :return: A (geocoded building count, sorted list of unknown locations) tuple.
+    """
+    buildings = Building.objects.filter(latitude__isnull=True) if only_missing else Building.objects.all()
+    updated, unknown = 0, []
+    for location in buildings.order_by().values_list('location', flat=True).distinct():
+        coordinates = geocode(location)
+        if coordinates is None:
+            unknown.append(location)
+            continue
+        updated += buildings.filter(location=location).update(
+            latitude=coordinates[0], longitude=coordinates[1], grid_cell=grid_cell(*coordinates),
+        )
+    return updated, sorted(unknown)
@@ -0,0 +1,196 @@
+"""
+The occupancy history of buildings: an append-only event log with periodic snapshots.
+
+Every tenant move-in, move-out and change of household appends an OccupancyEvent in the
+transaction of the change, from the Tenant signals or, for the bulk operations that bypass them,
+from the operation itself. The occupancy of a building at any point in time is the sum of its
+events up to then. Snapshots store that sum at points in time, so a point-in-time query reads the
+latest snapshot before the requested time and only replays the events since, with two indexed
+queries. Compaction folds the events older than a horizon into snapshots and deletes them, which
+keeps the event table bounded; before the horizon, occupancy is known at snapshot times.
+"""
+
+import datetime
+
+from django.db import connections
+from django.db.models import Count, F, OuterRef, Q, Subquery, Sum
+from django.utils import timezone
+
+from Housing.models import OccupancyEvent, OccupancySnapshot
+from Housing.transactions import write_atomic
+
+# Events older than this are folded into snapshots by compact_events.
+EVENT_RETENTION = datetime.timedelta(days=90)
+# Events are stamped before their transaction commits, so a snapshot only covers events older than
+# this, which is longer than any transaction that writes them; later ones are replayed on top.
+SNAPSHOT_GRACE = datetime.timedelta(minutes=10)
+SNAPSHOT_BATCH_SIZE = 5000
+
+
+def record_events(events):
+    """
+    Append events to the occupancy log with one INSERT.
+
+    :param events: An iterable of unsaved OccupancyEvent instances.
+    """
+    OccupancyEvent.objects.bulk_create(events, batch_size=SNAPSHOT_BATCH_SIZE)
+
+
+def move_in_event(building_id, tenant_id, number_of_people):
+    return OccupancyEvent(building_id=building_id, tenant_id=tenant_id, kind=OccupancyEvent.MOVE_IN,
+                          occupied_delta=1, people_delta=number_of_people)
+
+
+def move_out_event(building_id, tenant_id, number_of_people):
+    return OccupancyEvent(building_id=building_id, tenant_id=tenant_id, kind=OccupancyEvent.MOVE_OUT,
+                          occupied_delta=-1, people_delta=-number_of_people)
+
+
+def record_tenant_saved(tenant, created):
+    """
+    Append the events of a tenant's creation, move to another building or household change.
+
+    The stored building and household of an updated tenant come from when it was loaded
+    (Tenant.from_db); tenants that weren't loaded from the database record nothing on update.
+    """
+    current = (tenant.building_id, tenant.number_of_people)
+    stored = getattr(tenant, '_stored_occupancy', None)
+    tenant._stored_occupancy = current + (tenant.number_of_rooms,)
+    if created:
+        record_events([move_in_event(tenant.building_id, tenant.pk, tenant.number_of_people)])
+    elif stored is None or None in stored[:2] or stored[:2] == current:
+        return
+    elif stored[0] != current[0]:
+        record_events([move_out_event(stored[0], tenant.pk, stored[1]),
+                       move_in_event(tenant.building_id, tenant.pk, tenant.number_of_people)])
+    else:
+        record_events([OccupancyEvent(building_id=tenant.building_id, tenant_id=tenant.pk, kind=OccupancyEvent.CHANGE,
+                                      people_delta=tenant.number_of_people - stored[1])])
+
+
+def record_tenant_deleted(tenant):
+    """
+    Append the move-out event of a deleted tenant.
+    """
+    building_id, number_of_people = (getattr(tenant, '_stored_occupancy', None) or (tenant.building_id, tenant.number_of_people))[:2]
+    record_events([move_out_event(building_id, tenant.pk, number_of_people)])
+
+
+def record_building_cleared(tenants):
+    """
+    Append one move-out event for a set of tenants of a building that is about to be deleted
+    with a raw DELETE, aggregated by the database with a single INSERT ... SELECT.
+
+    :param tenants: A Tenant queryset of the tenants of a single building.
+    """
+    cleared = tenants.order_by().values('building_id').annotate(occupied=Count('pk'), people=Sum('number_of_people'))
+    sql, params = cleared.query.get_compiler(using=tenants.db).as_sql()
+    connection = connections[tenants.db]
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(OccupancyEvent._meta.get_field(name).column)
+                        for name in ('building', 'kind', 'occupied_delta', 'people_delta', 'occurred_at'))
+    with connection.cursor() as cursor:
+        cursor.execute(f'INSERT INTO {quote(OccupancyEvent._meta.db_table)} ({columns}) '
+                       f'SELECT cleared.{quote("building_id")}, %s, -cleared.{quote("occupied")}, -cleared.{quote("people")}, %s '
+                       f'FROM ({sql}) cleared',
+                       [OccupancyEvent.MOVE_OUT, connection.ops.adapt_datetimefield_value(timezone.now()), *params])
+
+
+def _settled(moment):
+    """
+    Return the moment, moved back to SNAPSHOT_GRACE ago if it is later, so every event stamped up
+    to it has been committed.
+    """
+    return min(moment, timezone.now() - SNAPSHOT_GRACE)
+
+
+def _latest_snapshots(moment):
+    return (OccupancySnapshot.objects.filter(building_id=OuterRef('building_id'), taken_at__lte=moment)
+            .order_by('-taken_at'))
+
+
+def occupancy_at(building_id, moment):
+    """
+    Return the occupancy of a building at a point in time.
+
+    :return: A dictionary with the occupied_houses and total_people at the moment, the time of
+             the snapshot the figures start from (None when replayed from the first event) and the
+             number of events replayed on top of it.
+    """
+    snapshot = (OccupancySnapshot.objects.filter(building_id=building_id, taken_at__lte=moment)
+                .order_by('-taken_at').values('taken_at', 'occupied_houses', 'total_people').first())
+    events = OccupancyEvent.objects.filter(building_id=building_id, occurred_at__lte=moment)
+    if snapshot:
+        events = events.filter(occurred_at__gt=snapshot['taken_at'])
+    replayed = events.aggregate(occupied=Sum('occupied_delta'), people=Sum('people_delta'), events=Count('pk'))
+    return {
+        'occupied_houses': (snapshot['occupied_houses'] if snapshot else 0) + (replayed['occupied'] or 0),
+        'total_people': (snapshot['total_people'] if snapshot else 0) + (replayed['people'] or 0),
+        'snapshot_at': snapshot['taken_at'] if snapshot else None,
+        'events_replayed': replayed['events'],
+    }
+
+
+def take_snapshots(moment=None):
+    """
+    Snapshot the occupancy of every building that has events since its latest snapshot.
+
+    Each new snapshot is the latest snapshot before the moment plus the events since, aggregated
+    per building with one query. Snapshots are never later than SNAPSHOT_GRACE ago: an event of a
+    transaction still running would be missed by the snapshot and then never replayed.
+
+    :param moment: The point in time of the snapshots; SNAPSHOT_GRACE ago when None or later.
+    :return: The number of snapshots taken.
+    """
+    moment = _settled(moment or timezone.now())
+    latest = _latest_snapshots(moment)
+    pending = (OccupancyEvent.objects.filter(occurred_at__lte=moment)
+               .annotate(since=Subquery(latest.values('taken_at')[:1]))
+               .filter(Q(since__isnull=True) | Q(occurred_at__gt=F('since')))
+               .order_by().values('building_id')
+               .annotate(occupied=Sum('occupied_delta'), people=Sum('people_delta')))
+    deltas = {row['building_id']: (row['occupied'], row['people']) for row in pending}
+
+    taken = 0
+    building_ids = sorted(deltas)
+    for start in range(0, len(building_ids), SNAPSHOT_BATCH_SIZE):
+        batch = building_ids[start:start + SNAPSHOT_BATCH_SIZE]
+        bases = {row['building_id']: (row['occupied_houses'], row['total_people']) for row in
+                 OccupancySnapshot.objects.filter(building_id__in=batch, pk=Subquery(latest.values('pk')[:1]))
+                 .values('building_id', 'occupied_houses', 'total_people')}
+        snapshots = []
+        for building_id in batch:
+            occupied, people = bases.get(building_id, (0, 0))
+            snapshots.append(OccupancySnapshot(building_id=building_id, taken_at=moment,
+                                               occupied_houses=occupied + deltas[building_id][0],
+                                               total_people=people + deltas[building_id][1]))
+        with write_atomic():
+            OccupancySnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+        taken += len(snapshots)
+    return taken
+
+
+def compact_events(before=None):
+    """
+    Fold the events up to a point in time into snapshots at that time and delete them.
+
+    Point-in-time queries from then on give the same figures; before it, occupancy is known at
+    the times of the remaining snapshots.
+
+    :param before: The compaction horizon; EVENT_RETENTION ago when None, at most SNAPSHOT_GRACE ago.
+    :return: A (snapshots taken, events deleted) tuple.
+    """
+    before = _settled(before or timezone.now() - EVENT_RETENTION)
+    with write_atomic():
+        taken = take_snapshots(before)
+        deleted = OccupancyEvent.objects.filter(occurred_at__lte=before)._raw_delete(OccupancyEvent.objects.db)
+    return taken, deleted
+
+
+def record_tenants_imported(tenants):
+    """
+    Append the move-in events of tenants inserted with bulk_create, which sends no signals.
+
+    :param tenants: Saved Tenant instances.
+    """
+    record_events([move_in_event(tenant.building_id, tenant.pk, tenant.number_of_people) for tenant in tenants])
@@ -0,0 +1,207 @@
+"""
+In-process collection of per-route request statistics.
+
+QueryStatsMiddleware records, for every resolved URL name, the wall time, the number of SQL
+queries, the time spent in SQL and the repeated queries of each request. Values are kept in
+fixed-bucket histograms so memory stays bounded however long the process runs.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+
+# Upper bounds of the histogram buckets; the last bucket catches everything above.
+TIME_BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, float('inf'))
+QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500, float('inf'))
+# Number of distinct repeated SQL statements remembered per route.
+MAX_REPEATED_SQL = 20
+
+
+class Histogram:
+    """
+    A fixed-bucket histogram that also tracks count, sum and maximum.
+    """
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+        self.buckets = [0] * len(bounds)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.max = max(self.max, value)
+        for index, bound in enumerate(self.bounds):
+            if value <= bound:
+                self.buckets[index] += 1
+                break
+
+    def percentile(self, fraction):
+        """
+        Estimate a percentile as the upper bound of the bucket that contains it.
+        """
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for bound, hits in zip(self.bounds, self.buckets):
+            seen += hits
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+    def as_dict(self):
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count else 0.0,
+            'max': self.max,
+            'p50': self.percentile(0.5),
+            'p95': self.percentile(0.95),
+            'p99': self.percentile(0.99),
+            'buckets': {('+inf' if bound == float('inf') else str(bound)): hits
+                        for bound, hits in zip(self.bounds, self.buckets)},
+        }
+
+
+class RouteStats:
+    """
+    Statistics of all requests served by one URL name.
+    """
+
+    def __init__(self):
+        self.wall_ms = Histogram(TIME_BUCKETS_MS)
+        self.sql_ms = Histogram(TIME_BUCKETS_MS)
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.duplicate_queries = 0
+        self.repeated_sql = {}
+
+    def add(self, wall_ms, sql_ms, queries, duplicates, repeated):
+        self.wall_ms.add(wall_ms)
+        self.sql_ms.add(sql_ms)
+        self.queries.add(queries)
+        self.duplicate_queries += duplicates
+        for sql, times in repeated.items():
+            if sql in self.repeated_sql or len(self.repeated_sql) < MAX_REPEATED_SQL:
+                self.repeated_sql[sql] = self.repeated_sql.get(sql, 0) + times
+
+    def as_dict(self):
+        return {
+            'requests': self.wall_ms.count,
+            'wall_ms': self.wall_ms.as_dict(),
+            'sql_ms': self.sql_ms.as_dict(),
+            'queries': self.queries.as_dict(),
+            'duplicate_queries': self.duplicate_queries,
+            'repeated_sql': dict(sorted(self.repeated_sql.items(), key=lambda item: -item[1])),
+        }
+
+
+class QueryCollector:
+    """
+    Database execute wrapper that records every query run while it is installed.
+    """
+
+    def __init__(self):
+        self.queries = []
+        self.sql_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries.append((sql, repr(params)))
+
+    def duplicates(self):
+        """
+        Return the number of queries that repeat an earlier identical query (same SQL and parameters).
+        """
+        return len(self.queries) - len(set(self.queries))
+
+    def repeated(self):
+        """
+        Return the SQL statements run more than once with any parameters, the shape of N+1 queries.
+        """
+        counts = {}
+        for sql, _ in self.queries:
+            sql = re.sub(r'\s+', ' ', sql)
+            counts[sql] = counts.get(sql, 0) + 1
+        return {sql: times for sql, times in counts.items() if times > 1}
+
+
+class StatsRegistry:
+    """
+    Thread-safe registry of RouteStats keyed by URL name.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.routes = {}
+        self.started_at = time.time()
+        self.recorded = 0
+
+    def record(self, route, wall_ms, collector):
+        with self.lock:
+            stats = self.routes.setdefault(route, RouteStats())
+            stats.add(wall_ms, collector.sql_time * 1000, len(collector.queries),
+                      collector.duplicates(), collector.repeated())
+            self.recorded += 1
+            return self.recorded
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'pid': os.getpid(),
+                'started_at': self.started_at,
+                'taken_at': time.time(),
+                'routes': {route: stats.as_dict() for route, stats in sorted(self.routes.items())},
+            }
+
+    def reset(self):
+        with self.lock:
+            self.routes = {}
+            self.started_at = time.time()
+            self.recorded = 0
+
+    def dump(self, directory):
+        """
+        Write the snapshot of this process to <directory>/<pid>.json for the query_stats command.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        snapshot = self.snapshot()
+        temporary = directory / f'.{snapshot["pid"]}.json.tmp'
+        temporary.write_text(json.dumps(snapshot))
+        temporary.replace(directory / f'{snapshot["pid"]}.json')
+
+
+registry = StatsRegistry()
+
+
+def merge_snapshots(snapshots):
+    """
+    Merge the snapshots of several processes into totals per route.
+
+    Histograms are merged bucket by bucket, so percentiles stay bucket estimates.
+    """
+    merged = {}
+    for snapshot in snapshots:
+        for route, data in snapshot['routes'].items():
+            stats = merged.setdefault(route, RouteStats())
+            for name in ('wall_ms', 'sql_ms', 'queries'):
+                histogram = getattr(stats, name)
+                source = data[name]
+                histogram.count += source['count']
+                histogram.total += source['mean'] * source['count']
+                histogram.max = max(histogram.max, source['max'])
+                for index, hits in enumerate(source['buckets'].values()):
+                    histogram.buckets[index] += hits
+            stats.duplicate_queries += data['duplicate_queries']
+            for sql, times in data['repeated_sql'].items():
+                stats.repeated_sql[sql] = stats.repeated_sql.get(sql, 0) + times
+    return {route: stats.as_dict() for route, stats in sorted(merged.items())}
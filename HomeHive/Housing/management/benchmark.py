@@ -0,0 +1,324 @@
+"""
+Performance benchmark of the Housing views.
+
+Runs against a dataset seeded with Housing.datagen, requests every route of Housing/urls.py
+through the test client, and reports latency percentiles, query counts and peak memory per route
+as plain data that the benchmark_views command writes out as JSON.
+
+It drives the Django test client, so it lives with the benchmark commands, the only modules that
+import it, and never loads with the app.
+"""
+
+import asyncio
+import json
+import statistics
+import threading
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from types import ModuleType
+from urllib.parse import urlencode
+
+from django.contrib import admin
+from django.core.cache import cache
+from django.db import OperationalError, connection, connections, transaction
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import include, path, reverse
+from django.utils import timezone
+
+from Housing import urls
+from Housing.models import Building, Tenant, TotalTenants
+
+# How each named route of Housing/urls.py is requested: (method, URL kwargs, GET/POST data).
+# Values are filled from the sample objects of the seeded dataset. Requests run inside a
+# rolled-back transaction, so the ones that write don't change the dataset between iterations.
+ROUTE_REQUESTS = {
+    'building-view': ('get', {}, {}),
+    'building-reg_view': ('get', {}, {}),
+    'building-details': ('get', {'building_id': 'building'}, {}),
+    'building-update': ('get', {'pk': 'building'}, {}),
+    'delete-building': ('post', {'pk': 'building'}, {}),
+    'add-tenant': ('get', {'building_id': 'building'}, {}),
+    'add-caretaker': ('get', {'building_id': 'building'}, {}),
+    'update-caretaker': ('get', {'pk': 'caretaker'}, {}),
+    'delete-caretaker': ('post', {'pk': 'caretaker'}, {}),
+    'tenant-detail': ('get', {'tenant_id': 'tenant'}, {}),
+    'tenant-delete': ('get', {'tenant_id': 'tenant'}, {}),
+    'update-tenant': ('get', {'tenant_id': 'tenant'}, {}),
+    'get-tenant-id': ('get', {}, {'house_number': 'house_number', 'building_id': 'building'}),
+    'search-tenants': ('get', {}, {'q': 'tenant_name'}),
+    'move-tenants': ('post', {}, {'tenant_ids': 'tenant_ids', 'building_id': 'building'}),
+    'move-out-tenants': ('post', {}, {'tenant_ids': 'tenant_ids'}),
+    'list-buildings': ('get', {}, {}),
+    'search-buildings': ('get', {}, {'all': 'amenity'}),
+    'nearby-buildings': ('get', {}, {'lat': 'latitude', 'lon': 'longitude', 'k': 'nearest_count'}),
+    'lookup-building-tenants': ('get', {'building_id': 'building'}, {'house_number': 'house_number'}),
+    'building-vacancies': ('get', {'building_id': 'building'}, {}),
+    'building-unit': ('get', {'building_id': 'building', 'number': 'house_number'}, {}),
+    'building-occupancy': ('get', {'building_id': 'building'}, {'at': 'moment'}),
+    'query-stats': ('get', {}, {}),
+    'occupancy-analytics': ('get', {}, {}),
+    'api-buildings': ('get', {}, {}),
+    'api-building': ('get', {'pk': 'building'}, {}),
+    'api-tenants': ('get', {}, {'building': 'building'}),
+    'api-tenant': ('get', {'pk': 'tenant'}, {}),
+    'api-caretakers': ('get', {}, {}),
+    'api-caretaker': ('get', {'pk': 'caretaker'}, {}),
+    'api-total-tenants': ('get', {}, {}),
+    'api-total-tenant': ('get', {'pk': 'total_tenants'}, {}),
+}
+# Routes whose POST data is sent as a JSON body.
+JSON_ROUTES = {'move-tenants', 'move-out-tenants'}
+
+
+def sample_objects():
+    """
+    Pick the objects used to fill in route parameters: the building in the middle of the dataset.
+    """
+    building = Building.objects.order_by('pk')[Building.objects.count() // 2]
+    tenant = building.tenants.order_by('pk').first()
+    return {
+        'building': building.pk,
+        'tenant': tenant.pk if tenant else 0,
+        'tenant_ids': [tenant.pk] if tenant else [0],
+        'house_number': tenant.house_number if tenant else '1',
+        'tenant_name': tenant.name.split()[0] if tenant else 'Tenant',
+        'amenity': building.amenities.values_list('name', flat=True).first() or 'wifi',
+        'caretaker': building.caretaker.order_by('pk').values_list('pk', flat=True).first() or 0,
+        'total_tenants': TotalTenants.objects.get(building=building).pk,
+        'latitude': building.latitude or 0.0,
+        'longitude': building.longitude or 0.0,
+        'nearest_count': 10,
+        'moment': timezone.now().isoformat(),
+    }
+
+
+def route_names():
+    return [pattern.name for pattern in urls.urlpatterns if pattern.name]
+
+
+def route_url(name, samples):
+    """
+    Build the URL of a route from its request spec, with the GET data as query string.
+    """
+    _, kwargs, data = ROUTE_REQUESTS[name]
+    url = reverse(name, kwargs={key: samples[value] for key, value in kwargs.items()})
+    data = {key: samples[value] for key, value in data.items()}
+    return f'{url}?{urlencode(data)}' if data else url
+
+
+def benchmark_route(client, name, samples, iterations):
+    """
+    Request one route repeatedly and summarize its latency, query count and peak memory.
+    """
+    method, kwargs, data = ROUTE_REQUESTS[name]
+    url = reverse(name, kwargs={key: samples[value] for key, value in kwargs.items()})
+    data = {key: samples[value] for key, value in data.items()}
+    extra = {}
+    if name in JSON_ROUTES:
+        data, extra = json.dumps(data), {'content_type': 'application/json'}
+
+    def request():
+        with transaction.atomic():
+            response = getattr(client, method)(url, data, **extra)
+            if hasattr(response, 'streaming_content'):
+                b''.join(response.streaming_content)
+            transaction.set_rollback(True)
+        return response
+
+    status = request().status_code  # warm-up, also fills the caches
+    timings, queries = [], []
+    for _ in range(iterations):
+        with CaptureQueriesContext(connection) as ctx:
+            start = time.perf_counter()
+            request()
+            timings.append((time.perf_counter() - start) * 1000)
+        queries.append(len(ctx.captured_queries))
+
+    tracemalloc.start()
+    request()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    quantiles = statistics.quantiles(timings, n=20, method='inclusive') if len(timings) > 1 else timings * 19
+    return {
+        'method': method.upper(),
+        'status': status,
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(quantiles[18], 3),
+        'queries': max(queries),
+        'peak_memory_kb': round(peak / 1024, 1),
+    }
+
+
+def run_benchmark(iterations=20, routes=None):
+    """
+    Benchmark every route against the data currently in the database.
+
+    :return: A dictionary of route name to result; routes without a request spec are reported as skipped.
+    """
+    cache.clear()
+    client = Client()
+    samples = sample_objects()
+    results = {}
+    for name in routes or route_names():
+        if name not in ROUTE_REQUESTS:
+            results[name] = {'skipped': 'no request spec in Housing.management.benchmark.ROUTE_REQUESTS'}
+            continue
+        results[name] = benchmark_route(client, name, samples, iterations)
+    return results
+
+
+def compare_results(current, baseline, threshold):
+    """
+    Compare a benchmark run against a baseline run of the same shape.
+
+    A route regresses when its p95 latency grows by more than threshold (a fraction) or it runs
+    more queries than before.
+
+    :return: A list of human readable regression descriptions.
+    """
+    regressions = []
+    for size, routes in current['sizes'].items():
+        for name, result in routes.items():
+            before = baseline.get('sizes', {}).get(size, {}).get(name)
+            if not before or 'skipped' in result or 'skipped' in before:
+                continue
+            if result['p95_ms'] > before['p95_ms'] * (1 + threshold):
+                regressions.append(f'{size} buildings, {name}: p95 {before["p95_ms"]}ms -> {result["p95_ms"]}ms')
+            if result['queries'] > before['queries']:
+                regressions.append(f'{size} buildings, {name}: queries {before["queries"]} -> {result["queries"]}')
+    return regressions
+
+
+# Read routes served by an async view under ASGI (see Housing.async_views).
+CONCURRENCY_ROUTES = ('building-view', 'building-details', 'tenant-detail', 'list-buildings', 'lookup-building-tenants')
+
+
+@lru_cache(maxsize=None)
+def read_urlconf(async_reads):
+    """
+    Return a root URLconf serving the read routes by their sync or async views, to compare them
+    in one process whatever HOUSING_ASYNC_VIEWS is.
+    """
+    urlconf = ModuleType(f'housing_{"async" if async_reads else "sync"}_reads')
+    urlconf.urlpatterns = [path('admin/', admin.site.urls), path('', include(urls.housing_urlpatterns(async_reads)))]
+    return urlconf
+
+
+def _throughput(timings, elapsed):
+    quantiles = statistics.quantiles(timings, n=20, method='inclusive') if len(timings) > 1 else timings * 19
+    return {
+        'requests_per_second': round(len(timings) / elapsed, 1),
+        'p50_ms': round(statistics.median(timings), 3),
+        'p95_ms': round(quantiles[18], 3),
+    }
+
+
+def load_wsgi(url, concurrency, requests):
+    """
+    Request a URL through the WSGI handler from a pool of threads, like a threaded WSGI server.
+    """
+    local = threading.local()
+
+    def request(_):
+        if not hasattr(local, 'client'):
+            local.client = Client()
+        start = time.perf_counter()
+        local.client.get(url)
+        return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        timings = list(pool.map(request, range(requests)))
+    return _throughput(timings, time.perf_counter() - start)
+
+
+async def _load_asgi(url, concurrency, requests):
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def request():
+        async with semaphore:
+            start = time.perf_counter()
+            await client.get(url)
+            return (time.perf_counter() - start) * 1000
+
+    start = time.perf_counter()
+    timings = await asyncio.gather(*(request() for _ in range(requests)))
+    return _throughput(timings, time.perf_counter() - start)
+
+
+def load_asgi(url, concurrency, requests):
+    """
+    Request a URL through the ASGI handler with up to concurrency requests in flight on one event
+    loop, like a single uvicorn worker.
+    """
+    return asyncio.run(_load_asgi(url, concurrency, requests))
+
+
+def run_concurrency_benchmark(concurrency=50, requests=500):
+    """
+    Compare the read routes served by WSGI threads, by ASGI with the sync views, and by ASGI with
+    the async views, against the data currently in the database.
+
+    :return: A dictionary of route name to the results of the three ways of serving it.
+    """
+    cache.clear()
+    samples = sample_objects()
+    results = {}
+    for name in CONCURRENCY_ROUTES:
+        url = route_url(name, samples)
+        with override_settings(ROOT_URLCONF=read_urlconf(False)):
+            results[name] = {'wsgi': load_wsgi(url, concurrency, requests), 'asgi_sync_view': load_asgi(url, concurrency, requests)}
+        with override_settings(ROOT_URLCONF=read_urlconf(True)):
+            results[name]['asgi_async_view'] = load_asgi(url, concurrency, requests)
+    return results
+
+
+def _write_tenants(building_id, count):
+    timings, errors = [], 0
+    try:
+        for number in range(1, count + 1):
+            start = time.perf_counter()
+            try:
+                Tenant.objects.create(name=f'Tenant {number}', house_number=str(number), phone_number='0700000000',
+                                      building_id=building_id, number_of_rooms=1, number_of_people=1)
+            except OperationalError:
+                # "database is locked" and similar contention errors.
+                errors += 1
+                continue
+            timings.append((time.perf_counter() - start) * 1000)
+    finally:
+        connections.close_all()
+    return timings, errors
+
+
+def run_write_benchmark(threads=8, tenants_per_thread=200):
+    """
+    Create tenants concurrently through the ORM, signals included, one building per thread.
+
+    Every thread opens its own database connection, so writers contend as they do under a
+    threaded server. Must run outside a transaction, since the writer threads only see committed rows.
+
+    :return: A dictionary with the tenants written per second, the failed writes and the write latency percentiles.
+    """
+    buildings = [Building.objects.create(building_name=f'Write benchmark {index}', owner='Benchmark', location='Benchmark',
+                                         total_number_of_houses=tenants_per_thread, available_houses=tenants_per_thread)
+                 for index in range(threads)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(_write_tenants, [building.pk for building in buildings], [tenants_per_thread] * threads))
+    elapsed = time.perf_counter() - start
+
+    timings = [timing for thread_timings, _ in results for timing in thread_timings]
+    result = _throughput(timings, elapsed) if timings else {'requests_per_second': 0.0, 'p50_ms': None, 'p95_ms': None}
+    return {
+        'tenants_per_second': result['requests_per_second'],
+        'written': len(timings),
+        'failed': sum(errors for _, errors in results),
+        'p50_ms': result['p50_ms'],
+        'p95_ms': result['p95_ms'],
+    }
@@ -0,0 +1,66 @@
+"""
+Management command for comparing the WSGI and ASGI read paths under concurrent load.
+"""
+
+import json
+import logging
+import platform
+import time
+from pathlib import Path
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from Housing.management.benchmark import run_concurrency_benchmark
+from Housing.datagen import generate_dataset
+
+
+class Command(BaseCommand):
+    """
+    Seed a throwaway test database and load the read routes concurrently through WSGI threads,
+    through ASGI with the sync views and through ASGI with their async counterparts.
+
+    Requests go through Django's handlers in process, so the numbers compare the request paths
+    without a server or network in between.
+    """
+    help = 'Compare requests per second and latency of the sync and async read views under WSGI and ASGI.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buildings', type=int, default=1000, help='Number of buildings to seed.')
+        parser.add_argument('--houses-per-building', type=int, default=10)
+        parser.add_argument('--concurrency', type=int, default=50, help='Requests in flight at once.')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per route and serving mode.')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'buildings': options['buildings'],
+                'concurrency': options['concurrency'],
+                'requests': options['requests'],
+            },
+        }
+
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            start = time.perf_counter()
+            generate_dataset(options['buildings'], houses_per_building=options['houses_per_building'])
+            self.stderr.write(f'Seeded {options["buildings"]} buildings in {time.perf_counter() - start:.1f}s, benchmarking...')
+            report['routes'] = run_concurrency_benchmark(concurrency=options['concurrency'], requests=options['requests'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(output)
+        else:
+            self.stdout.write(output)
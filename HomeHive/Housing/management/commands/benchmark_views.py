@@ -0,0 +1,88 @@
+"""
+Management command for benchmarking every Housing view against seeded datasets.
+"""
+
+import json
+import logging
+import platform
+import time
+from pathlib import Path
+
+import django
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from Housing.management.benchmark import compare_results, run_benchmark
+from Housing.datagen import generate_dataset
+
+
+class Command(BaseCommand):
+    """
+    Seed datasets of increasing size in a throwaway test database and benchmark every route.
+
+    The results are written as JSON. With --compare the run fails when a route got slower than
+    the baseline by more than --threshold or runs more queries than before.
+    """
+    help = 'Benchmark latency, query counts and memory of every Housing view.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='10,1000', help='Comma separated numbers of buildings, e.g. 10,1000,50000.')
+        parser.add_argument('--iterations', type=int, default=20, help='Timed requests per route.')
+        parser.add_argument('--houses-per-building', type=int, default=10)
+        parser.add_argument('--occupancy', type=float, default=0.8, help='Fraction of houses with a tenant.')
+        parser.add_argument('--routes', help='Comma separated URL names to benchmark; all routes when omitted.')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout.')
+        parser.add_argument('--compare', help='Baseline JSON file from an earlier run.')
+        parser.add_argument('--threshold', type=float, default=0.25, help='Allowed p95 slowdown as a fraction, e.g. 0.25 for 25%%.')
+
+    def handle(self, *args, **options):
+        try:
+            sizes = [int(size) for size in options['sizes'].split(',')]
+        except ValueError:
+            raise CommandError('--sizes must be a comma separated list of integers.')
+        routes = options['routes'].split(',') if options['routes'] else None
+
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'iterations': options['iterations'],
+                'houses_per_building': options['houses_per_building'],
+                'occupancy': options['occupancy'],
+            },
+            'seed_seconds': {},
+            'sizes': {},
+        }
+
+        # 4xx answers (e.g. the staff-only stats endpoint) are expected and would flood the output.
+        logging.getLogger('django.request').setLevel(logging.ERROR)
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            for size in sizes:
+                call_command('flush', interactive=False, verbosity=0)
+                start = time.perf_counter()
+                generate_dataset(size, houses_per_building=options['houses_per_building'], occupancy=options['occupancy'])
+                report['seed_seconds'][str(size)] = round(time.perf_counter() - start, 3)
+                self.stderr.write(f'Seeded {size} buildings in {report["seed_seconds"][str(size)]}s, benchmarking...')
+                report['sizes'][str(size)] = run_benchmark(iterations=options['iterations'], routes=routes)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(output)
+        else:
+            self.stdout.write(output)
+
+        if options['compare']:
+            baseline = json.loads(Path(options['compare']).read_text())
+            regressions = compare_results(report, baseline, options['threshold'])
+            if regressions:
+                raise CommandError('Performance regressions:\n' + '\n'.join(regressions))
+            self.stderr.write(self.style.SUCCESS('No regressions against the baseline.'))
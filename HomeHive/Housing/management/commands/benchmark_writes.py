@@ -0,0 +1,79 @@
+"""
+Management command for measuring the tenant write throughput of the configured database.
+"""
+
+import json
+import platform
+import tempfile
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings, setup_test_environment, teardown_test_environment
+
+from Housing.management.benchmark import run_write_benchmark
+
+
+class Command(BaseCommand):
+    """
+    Create tenants from concurrent threads in a throwaway test database and report the throughput.
+
+    On SQLite the test database is a file, so journaling and locking behave as in production, and
+    --compare-untuned repeats the run without HOUSING_SQLITE_PRAGMAS and with deferred
+    transactions, as Django's stock backend runs, to show their effect. The tuned run uses WAL
+    unless HOMEHIVE_SQLITE_JOURNAL_MODE says otherwise: the throwaway database isn't the tracked
+    dev database that settings keep out of WAL.
+    """
+    help = 'Benchmark concurrent tenant creation against the configured database profile.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8, help='Concurrent writer threads.')
+        parser.add_argument('--tenants-per-thread', type=int, default=200)
+        parser.add_argument('--compare-untuned', action='store_true', help='SQLite only: also run without the PRAGMAs and with deferred transactions.')
+        parser.add_argument('--output', help='Write the JSON results to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        if options['compare_untuned'] and connection.vendor != 'sqlite':
+            raise CommandError('--compare-untuned only applies to the SQLite profile.')
+        report = {
+            'meta': {
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'threads': options['threads'],
+                'tenants_per_thread': options['tenants_per_thread'],
+            },
+            'runs': {},
+        }
+        runs = {'tuned': {'HOUSING_SQLITE_PRAGMAS': {'journal_mode': 'WAL', **settings.HOUSING_SQLITE_PRAGMAS}}}
+        if options['compare_untuned']:
+            runs['untuned'] = {'HOUSING_SQLITE_PRAGMAS': {}, 'HOUSING_SQLITE_TRANSACTION_MODE': 'DEFERRED'}
+
+        setup_test_environment()
+        try:
+            with tempfile.TemporaryDirectory() as directory:
+                for name, overrides in runs.items():
+                    with override_settings(**overrides):
+                        report['runs'][name] = self.run(name, directory, options)
+                    self.stderr.write(f'{name}: {report["runs"][name]["tenants_per_second"]} tenants/s')
+        finally:
+            teardown_test_environment()
+
+        output = json.dumps(report, indent=2)
+        if options['output']:
+            Path(options['output']).write_text(output)
+        else:
+            self.stdout.write(output)
+
+    def run(self, name, directory, options):
+        old_name = connection.settings_dict['NAME']
+        if connection.vendor == 'sqlite':
+            connection.settings_dict['TEST']['NAME'] = str(Path(directory) / f'{name}.sqlite3')
+        connection.close()
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            return run_write_benchmark(threads=options['threads'], tenants_per_thread=options['tenants_per_thread'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
@@ -0,0 +1,29 @@
+"""
+Management command for bounding the occupancy event log.
+"""
+
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from Housing.history import EVENT_RETENTION, compact_events
+
+
+class Command(BaseCommand):
+    """
+    Fold the occupancy events older than the retention period into snapshots and delete them.
+
+    Occupancy since the horizon stays exact at any point in time; before it, it is known at the
+    times of the snapshots.
+    """
+    help = 'Compact the occupancy events older than the retention period into snapshots.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--keep-days', type=int, default=EVENT_RETENTION.days, help='Number of days of events to keep.')
+
+    def handle(self, *args, **options):
+        if options['keep_days'] < 0:
+            raise CommandError('--keep-days must not be negative.')
+        taken, deleted = compact_events(timezone.now() - datetime.timedelta(days=options['keep_days']))
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} occupancy events, took {taken} snapshots.'))
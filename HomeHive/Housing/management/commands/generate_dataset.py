@@ -0,0 +1,57 @@
+"""
+Management command for generating a synthetic HomeHive dataset.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Housing.datagen import generate_dataset
+from Housing.transactions import write_atomic
+
+
+def int_range(value):
+    """
+    Parse "N" or "MIN-MAX" into a (min, max) tuple.
+    """
+    low, _, high = value.partition('-')
+    low, high = int(low), int(high or low)
+    if low < 0 or high < low:
+        raise ValueError(value)
+    return low, high
+
+
+class Command(BaseCommand):
+    """
+    Generate a deterministic, seeded dataset of buildings, tenants, caretakers and amenities.
+    """
+    help = 'Generate a synthetic dataset for benchmarks and load tests.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--buildings', type=int, default=1000, help='Number of buildings to create.')
+        parser.add_argument('--houses', default='5-40', help='Houses per building, "N" or "MIN-MAX".')
+        parser.add_argument('--occupancy', type=float, default=0.8, help='Fraction of houses with a tenant.')
+        parser.add_argument('--caretakers', type=int, default=1, help='Caretakers per building.')
+        parser.add_argument('--amenities', default='0-6', help='Amenities per building, "N" or "MIN-MAX".')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed.')
+        parser.add_argument('--batch-size', type=int, default=10000, help='Buildings generated per batch.')
+
+    def handle(self, *args, **options):
+        try:
+            houses = int_range(options['houses'])
+            amenities = int_range(options['amenities'])
+        except ValueError:
+            raise CommandError('--houses and --amenities must be "N" or "MIN-MAX".')
+        if houses[0] < 1:
+            raise CommandError('Every building needs at least one house.')
+        if not 0 <= options['occupancy'] <= 1:
+            raise CommandError('--occupancy must be between 0 and 1.')
+
+        with write_atomic():
+            counts = generate_dataset(
+                options['buildings'], houses_per_building=houses, occupancy=options['occupancy'],
+                caretakers_per_building=options['caretakers'], amenities_per_building=amenities,
+                seed=options['seed'], batch_size=options['batch_size'], log=self.stderr.write,
+            )
+        self.stdout.write(self.style.SUCCESS(
+            'Created {buildings} buildings, {tenants} tenants, {caretakers} caretakers and '
+            '{amenity_links} amenity links.'.format(**counts)
+        ))
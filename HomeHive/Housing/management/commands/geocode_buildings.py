@@ -0,0 +1,26 @@
+"""
+Management command for filling in building coordinates from the offline gazetteer.
+"""
+
+from django.core.management.base import BaseCommand
+
+from Housing.geo import geocode_buildings
+
+
+class Command(BaseCommand):
+    """
+    Geocode the buildings that have no coordinates yet, e.g. after the gazetteer was extended.
+
+    New and edited buildings are geocoded on save; this command covers rows written before the
+    coordinates existed and rows written with bulk operations.
+    """
+    help = 'Set building coordinates from the gazetteer (HOUSING_GAZETTEER_PATH).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Geocode every building again, not only those without coordinates.')
+
+    def handle(self, *args, **options):
+        updated, unknown = geocode_buildings(only_missing=not options['all'])
+        self.stdout.write(self.style.SUCCESS(f'Geocoded {updated} buildings.'))
+        if unknown:
+            self.stdout.write(self.style.WARNING(f'Locations missing from the gazetteer: {", ".join(unknown)}'))
@@ -0,0 +1,145 @@
+"""
+Management command for importing tenants in bulk from a CSV or NDJSON file.
+"""
+
+import csv
+import json
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count
+
+from Housing.counters import recompute_occupancy
+from Housing.forms import TenantForm
+from Housing.history import record_tenants_imported
+from Housing.models import Building, Tenant
+from Housing.transactions import write_atomic
+
+
+class Command(BaseCommand):
+    """
+    Stream tenants from a file into the database with batched inserts.
+
+    Rows are validated with the TenantForm rules, inserted with bulk_create one chunk per
+    transaction along with their move-in events, and the occupancy counters are recomputed once at
+    the end instead of per row, also when the import fails partway.
+    """
+    help = 'Import tenants from a CSV or NDJSON file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to the CSV or NDJSON file.')
+        parser.add_argument('--format', choices=['csv', 'ndjson'], help='File format; guessed from the extension when omitted.')
+        parser.add_argument('--building', type=int, help='Building ID for rows that have no "building" column.')
+        parser.add_argument('--chunk-size', type=int, default=5000, help='Number of rows inserted per transaction.')
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'File {path} does not exist.')
+        file_format = options['format'] or ('csv' if path.suffix.lower() == '.csv' else 'ndjson')
+        self.default_building = options['building']
+        self.capacity = {}
+        self.imported = 0
+        self.rejected = 0
+
+        try:
+            with path.open(newline='', encoding='utf-8') as handle:
+                rows = enumerate(self.read_rows(handle, file_format), start=1)
+                while True:
+                    chunk = list(islice(rows, options['chunk_size']))
+                    if not chunk:
+                        break
+                    self.import_chunk(chunk)
+        finally:
+            # The chunks committed before a failure have to be counted as well.
+            building_ids = list(self.capacity)
+            for start in range(0, len(building_ids), 500):
+                recompute_occupancy(building_ids[start:start + 500])
+
+        self.stdout.write(self.style.SUCCESS(f'Imported {self.imported} tenants, rejected {self.rejected} rows.'))
+
+    def read_rows(self, handle, file_format):
+        """
+        Yield the rows of the file one at a time as dictionaries.
+        """
+        if file_format == 'csv':
+            yield from csv.DictReader(handle)
+            return
+        for line in handle:
+            line = line.strip()
+            if line:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError as exc:
+                    yield {'__error__': f'invalid JSON ({exc.msg})'}
+
+    def reject(self, line_number, reason):
+        self.rejected += 1
+        self.stderr.write(f'Row {line_number}: {reason}')
+
+    def import_chunk(self, chunk):
+        """
+        Validate and insert one chunk of rows in a single transaction.
+        """
+        candidates = []
+        for line_number, row in chunk:
+            if '__error__' in row:
+                self.reject(line_number, row['__error__'])
+                continue
+            building_id = row.get('building') or self.default_building
+            if not building_id:
+                self.reject(line_number, 'no building given')
+                continue
+            form = TenantForm(data=row)
+            if not form.is_valid():
+                errors = '; '.join(f'{field}: {" ".join(messages)}' for field, messages in form.errors.items())
+                self.reject(line_number, errors)
+                continue
+            tenant = form.save(commit=False)
+            try:
+                tenant.building_id = int(building_id)
+            except (TypeError, ValueError):
+                self.reject(line_number, f'invalid building {building_id!r}')
+                continue
+            candidates.append((line_number, tenant))
+
+        self.load_capacity({tenant.building_id for _, tenant in candidates})
+
+        # One lookup per chunk for house numbers that are already taken.
+        taken = set(Tenant.objects.filter(
+            building_id__in={tenant.building_id for _, tenant in candidates},
+            house_number__in={tenant.house_number for _, tenant in candidates},
+        ).values_list('building_id', 'house_number'))
+
+        tenants = []
+        for line_number, tenant in candidates:
+            key = (tenant.building_id, tenant.house_number)
+            if tenant.building_id not in self.capacity:
+                self.reject(line_number, f'building {tenant.building_id} does not exist')
+            elif key in taken:
+                self.reject(line_number, f'house number {tenant.house_number} is occupied')
+            elif self.capacity[tenant.building_id] <= 0:
+                self.reject(line_number, f'building {tenant.building_id} has no available houses')
+            else:
+                taken.add(key)
+                self.capacity[tenant.building_id] -= 1
+                tenants.append(tenant)
+
+        with write_atomic():
+            Tenant.objects.bulk_create(tenants)
+            record_tenants_imported(tenants)
+        self.imported += len(tenants)
+
+    def load_capacity(self, building_ids):
+        """
+        Fetch the number of free houses for buildings not seen in an earlier chunk.
+        """
+        new_ids = building_ids - self.capacity.keys()
+        if not new_ids:
+            return
+        buildings = (Building.objects.filter(pk__in=new_ids)
+                     .annotate(occupied=Count('tenants'))
+                     .values_list('pk', 'total_number_of_houses', 'occupied'))
+        for pk, total, occupied in buildings:
+            self.capacity[pk] = total - occupied
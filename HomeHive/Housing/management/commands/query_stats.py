@@ -0,0 +1,41 @@
+"""
+Management command for reading the statistics recorded by QueryStatsMiddleware.
+"""
+
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from Housing.instrumentation import merge_snapshots
+
+
+class Command(BaseCommand):
+    """
+    Merge the per-process statistics dumped to HOUSING_QUERY_STATS_DIR and print them as JSON.
+    """
+    help = 'Print the per-route query and latency statistics collected by QueryStatsMiddleware.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', help='Directory with the dumped statistics; defaults to HOUSING_QUERY_STATS_DIR.')
+        parser.add_argument('--sort', choices=['queries', 'wall_ms', 'sql_ms', 'duplicate_queries'], default='queries',
+                            help='Order routes by this value, worst first.')
+        parser.add_argument('--clear', action='store_true', help='Delete the dumped statistics after reading them.')
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or getattr(settings, 'HOUSING_QUERY_STATS_DIR', None)
+        if not directory:
+            raise CommandError('No statistics directory; pass --dir or set HOUSING_QUERY_STATS_DIR.')
+        files = sorted(Path(directory).glob('*.json'))
+        snapshots = [json.loads(path.read_text()) for path in files]
+        routes = merge_snapshots(snapshots)
+
+        sort = options['sort']
+        key = (lambda item: item[1][sort]) if sort == 'duplicate_queries' else (lambda item: item[1][sort]['mean'])
+        routes = dict(sorted(routes.items(), key=key, reverse=True))
+        self.stdout.write(json.dumps({'processes': len(snapshots), 'routes': routes}, indent=2))
+
+        if options['clear']:
+            for path in files:
+                path.unlink()
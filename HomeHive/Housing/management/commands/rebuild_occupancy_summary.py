@@ -0,0 +1,21 @@
+"""
+Management command for rebuilding the materialized occupancy summary.
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from Housing.analytics import rebuild_occupancy_summary
+
+
+class Command(BaseCommand):
+    """
+    Recompute every BuildingOccupancySummary row from the Building and Tenant tables.
+    """
+    help = 'Rebuild the occupancy summary table behind the analytics page.'
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        rebuild_occupancy_summary()
+        self.stdout.write(self.style.SUCCESS(f'Occupancy summary rebuilt in {time.perf_counter() - start:.2f}s.'))
@@ -0,0 +1,25 @@
+"""
+Management command for regenerating the tenant full-text search index.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from Housing.search import rebuild_search_index
+
+
+class Command(BaseCommand):
+    """
+    Rebuild the FTS5 tenant search index from the Tenant table.
+    """
+    help = 'Rebuild the tenant full-text search index.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to rebuild the index on.')
+
+    def handle(self, *args, **options):
+        if connections[options['database']].vendor != 'sqlite':
+            self.stdout.write('Tenant search uses ORM lookups on this database; there is no index to rebuild.')
+            return
+        rebuild_search_index(options['database'])
+        self.stdout.write(self.style.SUCCESS('Tenant search index rebuilt.'))
@@ -0,0 +1,88 @@
+"""
+Management command for detecting and repairing drift of the occupancy counters.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from Housing.counters import changed_building_ids, find_occupancy_drift, fix_occupancy_drift
+from Housing.models import Building, JobCheckpoint
+from Housing.services import delete_pending_buildings
+
+CHECKPOINT_NAME = 'reconcile_occupancy'
+# Writes stamped shortly before a run started may commit after it read the tables, so each
+# incremental run looks back a little further than the previous run's start.
+CHECKPOINT_OVERLAP = timedelta(minutes=5)
+
+
+class Command(BaseCommand):
+    """
+    Compare Building.available_houses and TotalTenants.total_count with the Tenant table and fix the drift.
+
+    With --incremental only the buildings whose counters or tenants changed since the previous
+    successful run are checked; the first incremental run checks everything. Buildings whose
+    background deletion was interrupted are deleted first.
+    """
+    help = 'Report and repair drift between the occupancy counters and the tenants of each building.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report the drift without fixing it.')
+        parser.add_argument('--incremental', action='store_true', help='Only check buildings changed since the last run.')
+        parser.add_argument('--since', help='Only check buildings changed since this ISO 8601 date and time.')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Number of buildings repaired per statement.')
+        parser.add_argument('--show', type=int, default=20, help='Number of drifted buildings to list.')
+
+    def handle(self, *args, **options):
+        started_at = timezone.now()
+        self.delete_pending_buildings(options['dry_run'])
+        since = self.get_since(options)
+        building_ids = changed_building_ids(since) if since else None
+
+        drift = find_occupancy_drift(building_ids)
+        scope = f'buildings changed since {since.isoformat()}' if since else 'all buildings'
+        self.stdout.write(f'Checked {scope}: {len(drift)} with drifted counters.')
+        for row in drift[:options['show']]:
+            self.stdout.write(
+                f'  building {row["building_id"]}: available_houses {row["available_houses"]} -> {row["expected_available_houses"]}, '
+                f'total_count {row["total_count"]} -> {row["expected_total_count"]}'
+            )
+        if len(drift) > options['show']:
+            self.stdout.write(f'  ... and {len(drift) - options["show"]} more')
+
+        if options['dry_run']:
+            return
+        fix_occupancy_drift(drift, batch_size=options['batch_size'])
+        JobCheckpoint.objects.update_or_create(name=CHECKPOINT_NAME, defaults={'last_run_at': started_at})
+        if drift:
+            self.stdout.write(self.style.SUCCESS(f'Repaired {len(drift)} buildings.'))
+
+    def delete_pending_buildings(self, dry_run):
+        """
+        Finish the background building deletions that didn't complete, or report them on a dry run.
+        """
+        if dry_run:
+            pending = Building.objects.filter(pending_deletion=True).count()
+            if pending:
+                self.stdout.write(f'{pending} buildings pending deletion.')
+            return
+        deleted = delete_pending_buildings()
+        if deleted:
+            self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} buildings pending deletion.'))
+
+    def get_since(self, options):
+        """
+        Return the time to check changes from, or None to check every building.
+        """
+        if options['since']:
+            since = parse_datetime(options['since'])
+            if since is None:
+                raise CommandError('--since must be an ISO 8601 date and time, e.g. 2024-05-01T00:00:00.')
+            return since if timezone.is_aware(since) else timezone.make_aware(since)
+        if options['incremental']:
+            checkpoint = JobCheckpoint.objects.filter(name=CHECKPOINT_NAME).first()
+            if checkpoint:
+                return checkpoint.last_run_at - CHECKPOINT_OVERLAP
+        return None
@@ -0,0 +1,56 @@
+"""
+Management command for copying the SQLite primary database into its read replicas.
+"""
+
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from Housing.routers import get_read_replicas
+
+
+def copy_sqlite_database(source, target_path, pages=4096):
+    """
+    Copy a live SQLite connection into the database file at target_path with the online backup API.
+
+    The copy is a consistent snapshot of the source. It proceeds pages at a time, so writers on the
+    source and readers of the target are only blocked for one step at a time.
+    """
+    target = sqlite3.connect(target_path, timeout=20)
+    try:
+        source.backup(target, pages=pages)
+    finally:
+        target.close()
+
+
+class Command(BaseCommand):
+    """
+    Refresh every SQLite read replica (or the given ones) with a snapshot of the primary.
+
+    Run it periodically, e.g. from cron, to bound how far the replicas lag behind.
+    """
+    help = 'Copy the SQLite primary database into its read replicas with the backup API.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('aliases', nargs='*', help='Replica database aliases; all of HOUSING_READ_REPLICAS when omitted.')
+
+    def handle(self, *args, **options):
+        primary = connections[DEFAULT_DB_ALIAS]
+        if primary.vendor != 'sqlite':
+            raise CommandError('Replicas are only refreshed by this command on the SQLite profile.')
+        aliases = options['aliases'] or get_read_replicas()
+        if not aliases:
+            raise CommandError('No read replica configured; set HOMEHIVE_DB_REPLICAS.')
+
+        primary.ensure_connection()
+        for alias in aliases:
+            if alias not in get_read_replicas():
+                raise CommandError(f'{alias} is not a read replica.')
+            replica = connections[alias]
+            # Close this process's connection so the copy doesn't wait on it.
+            replica.close()
+            start = time.perf_counter()
+            copy_sqlite_database(primary.connection, str(replica.settings_dict['NAME']))
+            self.stdout.write(self.style.SUCCESS(f'Refreshed {alias} in {time.perf_counter() - start:.2f}s.'))
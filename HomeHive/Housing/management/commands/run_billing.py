@@ -0,0 +1,37 @@
+"""
+Management command for issuing the monthly rent invoices.
+"""
+
+import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from Housing.billing import BILLING_CHUNK_SIZE, billing_period, run_billing
+
+
+class Command(BaseCommand):
+    """
+    Invoice every tenant for a month with chunked bulk inserts, optionally over a process pool.
+
+    Running it again for the same month only invoices the tenants that were missed, e.g. those
+    added since or those of a run that was interrupted.
+    """
+    help = 'Issue the rent invoices of a month.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--period', default=datetime.date.today().strftime('%Y-%m'), help='The month to invoice, YYYY-MM; the current month by default.')
+        parser.add_argument('--chunk-size', type=int, default=BILLING_CHUNK_SIZE, help='Number of tenants invoiced per transaction.')
+        parser.add_argument('--workers', type=int, default=1, help='Number of processes invoicing chunks in parallel; only speeds up runs on PostgreSQL, SQLite serializes the writes.')
+
+    def handle(self, *args, **options):
+        try:
+            period = billing_period(options['period'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+        if options['chunk_size'] < 1 or options['workers'] < 1:
+            raise CommandError('--chunk-size and --workers must be at least 1.')
+
+        totals = run_billing(period, chunk_size=options['chunk_size'], workers=options['workers'], log=self.stderr.write)
+        self.stdout.write(self.style.SUCCESS(f'Issued {totals["invoices"]} invoices for {period:%Y-%m}.'))
+        if totals['unpriced']:
+            self.stdout.write(self.style.WARNING(f'{totals["unpriced"]} tenants have no rent rate and were not invoiced.'))
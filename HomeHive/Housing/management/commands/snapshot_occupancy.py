@@ -0,0 +1,21 @@
+"""
+Management command for snapshotting the occupancy of buildings.
+"""
+
+from django.core.management.base import BaseCommand
+
+from Housing.history import take_snapshots
+
+
+class Command(BaseCommand):
+    """
+    Snapshot the occupancy of every building with occupancy events since its latest snapshot.
+
+    Meant to run periodically, e.g. nightly, so point-in-time occupancy queries only replay the
+    events of the period since.
+    """
+    help = 'Snapshot the occupancy of buildings from their occupancy events.'
+
+    def handle(self, *args, **options):
+        taken = take_snapshots()
+        self.stdout.write(self.style.SUCCESS(f'Took {taken} occupancy snapshots.'))
@@ -0,0 +1,115 @@
+"""
+Middleware for the Housing application.
+"""
+
+import time
+from contextlib import ExitStack
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+
+from Housing.instrumentation import QueryCollector, registry
+from Housing.routers import get_read_replicas, replica_reads
+
+
+class QueryStatsMiddleware:
+    """
+    Opt-in middleware recording wall time, query count, SQL time and repeated queries per URL name.
+
+    Enabled with the HOUSING_QUERY_STATS setting. When HOUSING_QUERY_STATS_DIR is set, the
+    statistics of the process are also written there every HOUSING_QUERY_STATS_DUMP_EVERY requests
+    so the query_stats command can merge the numbers of every worker. Runs as async middleware under
+    ASGI, so requests aren't moved to a thread just to pass through it.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'HOUSING_QUERY_STATS', False):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.dump_dir = getattr(settings, 'HOUSING_QUERY_STATS_DIR', None)
+        self.dump_every = getattr(settings, 'HOUSING_QUERY_STATS_DUMP_EVERY', 100)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        collector = QueryCollector()
+        start = time.perf_counter()
+        with self.collect_queries(collector):
+            response = self.get_response(request)
+        self.record(request, start, collector)
+        return response
+
+    async def __acall__(self, request):
+        collector = QueryCollector()
+        start = time.perf_counter()
+        # Database connections belong to a thread: the wrappers go on those of the request's
+        # thread-sensitive executor thread, where its ORM calls and sync views run.
+        queries = await sync_to_async(self.collect_queries)(collector)
+        try:
+            response = await self.get_response(request)
+        finally:
+            await sync_to_async(queries.close)()
+        self.record(request, start, collector)
+        return response
+
+    def collect_queries(self, collector):
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(collector))
+        return stack
+
+    def record(self, request, start, collector):
+        wall_ms = (time.perf_counter() - start) * 1000
+        match = request.resolver_match
+        route = (match.view_name if match else None) or '<unresolved>'
+        recorded = registry.record(route, wall_ms, collector)
+        if self.dump_dir and recorded % self.dump_every == 0:
+            registry.dump(self.dump_dir)
+
+
+class ReplicaReadMiddleware:
+    """
+    Read from a replica during GET and HEAD requests (see Housing.routers.ReplicaRouter).
+
+    A request that writes sets a short-lived cookie, and while it is present the client's requests
+    read from the primary, so a redirect after a form post shows the change even when the replica
+    lags behind. Not used unless HOUSING_READ_REPLICAS lists at least one database. Runs as async
+    middleware under ASGI; the read scope is a context variable, which the ORM's executor threads see.
+    """
+    cookie_name = 'housing_read_primary'
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not get_read_replicas():
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        self.pin_seconds = getattr(settings, 'HOUSING_REPLICA_PIN_SECONDS', 5)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with replica_reads(enabled=self.use_replica(request)) as scope:
+            response = self.get_response(request)
+        return self.pin_writer(scope, response)
+
+    async def __acall__(self, request):
+        with replica_reads(enabled=self.use_replica(request)) as scope:
+            response = await self.get_response(request)
+        return self.pin_writer(scope, response)
+
+    def use_replica(self, request):
+        return request.method in ('GET', 'HEAD') and self.cookie_name not in request.COOKIES
+
+    def pin_writer(self, scope, response):
+        if scope.wrote and self.pin_seconds:
+            response.set_cookie(self.cookie_name, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.3 on 2026-10-18 19:49
+
+import logging
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+logger = logging.getLogger(__name__)
+
+
+def renumber_duplicate_house_numbers(apps, schema_editor):
+    """
+    Give every tenant sharing a house number with an earlier tenant of the same building a unique
+    number, "<number>-<tenant id>" or "#<tenant id>" if that doesn't fit, so the unique constraint
+    can be added to databases that never enforced it. The Housing.W001 check lists the duplicates
+    beforehand.
+    """
+    Tenant = apps.get_model('Housing', 'Tenant')
+    duplicates = (Tenant.objects.values('building_id', 'house_number').annotate(tenants=Count('id'))
+                  .filter(tenants__gt=1).order_by('building_id', 'house_number'))
+    for duplicate in duplicates:
+        taken = set(Tenant.objects.filter(building_id=duplicate['building_id']).values_list('house_number', flat=True))
+        tenants = Tenant.objects.filter(building_id=duplicate['building_id'], house_number=duplicate['house_number']).order_by('pk')
+        for tenant in list(tenants)[1:]:
+            number = f'{tenant.house_number}-{tenant.pk}'
+            if len(number) > 10 or number in taken:
+                number = f'#{tenant.pk}'
+            logger.warning('Tenant %s of building %s shared house number %r, renumbered to %r.',
+                           tenant.pk, tenant.building_id, tenant.house_number, number)
+            taken.add(number)
+            Tenant.objects.filter(pk=tenant.pk).update(house_number=number)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0010_alter_building_total_number_of_houses'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='caretaker',
+            name='building',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='caretaker', to='Housing.building'),
+        ),
+        migrations.AlterField(
+            model_name='caretaker',
+            name='name',
+            field=models.CharField(max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='caretaker',
+            name='phone_number',
+            field=models.CharField(max_length=20, validators=[django.core.validators.RegexValidator(message='Invalid phone number format (XXX-XXX-XXXX)', regex='\\d{10}')]),
+        ),
+        migrations.AlterField(
+            model_name='tenant',
+            name='building',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tenants', to='Housing.building'),
+        ),
+        migrations.AlterField(
+            model_name='tenant',
+            name='house_number',
+            field=models.CharField(max_length=10),
+        ),
+        migrations.AlterField(
+            model_name='tenant',
+            name='number_of_people',
+            field=models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.AlterField(
+            model_name='tenant',
+            name='number_of_rooms',
+            field=models.PositiveIntegerField(validators=[django.core.validators.MinValueValidator(1)]),
+        ),
+        migrations.RunPython(renumber_duplicate_house_numbers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='tenant',
+            constraint=models.UniqueConstraint(fields=('building', 'house_number'), name='unique_house_number_per_building'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+from django.db import migrations
+
+from Housing.search import install_search_index, rebuild_search_index, uninstall_search_index
+
+
+def create_search_index(apps, schema_editor):
+    if install_search_index(schema_editor.connection.alias):
+        rebuild_search_index(schema_editor.connection.alias)
+
+
+def drop_search_index(apps, schema_editor):
+    uninstall_search_index(schema_editor.connection.alias)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0011_tenant_unique_house_number_per_building'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.3 on 2026-10-18 19:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0012_tenant_search'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='building',
+            index=models.Index(fields=['building_name', 'id'], name='building_name_id_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.0.3 on 2026-10-18 19:59
+
+from django.db import migrations, models
+
+from Housing.choices import AmenityChoices
+
+
+def merge_duplicate_amenities(apps, schema_editor):
+    """
+    Point buildings at the oldest amenity of each name and delete the duplicates.
+    """
+    Amenity = apps.get_model('Housing', 'Amenity')
+    Through = apps.get_model('Housing', 'Building').amenities.through
+    keep = {}
+    for pk, name in Amenity.objects.order_by('pk').values_list('pk', 'name'):
+        if name not in keep:
+            keep[name] = pk
+            continue
+        linked = set(Through.objects.filter(amenity_id=keep[name]).values_list('building_id', flat=True))
+        Through.objects.filter(amenity_id=pk).exclude(building_id__in=linked).update(amenity_id=keep[name])
+        Amenity.objects.filter(pk=pk).delete()
+
+
+def seed_amenity_catalog(apps, schema_editor):
+    Amenity = apps.get_model('Housing', 'Amenity')
+    Amenity.objects.bulk_create([Amenity(name=name) for name, _ in AmenityChoices.CHOICES], ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0013_building_name_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_amenities, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='amenity',
+            name='name',
+            field=models.CharField(max_length=100, unique=True),
+        ),
+        migrations.RunPython(seed_amenity_catalog, migrations.RunPython.noop),
+    ]
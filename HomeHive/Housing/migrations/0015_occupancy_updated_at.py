@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:03
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0014_amenity_name_unique'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('last_run_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now(), db_index=True),
+        ),
+        migrations.AddField(
+            model_name='tenant',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_default=django.db.models.functions.datetime.Now(), db_index=True),
+        ),
+    ]
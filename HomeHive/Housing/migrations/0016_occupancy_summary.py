@@ -0,0 +1,53 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce
+
+
+def populate_summary(apps, schema_editor):
+    """
+    Fill the summary table with one row per existing building.
+    """
+    Building = apps.get_model('Housing', 'Building')
+    Summary = apps.get_model('Housing', 'BuildingOccupancySummary')
+    rows = Building.objects.using(schema_editor.connection.alias).order_by().values(
+        'pk', 'owner', 'location', 'total_number_of_houses',
+    ).annotate(
+        occupied=Count('tenants'),
+        people=Coalesce(Sum('tenants__number_of_people'), 0),
+        rooms=Coalesce(Sum('tenants__number_of_rooms'), 0),
+    )
+    Summary.objects.using(schema_editor.connection.alias).bulk_create((
+        Summary(building_id=row['pk'], owner=row['owner'], location=row['location'],
+                total_houses=row['total_number_of_houses'], occupied_houses=row['occupied'],
+                total_people=row['people'], total_rooms=row['rooms'])
+        for row in rows.iterator()
+    ), batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0015_occupancy_updated_at'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BuildingOccupancySummary',
+            fields=[
+                ('building', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='occupancy_summary', serialize=False, to='Housing.building')),
+                ('owner', models.CharField(max_length=255)),
+                ('location', models.CharField(max_length=255)),
+                ('total_houses', models.PositiveIntegerField(default=0)),
+                ('occupied_houses', models.PositiveIntegerField(default=0)),
+                ('total_people', models.PositiveIntegerField(default=0)),
+                ('total_rooms', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['owner'], name='occupancy_summary_owner_idx'), models.Index(fields=['location'], name='occupancy_summary_loc_idx')],
+            },
+        ),
+        migrations.RunPython(populate_summary, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:33
+
+import logging
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+logger = logging.getLogger(__name__)
+
+
+def populate_units(apps, schema_editor):
+    """
+    Create the units of every existing building and assign them to its tenants by house number.
+
+    Tenants whose house numbers outnumber the vacant generated numbers get units past the house
+    count, which stay until the tenant leaves, as when a building shrinks under its tenants.
+    """
+    alias = schema_editor.connection.alias
+    Building = apps.get_model('Housing', 'Building')
+    Tenant = apps.get_model('Housing', 'Tenant')
+    Unit = apps.get_model('Housing', 'Unit')
+    buildings = list(Building.objects.using(alias).order_by('pk').values_list('pk', 'total_number_of_houses'))
+    for offset in range(0, len(buildings), 1000):
+        batch = dict(buildings[offset:offset + 1000])
+        tenants = {}
+        for building_id, house_number, pk in Tenant.objects.using(alias).filter(building_id__in=batch).values_list(
+                'building_id', 'house_number', 'pk').iterator():
+            tenants.setdefault(building_id, {})[house_number] = pk
+        units = []
+        for building_id, total in batch.items():
+            taken = tenants.get(building_id, {})
+            numbers = [str(position) for position in range(1, total + 1)]
+            # House numbers outside 1..total replace the first vacant generated numbers, as Housing.units.claim_unit does.
+            generated = set(numbers)
+            strays = [number for number in taken if number not in generated][::-1]
+            for index in range(total):
+                if not strays:
+                    break
+                if numbers[index] not in taken:
+                    numbers[index] = strays.pop()
+            if strays:
+                logger.warning('Building %s has %d more tenants than houses; their units extend the numbering.',
+                               building_id, len(strays))
+                numbers.extend(reversed(strays))
+            units.extend(Unit(building_id=building_id, position=position, number=number, tenant_id=taken.get(number))
+                         for position, number in enumerate(numbers, start=1))
+        Unit.objects.using(alias).bulk_create(units, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0016_occupancy_summary'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Unit',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.CharField(max_length=10)),
+                ('position', models.PositiveIntegerField()),
+                ('building', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='units', to='Housing.building')),
+                ('tenant', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='units', to='Housing.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('tenant__isnull', True)), fields=['building', 'position'], name='unit_vacancy_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='unit',
+            constraint=models.UniqueConstraint(fields=('building', 'number'), name='unique_unit_number_per_building'),
+        ),
+        migrations.AddConstraint(
+            model_name='unit',
+            constraint=models.UniqueConstraint(fields=('building', 'position'), name='unique_unit_position_per_building'),
+        ),
+        migrations.AddConstraint(
+            model_name='unit',
+            constraint=models.UniqueConstraint(condition=models.Q(('tenant__isnull', False)), fields=('tenant',), name='unique_unit_per_tenant'),
+        ),
+        migrations.RunPython(populate_units, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:35
+
+from django.db import migrations, models
+from django.db.models import Case, OuterRef, Subquery, Sum, Value, When
+from django.db.models.functions import Coalesce
+
+from Housing.choices import AmenityChoices
+
+
+def populate_amenity_masks(apps, schema_editor):
+    """
+    Set the amenity mask of every existing building from its amenity links.
+    """
+    alias = schema_editor.connection.alias
+    Building = apps.get_model('Housing', 'Building')
+    bits = Case(*(When(amenity__name=name, then=Value(1 << index)) for index, (name, _) in enumerate(AmenityChoices.CHOICES)),
+                default=Value(0))
+    masks = (Building.amenities.through.objects.using(alias).filter(building_id=OuterRef('pk')).order_by()
+             .values('building_id').annotate(mask=Sum(bits)).values('mask'))
+    Building.objects.using(alias).update(amenity_mask=Coalesce(Subquery(masks), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0017_unit'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='building',
+            name='amenity_mask',
+            field=models.PositiveIntegerField(db_default=0, default=0),
+        ),
+        migrations.RunPython(populate_amenity_masks, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0018_building_amenity_mask'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='building',
+            name='grid_cell',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='latitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='building',
+            name='longitude',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='building',
+            index=models.Index(fields=['grid_cell', 'latitude', 'longitude'], name='building_grid_idx'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:51
+
+import django.db.models.deletion
+import django.db.models.functions.comparison
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0019_building_coordinates'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RentRate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('base_amount', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('per_room', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('per_person', models.DecimalField(decimal_places=2, default=0, max_digits=10)),
+                ('building', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rent_rates', to='Housing.building')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Invoice',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period', models.DateField()),
+                ('house_number', models.CharField(max_length=10)),
+                ('number_of_rooms', models.PositiveIntegerField()),
+                ('number_of_people', models.PositiveIntegerField()),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('issued_at', models.DateTimeField(db_default=django.db.models.functions.datetime.Now())),
+                ('building', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoices', to='Housing.building')),
+                ('tenant', models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='invoices', to='Housing.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['period', 'building'], name='invoice_period_building_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='invoice',
+            constraint=models.UniqueConstraint(fields=('tenant', 'period'), name='unique_invoice_per_tenant_period'),
+        ),
+        migrations.AddConstraint(
+            model_name='rentrate',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('building', models.Value(0)), name='unique_rent_rate_per_building'),
+        ),
+    ]
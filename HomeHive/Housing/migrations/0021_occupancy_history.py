@@ -0,0 +1,64 @@
+# Generated by Django 5.0.3 on 2026-10-18 20:57
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+
+def record_baseline(apps, schema_editor):
+    """
+    Start the occupancy log of every building with tenants with one event moving them all in.
+    """
+    alias = schema_editor.connection.alias
+    Tenant = apps.get_model('Housing', 'Tenant')
+    OccupancyEvent = apps.get_model('Housing', 'OccupancyEvent')
+    now = timezone.now()
+    occupancy = (Tenant.objects.using(alias).order_by().values('building_id')
+                 .annotate(occupied=Count('pk'), people=Sum('number_of_people')))
+    OccupancyEvent.objects.using(alias).bulk_create([
+        OccupancyEvent(building_id=row['building_id'], kind='move_in', occupied_delta=row['occupied'],
+                       people_delta=row['people'], occurred_at=now)
+        for row in occupancy.iterator()
+    ], batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0020_rent_invoices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OccupancySnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('occupied_houses', models.IntegerField(default=0)),
+                ('total_people', models.IntegerField(default=0)),
+                ('building', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Housing.building')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='OccupancyEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('move_in', 'Move in'), ('move_out', 'Move out'), ('change', 'Household change')], max_length=10)),
+                ('occupied_delta', models.IntegerField(default=0)),
+                ('people_delta', models.IntegerField(default=0)),
+                ('occurred_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('building', models.ForeignKey(db_constraint=False, db_index=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Housing.building')),
+                ('tenant', models.ForeignKey(blank=True, db_constraint=False, db_index=False, null=True, on_delete=django.db.models.deletion.DO_NOTHING, related_name='+', to='Housing.tenant')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['building', 'occurred_at'], name='occupancy_event_replay_idx'), models.Index(fields=['occurred_at'], name='occupancy_event_time_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='occupancysnapshot',
+            constraint=models.UniqueConstraint(fields=('building', 'taken_at'), name='unique_occupancy_snapshot'),
+        ),
+        migrations.RunPython(record_baseline, migrations.RunPython.noop),
+    ]
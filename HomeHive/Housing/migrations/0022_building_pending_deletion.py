@@ -0,0 +1,22 @@
+# Generated by Django 5.0.3 on 2026-10-18 21:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('Housing', '0021_occupancy_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='building',
+            name='pending_deletion',
+            field=models.BooleanField(db_default=False, default=False),
+        ),
+        migrations.AddIndex(
+            model_name='building',
+            index=models.Index(condition=models.Q(('pending_deletion', True)), fields=['id'], name='building_pending_deletion_idx'),
+        ),
+    ]
@@ -1,7 +1,10 @@
 from email.policy import default
 from django.db import models
+from django.utils import timezone
+from django.db.models.functions import Coalesce, Now
 from django.core.validators import RegexValidator, MinValueValidator
 
+from Housing.transactions import write_atomic
 from Housing.validators import validate_available_houses
 class Building(models.Model):
     """
@@ -14,6 +17,12 @@ class Building(models.Model):
         total_number_of_houses (int): The total number of houses in the building. Must be greater than or equal to 1.
         available_houses (int): The number of available houses in the building. Initially set to total_number_of_houses.
         amenities (ManyToManyField): The amenities available in the building.
+        amenity_mask (int): The amenities as a bitmask, one bit per AmenityChoices entry, for fast filtering.
+        latitude (float): The latitude of the building, if its location could be geocoded.
+        longitude (float): The longitude of the building, if its location could be geocoded.
+        grid_cell (int): The spatial grid cell of the coordinates, for proximity search.
+        updated_at (datetime): When the building or its occupancy counters last changed.
+        pending_deletion (bool): Whether the building is being deleted in the background.
     """
     building_name = models.CharField(max_length=255, null=False, blank=False, default='HomeHive')
     owner = models.CharField(max_length=255, null=False, blank=False)
@@ -21,6 +30,26 @@ class Building(models.Model):
     total_number_of_houses = models.PositiveIntegerField(validators=[MinValueValidator(1)])
     available_houses = models.PositiveIntegerField()
     amenities = models.ManyToManyField('Amenity', blank=True)
+    # One bit per AmenityChoices entry, kept in step with amenities by Housing.amenities.
+    amenity_mask = models.PositiveIntegerField(default=0, db_default=0)
+    # Filled from the gazetteer by Housing.geo; grid_cell is the spatial index key of the coordinates.
+    latitude = models.FloatField(null=True, blank=True)
+    longitude = models.FloatField(null=True, blank=True)
+    grid_cell = models.BigIntegerField(null=True, blank=True)
+    # db_default keeps rows written with raw SQL or bulk inserts stamped as well.
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now(), db_index=True)
+    # Set until a background deletion finishes, so an interrupted one is picked up again (see Housing.services).
+    pending_deletion = models.BooleanField(default=False, db_default=False)
+
+    class Meta:
+        indexes = [
+            # Finds the buildings whose background deletion hasn't finished.
+            models.Index(fields=['id'], condition=models.Q(pending_deletion=True), name='building_pending_deletion_idx'),
+            # Serves the keyset pagination of the building listing.
+            models.Index(fields=['building_name', 'id'], name='building_name_id_idx'),
+            # Proximity search; covers the coordinates so candidates are read from the index alone.
+            models.Index(fields=['grid_cell', 'latitude', 'longitude'], name='building_grid_idx'),
+        ]
 
     def __str__(self):
         """
@@ -46,9 +75,9 @@ class Amenity(models.Model):
     Represents an amenity available in a building.
 
     Attributes:
-        name (str): The name of the amenity.
+        name (str): The name of the amenity, one of the keys of AmenityChoices.CHOICES. Unique.
     """
-    name = models.CharField(max_length=100)
+    name = models.CharField(max_length=100, unique=True)
 
     def __str__(self):
         """
@@ -70,6 +99,7 @@ class Tenant(models.Model):
         building (ForeignKey): The building where the tenant resides.
         number_of_rooms (int): The number of rooms occupied by the tenant. Must be greater than or equal to 1.
         number_of_people (int): The number of people living in the tenant's house. Must be greater than or equal to 1.
+        updated_at (datetime): When the tenant was last created or changed.
     """
     name = models.CharField(max_length=20)
     house_number = models.CharField(max_length=10)
@@ -80,6 +110,13 @@ class Tenant(models.Model):
     building = models.ForeignKey('Building', on_delete=models.CASCADE, related_name='tenants', null=False, blank=False)
     number_of_rooms = models.PositiveIntegerField(validators=[MinValueValidator(1)], null=False, blank=False)
     number_of_people = models.PositiveIntegerField(validators=[MinValueValidator(1)], null=False, blank=False)
+    updated_at = models.DateTimeField(auto_now=True, db_default=Now(), db_index=True)
+
+    class Meta:
+        constraints = [
+            # Also serves as the index for looking up a tenant by house number within a building.
+            models.UniqueConstraint(fields=['building', 'house_number'], name='unique_house_number_per_building'),
+        ]
 
     def __str__(self):
         """
@@ -90,6 +127,71 @@ class Tenant(models.Model):
         """
         return self.name
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """
+        Custom loading method that remembers the stored building, household and rooms of the tenant,
+        so an update can record how it changed the occupancy (see Housing.history and Housing.signals).
+        """
+        tenant = super().from_db(db, field_names, values)
+        tenant._stored_occupancy = tuple(tenant.__dict__.get(name) for name in ('building_id', 'number_of_people', 'number_of_rooms'))
+        return tenant
+
+    def save(self, *args, **kwargs):
+        """
+        Custom save method that runs the insert or update and the occupancy counter signals in one transaction.
+        """
+        with write_atomic(using=kwargs.get('using')):
+            super(Tenant, self).save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        """
+        Custom delete method that runs the delete and the occupancy counter signals in one transaction.
+        """
+        with write_atomic(using=kwargs.get('using')):
+            return super(Tenant, self).delete(*args, **kwargs)
+
+class Unit(models.Model):
+    """
+    Represents one house of a building, the unit of the vacancy index.
+
+    A building has one unit per house, numbered "1" to total_number_of_houses unless a tenant's
+    house number took the place of a generated one. Units are kept in step with the buildings and
+    tenants by Housing.units.
+
+    Attributes:
+        building (ForeignKey): The building the unit belongs to.
+        number (str): The house number of the unit. Unique within the building.
+        position (int): The order of the unit within the building, from 1. Unique within the building.
+        tenant (ForeignKey): The tenant occupying the unit, at most one unit per tenant; null while the unit is vacant.
+    """
+    building = models.ForeignKey('Building', on_delete=models.CASCADE, related_name='units')
+    number = models.CharField(max_length=10)
+    position = models.PositiveIntegerField()
+    # Not a OneToOneField: a unique index on the nullable column would make "tenant IS NULL" look
+    # like a single-row lookup to the query planner, which then skips the vacancy index.
+    tenant = models.ForeignKey('Tenant', on_delete=models.SET_NULL, null=True, blank=True, related_name='units', db_index=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['building', 'number'], name='unique_unit_number_per_building'),
+            models.UniqueConstraint(fields=['building', 'position'], name='unique_unit_position_per_building'),
+            models.UniqueConstraint(fields=['tenant'], condition=models.Q(tenant__isnull=False), name='unique_unit_per_tenant'),
+        ]
+        indexes = [
+            # Only vacant units are indexed, so finding the next free unit is one index probe.
+            models.Index(fields=['building', 'position'], condition=models.Q(tenant__isnull=True), name='unit_vacancy_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the Unit object.
+
+        Returns:
+            str: A string representation of the Unit object.
+        """
+        return f"Unit {self.number} of building {self.building_id}"
+
 class TotalTenants(models.Model):
     """
     Represents the total count of tenants in a building.
@@ -131,4 +233,217 @@ class Caretaker(models.Model):
         Returns:
             str: A string representation of the Caretaker object.
         """
-        return f"Caretaker: {self.name}"
\ No newline at end of file
+        return f"Caretaker: {self.name}"
+
+class BuildingOccupancySummary(models.Model):
+    """
+    Materialized occupancy figures of one building, the source of the portfolio analytics page.
+
+    Kept current by the Tenant and Building signals and rebuilt in bulk by Housing.analytics.
+
+    Attributes:
+        building (OneToOneField): The summarized building; also the primary key.
+        owner (str): Copy of Building.owner, so owners can be grouped without a join.
+        location (str): Copy of Building.location, so locations can be grouped without a join.
+        total_houses (int): Copy of Building.total_number_of_houses.
+        occupied_houses (int): The number of tenants of the building.
+        total_people (int): The sum of number_of_people over the tenants of the building.
+        total_rooms (int): The sum of number_of_rooms over the tenants of the building.
+    """
+    building = models.OneToOneField(Building, on_delete=models.CASCADE, primary_key=True, related_name='occupancy_summary')
+    owner = models.CharField(max_length=255)
+    location = models.CharField(max_length=255)
+    total_houses = models.PositiveIntegerField(default=0)
+    occupied_houses = models.PositiveIntegerField(default=0)
+    total_people = models.PositiveIntegerField(default=0)
+    total_rooms = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['owner'], name='occupancy_summary_owner_idx'),
+            models.Index(fields=['location'], name='occupancy_summary_loc_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the BuildingOccupancySummary object.
+
+        Returns:
+            str: A string representation of the BuildingOccupancySummary object.
+        """
+        return f"Occupancy of building {self.building_id}: {self.occupied_houses}/{self.total_houses} houses"
+
+class JobCheckpoint(models.Model):
+    """
+    Records when a maintenance job last completed, so the next run can process only what changed since.
+
+    Attributes:
+        name (str): The name of the job. Unique.
+        last_run_at (datetime): When the last successful run started.
+    """
+    name = models.CharField(max_length=100, unique=True)
+    last_run_at = models.DateTimeField()
+
+    def __str__(self):
+        """
+        Returns a string representation of the JobCheckpoint object.
+
+        Returns:
+            str: A string representation of the JobCheckpoint object.
+        """
+        return f"{self.name} last run at {self.last_run_at}"
+
+class RentRate(models.Model):
+    """
+    The monthly rent of the tenants of a building; the rate without a building applies to every
+    building that has no rate of its own.
+
+    A tenant is charged base_amount + per_room * number_of_rooms + per_person * number_of_people.
+
+    Attributes:
+        building (ForeignKey): The building the rate applies to, or None for the default rate.
+        base_amount (Decimal): The fixed monthly amount per house.
+        per_room (Decimal): The monthly amount per room of the house.
+        per_person (Decimal): The monthly amount per person living in the house.
+    """
+    building = models.ForeignKey(Building, on_delete=models.CASCADE, null=True, blank=True, related_name='rent_rates')
+    base_amount = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    per_room = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+    per_person = models.DecimalField(max_digits=10, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # One rate per building and a single default rate (building IDs start at 1).
+            models.UniqueConstraint(Coalesce('building', models.Value(0)), name='unique_rent_rate_per_building'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the RentRate object.
+
+        Returns:
+            str: A string representation of the RentRate object.
+        """
+        return f"Rent rate of building {self.building_id or 'default'}"
+
+class Invoice(models.Model):
+    """
+    The rent invoice of a tenant for one month, issued by the billing run (Housing.billing).
+
+    The house, rooms and people are copied from the tenant when the invoice is issued, and the
+    invoice is kept when the tenant moves out or the building is deleted.
+
+    Attributes:
+        tenant (ForeignKey): The invoiced tenant; None once the tenant is deleted.
+        building (ForeignKey): The building of the tenant when invoiced; None once it is deleted.
+        period (date): The first day of the invoiced month.
+        house_number (str): The house number of the tenant when invoiced.
+        number_of_rooms (int): The number of rooms charged for.
+        number_of_people (int): The number of people charged for.
+        amount (Decimal): The rent due.
+        issued_at (datetime): When the invoice was created.
+    """
+    # Indexed by the unique (tenant, period) constraint.
+    tenant = models.ForeignKey(Tenant, on_delete=models.SET_NULL, null=True, blank=True, related_name='invoices', db_index=False)
+    building = models.ForeignKey(Building, on_delete=models.SET_NULL, null=True, blank=True, related_name='invoices')
+    period = models.DateField()
+    house_number = models.CharField(max_length=10)
+    number_of_rooms = models.PositiveIntegerField()
+    number_of_people = models.PositiveIntegerField()
+    amount = models.DecimalField(max_digits=12, decimal_places=2)
+    issued_at = models.DateTimeField(db_default=Now())
+
+    class Meta:
+        constraints = [
+            # Makes billing runs idempotent; also the index of the "already invoiced" check.
+            models.UniqueConstraint(fields=['tenant', 'period'], name='unique_invoice_per_tenant_period'),
+        ]
+        indexes = [
+            models.Index(fields=['period', 'building'], name='invoice_period_building_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the Invoice object.
+
+        Returns:
+            str: A string representation of the Invoice object.
+        """
+        return f"Invoice of tenant {self.tenant_id} for {self.period:%Y-%m}: {self.amount}"
+
+class OccupancyEvent(models.Model):
+    """
+    One entry of the append-only occupancy log: a change of the occupied houses and people of a building.
+
+    Events are written in the transaction of the tenant change they record (see Housing.history).
+    They refer to buildings and tenants without foreign key constraints, so the history of deleted
+    buildings and tenants is kept.
+
+    Attributes:
+        building (ForeignKey): The building whose occupancy changed.
+        tenant (ForeignKey): The tenant concerned; None for changes of several tenants at once.
+        kind (str): MOVE_IN, MOVE_OUT or CHANGE (of the number of people).
+        occupied_delta (int): The change of the number of occupied houses.
+        people_delta (int): The change of the number of people.
+        occurred_at (datetime): When the change was made.
+    """
+    MOVE_IN = 'move_in'
+    MOVE_OUT = 'move_out'
+    CHANGE = 'change'
+    KIND_CHOICES = [(MOVE_IN, 'Move in'), (MOVE_OUT, 'Move out'), (CHANGE, 'Household change')]
+
+    building = models.ForeignKey(Building, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    tenant = models.ForeignKey(Tenant, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, null=True, blank=True, related_name='+')
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    occupied_delta = models.IntegerField(default=0)
+    people_delta = models.IntegerField(default=0)
+    occurred_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        indexes = [
+            # Serves replaying the events of a building since a snapshot.
+            models.Index(fields=['building', 'occurred_at'], name='occupancy_event_replay_idx'),
+            models.Index(fields=['occurred_at'], name='occupancy_event_time_idx'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the OccupancyEvent object.
+
+        Returns:
+            str: A string representation of the OccupancyEvent object.
+        """
+        return f"{self.get_kind_display()} in building {self.building_id} at {self.occurred_at}"
+
+class OccupancySnapshot(models.Model):
+    """
+    The occupancy of a building at a point in time: the sum of its events up to then.
+
+    Point-in-time queries start from the latest snapshot before the requested time and replay
+    only the events since. Events older than the compaction horizon are folded into snapshots.
+
+    Attributes:
+        building (ForeignKey): The building; kept after the building is deleted.
+        taken_at (datetime): The point in time the figures describe.
+        occupied_houses (int): The number of occupied houses at taken_at.
+        total_people (int): The number of people living in the building at taken_at.
+    """
+    building = models.ForeignKey(Building, on_delete=models.DO_NOTHING, db_constraint=False, db_index=False, related_name='+')
+    taken_at = models.DateTimeField()
+    occupied_houses = models.IntegerField(default=0)
+    total_people = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index for finding the latest snapshot of a building before a point in time.
+            models.UniqueConstraint(fields=['building', 'taken_at'], name='unique_occupancy_snapshot'),
+        ]
+
+    def __str__(self):
+        """
+        Returns a string representation of the OccupancySnapshot object.
+
+        Returns:
+            str: A string representation of the OccupancySnapshot object.
+        """
+        return f"Occupancy of building {self.building_id} at {self.taken_at}: {self.occupied_houses} houses, {self.total_people} people"
@@ -0,0 +1,104 @@
+"""
+Keyset (cursor) pagination helpers.
+
+Instead of OFFSET, each page continues after the ordering key of the last row of the previous
+page, so every page is a bounded index range scan no matter how deep the client scrolls.
+"""
+
+import base64
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+
+class InvalidCursor(ValueError):
+    """
+    Raised when a pagination cursor can't be decoded.
+    """
+
+
+def encode_cursor(values):
+    """
+    Encode the ordering key of a row as an opaque, URL-safe cursor.
+    """
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, length):
+    """
+    Decode a cursor created by encode_cursor into its list of key values.
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, UnicodeError) as exc:
+        raise InvalidCursor('Malformed cursor') from exc
+    if not isinstance(values, list) or len(values) != length:
+        raise InvalidCursor('Malformed cursor')
+    return values
+
+
+def _cursor_values(model, ordering, values):
+    """
+    Convert the decoded key values of a cursor to the Python types of their ordering fields.
+
+    :raises InvalidCursor: If a value is missing or doesn't fit its field.
+    """
+    converted = []
+    for field_name, value in zip(ordering, values):
+        if value is None or not isinstance(value, (str, int, float)):
+            raise InvalidCursor('Malformed cursor')
+        try:
+            field = model._meta.pk if field_name == 'pk' else model._meta.get_field(field_name)
+            converted.append(field.to_python(value))
+        except (FieldDoesNotExist, ValidationError, ValueError, TypeError) as exc:
+            raise InvalidCursor('Malformed cursor') from exc
+    return converted
+
+
+def keyset_queryset(queryset, ordering, cursor=None):
+    """
+    Order a queryset by ascending ordering fields and keep only the rows after a cursor.
+
+    The last ordering field must be unique (normally the primary key) so the order is total.
+
+    :raises InvalidCursor: If the cursor can't be decoded or its values don't fit the ordering fields.
+    """
+    queryset = queryset.order_by(*ordering)
+    if cursor:
+        values = _cursor_values(queryset.model, ordering, decode_cursor(cursor, len(ordering)))
+        # (a, b) > (x, y)  <=>  a > x OR (a = x AND b > y), which the index on the ordering fields can serve.
+        after = Q()
+        for position, field in enumerate(ordering):
+            equal = {ordering[i]: values[i] for i in range(position)}
+            after |= Q(**equal, **{f'{field}__gt': values[position]})
+        queryset = queryset.filter(after)
+    return queryset
+
+
+def keyset_result(rows, ordering, page_size):
+    """
+    Cut the page_size + 1 rows fetched for a page down to the page and build the next cursor.
+
+    :return: A tuple (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if len(rows) <= page_size:
+        return rows, None
+    rows = rows[:page_size]
+    last = rows[-1]
+    key = [last[field] if isinstance(last, dict) else getattr(last, field) for field in ordering]
+    return rows, encode_cursor(key)
+
+
+def keyset_page(queryset, ordering, cursor=None, page_size=20):
+    """
+    Return one page of a queryset ordered by ascending ordering fields, starting after a cursor.
+
+    :param queryset: The queryset to paginate.
+    :param ordering: A tuple of field names, e.g. ('building_name', 'id'); the last one must be unique.
+    :param cursor: The cursor returned with the previous page, or None for the first page.
+    :param page_size: The maximum number of rows in the page.
+    :return: A tuple (rows, next_cursor); next_cursor is None on the last page.
+    """
+    rows = list(keyset_queryset(queryset, ordering, cursor)[:page_size + 1])
+    return keyset_result(rows, ordering, page_size)
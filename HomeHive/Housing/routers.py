@@ -0,0 +1,104 @@
+"""
+Database router sending the reads of safe requests to read replicas.
+
+Replicas are the aliases listed in the HOUSING_READ_REPLICAS setting. ReplicaReadMiddleware
+opens a replica read scope for every GET and HEAD request, and inside that scope the router sends
+reads to one replica picked for the whole request. Everything else reads from the primary:
+
+* every request that isn't in a replica read scope (POST, management commands, tests);
+* the rest of a request after its first write, so it reads its own writes;
+* reads inside a transaction on the primary;
+* reads through an object loaded from a given database, such as related managers and prefetches.
+
+Writes and migrations always go to the primary.
+"""
+
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class ReplicaReadScope:
+    """
+    The replica reads of one request: the chosen replica (None to read from the primary) and
+    whether the request wrote already.
+    """
+
+    def __init__(self, replica):
+        self.replica = replica
+        self.wrote = False
+
+
+# A mutable scope object, so a write seen in a thread that sync_to_async copied the context to
+# still pins the rest of the request to the primary.
+_scope = ContextVar('housing_replica_read_scope', default=None)
+
+
+def get_read_replicas():
+    return list(getattr(settings, 'HOUSING_READ_REPLICAS', []))
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """
+    Send the reads inside the block to a randomly chosen replica, until the first write.
+
+    :param enabled: When False, or when no replica is configured, reads stay on the primary and
+                    the scope only records whether the block wrote.
+    :yield: The ReplicaReadScope of the block.
+    """
+    replicas = get_read_replicas()
+    scope = ReplicaReadScope(random.choice(replicas) if enabled and replicas else None)
+    token = _scope.set(scope)
+    try:
+        yield scope
+    finally:
+        _scope.reset(token)
+
+
+@contextmanager
+def primary_reads():
+    """
+    Send the reads inside the block to the primary, e.g. to fill a cache that must not lag behind writes.
+    """
+    token = _scope.set(None)
+    try:
+        yield
+    finally:
+        _scope.reset(token)
+
+
+class ReplicaRouter:
+    """
+    Route reads inside a replica read scope to its replica and everything else to the primary.
+    """
+
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            return instance._state.db
+        scope = _scope.get()
+        if scope is None or scope.replica is None or scope.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return scope.replica
+
+    def db_for_write(self, model, **hints):
+        scope = _scope.get()
+        if scope is not None:
+            scope.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *get_read_replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas receive their schema from the primary.
+        if db in get_read_replicas():
+            return False
+        return None
@@ -0,0 +1,141 @@
+"""
+Full-text tenant search backed by an SQLite FTS5 index.
+
+The index is an external-content FTS5 table over the Tenant table. Triggers keep it in sync with
+every insert, update and delete, including bulk_create and queryset deletes that bypass signals.
+On other database backends the search falls back to plain ORM lookups.
+"""
+
+import re
+
+from django.db import connection, connections
+from django.db.models import Q
+
+from Housing.models import Tenant
+
+SEARCH_TABLE = 'housing_tenant_search'
+SEARCH_FIELDS = ('name', 'phone_number', 'house_number')
+# bm25() weights per column: a name hit ranks above a phone or house number hit.
+SEARCH_WEIGHTS = (10.0, 5.0, 5.0)
+
+
+def _trigger_sql(tenant_table):
+    columns = ', '.join(SEARCH_FIELDS)
+    new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+    old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+    delete_old = (f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}, rowid, {columns}) "
+                  f"VALUES ('delete', old.id, {old_values});")
+    insert_new = f'INSERT INTO {SEARCH_TABLE}(rowid, {columns}) VALUES (new.id, {new_values});'
+    return [
+        f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ai AFTER INSERT ON "{tenant_table}" BEGIN {insert_new} END',
+        f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_ad AFTER DELETE ON "{tenant_table}" BEGIN {delete_old} END',
+        f'CREATE TRIGGER IF NOT EXISTS {SEARCH_TABLE}_au AFTER UPDATE ON "{tenant_table}" BEGIN {delete_old} {insert_new} END',
+    ]
+
+
+def install_search_index(using='default'):
+    """
+    Create the FTS5 table and its sync triggers if they don't exist yet.
+
+    Safe to call repeatedly. It runs after every migrate because SQLite drops the triggers whenever
+    a migration rebuilds the Tenant table.
+
+    :return: True if the FTS5 table was created by this call and needs a rebuild.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return False
+    tenant_table = Tenant._meta.db_table
+    with conn.cursor() as cursor:
+        created = SEARCH_TABLE not in conn.introspection.table_names(cursor)
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SEARCH_TABLE} USING fts5("
+            f"{', '.join(SEARCH_FIELDS)}, content='{tenant_table}', content_rowid='id', "
+            f"tokenize='unicode61')"
+        )
+        for statement in _trigger_sql(tenant_table):
+            cursor.execute(statement)
+    return created
+
+
+def uninstall_search_index(using='default'):
+    """
+    Drop the FTS5 table and its triggers.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    with conn.cursor() as cursor:
+        for suffix in ('ai', 'ad', 'au'):
+            cursor.execute(f'DROP TRIGGER IF EXISTS {SEARCH_TABLE}_{suffix}')
+        cursor.execute(f'DROP TABLE IF EXISTS {SEARCH_TABLE}')
+
+
+def rebuild_search_index(using='default'):
+    """
+    Regenerate the whole FTS5 index from the Tenant table and merge its segments.
+    """
+    conn = connections[using]
+    if conn.vendor != 'sqlite':
+        return
+    install_search_index(using)
+    with conn.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('rebuild')")
+        cursor.execute(f"INSERT INTO {SEARCH_TABLE}({SEARCH_TABLE}) VALUES ('optimize')")
+
+
+def build_match_expression(text):
+    """
+    Turn free text into an FTS5 query where every word is matched as a prefix.
+
+    Words are quoted so FTS5 operators and punctuation typed by users are searched literally.
+    """
+    tokens = re.findall(r'\w+', text)
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def search_tenants(text, building_id=None, page=1, page_size=20):
+    """
+    Search tenants by partial name, phone number or house number.
+
+    :param text: The text typed by the user.
+    :param building_id: Optional building ID to restrict the search to.
+    :param page: The 1-based page number.
+    :param page_size: The number of results per page.
+    :return: A tuple (results, has_next) where results is a list of dictionaries ordered by relevance.
+    """
+    offset = (page - 1) * page_size
+    expression = build_match_expression(text)
+    if not expression:
+        return [], False
+
+    if connection.vendor != 'sqlite':
+        tenants = Tenant.objects.all()
+        for token in re.findall(r'\w+', text):
+            tenants = tenants.filter(
+                Q(name__icontains=token) | Q(phone_number__startswith=token) | Q(house_number__istartswith=token)
+            )
+        if building_id is not None:
+            tenants = tenants.filter(building_id=building_id)
+        rows = list(tenants.order_by('name', 'pk')
+                    .values('id', 'name', 'phone_number', 'house_number', 'building_id')[offset:offset + page_size + 1])
+        return rows[:page_size], len(rows) > page_size
+
+    weights = ', '.join(str(weight) for weight in SEARCH_WEIGHTS)
+    sql = (
+        f'SELECT t.id, t.name, t.phone_number, t.house_number, t.building_id '
+        f'FROM {SEARCH_TABLE} JOIN "{Tenant._meta.db_table}" t ON t.id = {SEARCH_TABLE}.rowid '
+        f'WHERE {SEARCH_TABLE} MATCH %s'
+    )
+    params = [expression]
+    if building_id is not None:
+        sql += ' AND t.building_id = %s'
+        params.append(building_id)
+    sql += f' ORDER BY bm25({SEARCH_TABLE}, {weights}), t.id LIMIT %s OFFSET %s'
+    params += [page_size + 1, offset]
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        columns = [column[0] for column in cursor.description]
+        rows = [dict(zip(columns, row)) for row in cursor.fetchall()]
+    return rows[:page_size], len(rows) > page_size
@@ -0,0 +1,247 @@
+"""
+Bulk tenant operations: moving tenants between buildings, ending their leases and tearing down
+whole buildings.
+
+Each tenant operation runs in one transaction. The affected tenants are read with one query, house
+numbers are checked against the target building with one set-based query, the tenants are changed
+with one UPDATE or DELETE, and the occupancy counters get one aggregated delta per affected
+building instead of the per-row signal updates. The occupancy events of the changed tenants are
+appended with one INSERT in the same transaction.
+"""
+
+import logging
+import threading
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, connections
+from django.db.models import Case, CharField, F, Value, When
+from django.db.models.functions import Cast, Concat, Now
+
+from Housing.analytics import rebuild_occupancy_summary
+from Housing.counters import adjust_occupancy, bulk_tenant_changes, touch_buildings
+from Housing.fragments import invalidate_building_details
+from Housing.history import move_in_event, move_out_event, record_building_cleared, record_events
+from Housing.models import Building, BuildingOccupancySummary, Caretaker, Invoice, RentRate, Tenant, Unit
+from Housing.transactions import write_atomic
+from Housing.units import sync_units
+
+logger = logging.getLogger(__name__)
+
+# Number of tenants deleted per transaction by a background building deletion.
+DELETE_CHUNK_SIZE = 1000
+# Renumbered tenants hold "<prefix><tenant id>" between the two UPDATEs of a move.
+TEMPORARY_HOUSE_NUMBER_PREFIX = '~'
+
+
+class TenantMoveError(ValueError):
+    """
+    Raised when a bulk tenant operation can't be applied; nothing is changed.
+
+    Attributes:
+        conflicts (list): The house numbers that are taken or requested twice, if any.
+    """
+
+    def __init__(self, message, conflicts=()):
+        super().__init__(message)
+        self.conflicts = sorted(conflicts)
+
+
+def _load_tenants(tenant_ids):
+    tenant_ids = list(dict.fromkeys(tenant_ids))
+    tenants = list(Tenant.objects.select_for_update().filter(pk__in=tenant_ids)
+                   .values('pk', 'building_id', 'house_number', 'number_of_people'))
+    found = {tenant['pk'] for tenant in tenants}
+    return tenants, [pk for pk in tenant_ids if pk not in found]
+
+
+def apply_occupancy_deltas(deltas):
+    """
+    Apply aggregated occupancy changes and refresh everything derived from the affected buildings.
+
+    :param deltas: A mapping of building ID to a (houses_delta, people_delta) pair.
+    """
+    untouched = []
+    for building_id, (houses_delta, people_delta) in deltas.items():
+        adjust_occupancy(building_id, houses_delta=houses_delta, people_delta=people_delta)
+        if not houses_delta:
+            # adjust_occupancy only stamps updated_at along with available_houses.
+            untouched.append(building_id)
+    if untouched:
+        touch_buildings(untouched)
+    rebuild_occupancy_summary(deltas)
+    for building_id in deltas:
+        invalidate_building_details(building_id)
+
+
+def move_tenants(tenant_ids, building_id, house_numbers=None):
+    """
+    Move tenants to a building in one transaction.
+
+    :param tenant_ids: The IDs of the tenants to move.
+    :param building_id: The ID of the target building.
+    :param house_numbers: Optional mapping of tenant ID to the tenant's house number in the
+                          target building; tenants not in it keep their house number.
+    :return: A dictionary with the number of tenants moved and the IDs that were not found.
+    :raises Building.DoesNotExist: If the target building doesn't exist.
+    :raises TenantMoveError: If house numbers clash or the building has too few available houses.
+    """
+    house_numbers = {int(pk): str(number) for pk, number in (house_numbers or {}).items()}
+    with write_atomic():
+        building = Building.objects.select_for_update().only('available_houses').get(pk=building_id)
+        tenants, missing = _load_tenants(tenant_ids)
+        if not tenants:
+            return {'moved': 0, 'missing': missing}
+
+        targets = {tenant['pk']: house_numbers.get(tenant['pk'], tenant['house_number']) for tenant in tenants}
+        conflicts = {number for number, times in Counter(targets.values()).items() if times > 1}
+        conflicts.update(Tenant.objects.filter(building_id=building_id, house_number__in=set(targets.values()))
+                         .exclude(pk__in=targets).values_list('house_number', flat=True))
+        if conflicts:
+            raise TenantMoveError('House numbers are taken in the target building', conflicts)
+
+        incoming = [tenant for tenant in tenants if tenant['building_id'] != building_id]
+        if len(incoming) > building.available_houses:
+            raise TenantMoveError(f'The building has {building.available_houses} available houses, '
+                                  f'{len(incoming)} tenants are moving in')
+
+        renumbered = [When(pk=pk, then=Value(number)) for pk, number in targets.items() if pk in house_numbers]
+        changes = {'building_id': building_id, 'updated_at': Now()}
+        if renumbered:
+            changes['house_number'] = Case(*renumbered, default=F('house_number'))
+        try:
+            with write_atomic():
+                Unit.objects.filter(tenant_id__in=targets).update(tenant=None)
+                if renumbered:
+                    # Tenants swapping house numbers would collide halfway through a single UPDATE,
+                    # so the renumbered ones first get a temporary number unique to each tenant.
+                    Tenant.objects.filter(pk__in=[pk for pk in targets if pk in house_numbers]).update(
+                        house_number=Concat(Value(TEMPORARY_HOUSE_NUMBER_PREFIX), Cast('pk', CharField())))
+                Tenant.objects.filter(pk__in=targets).update(**changes)
+        except IntegrityError:
+            # A concurrent change took one of the house numbers since they were checked.
+            raise TenantMoveError('House numbers are taken in the target building', targets.values())
+
+        deltas = defaultdict(lambda: [0, 0])
+        for tenant in incoming:
+            deltas[tenant['building_id']][0] += 1
+            deltas[tenant['building_id']][1] -= tenant['number_of_people']
+            deltas[building_id][0] -= 1
+            deltas[building_id][1] += tenant['number_of_people']
+        record_events([event for tenant in incoming for event in (
+            move_out_event(tenant['building_id'], tenant['pk'], tenant['number_of_people']),
+            move_in_event(building_id, tenant['pk'], tenant['number_of_people']),
+        )])
+        if not incoming:
+            # Only renumbered within the building; it still needs stamping and refreshing.
+            deltas[building_id] = [0, 0]
+        sync_units([building_id])
+        apply_occupancy_deltas(deltas)
+    return {'moved': len(tenants), 'missing': missing}
+
+
+def move_out_tenants(tenant_ids):
+    """
+    End the leases of tenants in one transaction.
+
+    :param tenant_ids: The IDs of the tenants moving out.
+    :return: A dictionary with the number of tenants removed and the IDs that were not found.
+    """
+    with write_atomic():
+        tenants, missing = _load_tenants(tenant_ids)
+        if not tenants:
+            return {'moved_out': 0, 'missing': missing}
+        with bulk_tenant_changes():
+            Tenant.objects.filter(pk__in=[tenant['pk'] for tenant in tenants]).delete()
+
+        deltas = defaultdict(lambda: [0, 0])
+        for tenant in tenants:
+            deltas[tenant['building_id']][0] += 1
+            deltas[tenant['building_id']][1] -= tenant['number_of_people']
+        record_events([move_out_event(tenant['building_id'], tenant['pk'], tenant['number_of_people']) for tenant in tenants])
+        apply_occupancy_deltas(deltas)
+    return {'moved_out': len(tenants), 'missing': missing}
+
+
+def _delete_rows(queryset):
+    # A single DELETE ... WHERE, without loading the rows or sending per-row signals.
+    return queryset._raw_delete(queryset.db)
+
+
+def delete_building(building_id, chunk_size=None):
+    """
+    Delete a building with a few set-based deletes instead of the per-tenant signal cascade.
+
+    The units, tenants, caretakers, amenity links and occupancy summary rows of the building are
+    deleted with one statement each, skipping the counter maintenance of every
+    tenant, whose counters go away with the building. Invoices are kept and detached from the
+    tenants and the building, and the departure of the tenants is recorded as one move-out event
+    per transaction. The building itself is deleted through the ORM last, so its own signals still
+    invalidate the navbar and details caches and remove its TotalTenants row.
+
+    :param building_id: The ID of the building to delete.
+    :param chunk_size: Optional number of tenants to delete per transaction before the final
+                       transaction, so a very large building doesn't hold the write lock for long.
+    :return: True if the building was deleted, False if it didn't exist.
+    """
+    if chunk_size:
+        _delete_rows(Unit.objects.filter(building_id=building_id))
+        tenants = Tenant.objects.filter(building_id=building_id).order_by('pk').values_list('pk', flat=True)
+        while True:
+            with write_atomic():
+                chunk = list(tenants[:chunk_size])
+                if not chunk:
+                    break
+                Invoice.objects.filter(tenant_id__in=chunk).update(tenant=None)
+                record_building_cleared(Tenant.objects.filter(pk__in=chunk))
+                _delete_rows(Tenant.objects.filter(pk__in=chunk))
+
+    with write_atomic():
+        building = Building.objects.select_for_update().filter(pk=building_id).first()
+        if building is None:
+            return False
+        _delete_rows(Unit.objects.filter(building_id=building_id))
+        Invoice.objects.filter(tenant__building_id=building_id).update(tenant=None)
+        Invoice.objects.filter(building_id=building_id).update(building=None)
+        record_building_cleared(Tenant.objects.filter(building_id=building_id))
+        _delete_rows(Tenant.objects.filter(building_id=building_id))
+        _delete_rows(Caretaker.objects.filter(building_id=building_id))
+        _delete_rows(RentRate.objects.filter(building_id=building_id))
+        _delete_rows(Building.amenities.through.objects.filter(building_id=building_id))
+        _delete_rows(BuildingOccupancySummary.objects.filter(building_id=building_id))
+        building.delete()
+    return True
+
+
+def delete_building_in_background(building_id, chunk_size=DELETE_CHUNK_SIZE):
+    """
+    Mark a building pending deletion and run delete_building in a background thread, chunk_size
+    tenants per transaction.
+
+    The mark stays until the building is gone, so a deletion cut short by a worker restart is
+    finished by delete_pending_buildings, which the reconcile_occupancy command runs.
+
+    :return: The started thread.
+    """
+    Building.objects.filter(pk=building_id).update(pending_deletion=True)
+
+    def run():
+        try:
+            delete_building(building_id, chunk_size=chunk_size)
+        except Exception:
+            logger.exception('Deleting building %s failed', building_id)
+        finally:
+            connections.close_all()
+
+    thread = threading.Thread(target=run, name=f'delete-building-{building_id}', daemon=True)
+    thread.start()
+    return thread
+
+
+def delete_pending_buildings(chunk_size=DELETE_CHUNK_SIZE):
+    """
+    Finish the background deletions that didn't complete, chunk_size tenants per transaction.
+
+    :return: The number of buildings deleted.
+    """
+    building_ids = list(Building.objects.filter(pending_deletion=True).order_by('pk').values_list('pk', flat=True))
+    return sum(delete_building(building_id, chunk_size=chunk_size) for building_id in building_ids)
@@ -2,28 +2,70 @@
 Signal handlers for updating models when certain actions occur.
 """
 
-from django.db.models.signals import post_save, post_delete, pre_delete
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_migrate, post_save, post_delete, pre_delete, pre_save
 from django.dispatch import receiver
-from Housing.models import Tenant, Building, TotalTenants
+from Housing.amenities import clear_amenity_cache, refresh_amenity_masks
+from Housing.analytics import adjust_tenant_totals, rebuild_occupancy_summary
+from Housing.cache import bump_version
+from Housing.context_processors import NAVBAR_NAMESPACE
+from Housing.geo import geocode, grid_cell
+from Housing.history import record_tenant_deleted, record_tenant_saved
+from Housing.fragments import invalidate_all_building_details, invalidate_building_details
+from Housing.counters import adjust_occupancy, in_bulk_tenant_changes, touch_buildings
+from Housing.search import install_search_index
+from Housing.models import Amenity, Caretaker, Tenant, Building, TotalTenants, Unit
+from Housing.units import NoVacantUnit, claim_unit, sync_units
 
 @receiver(post_save, sender=Tenant)
-def update_available_houses_on_tenant_creation_or_update(sender, instance, created, **kwargs):
+def update_occupancy_on_tenant_creation(sender, instance, created, **kwargs):
     """
-    Signal receiver function to update available_houses on Tenant creation or update.
+    Signal receiver function to take a house and add the tenant's people to the counters on Tenant creation.
     """
-    if not created:  # Ignore if it's an update
+    if not created or in_bulk_tenant_changes():  # Ignore if it's an update
         return
-    
-    instance.building.available_houses -= 1
-    instance.building.save()
+
+    adjust_occupancy(instance.building_id, houses_delta=-1, people_delta=instance.number_of_people)
+    _sync_cached_building(instance, -1)
+
+@receiver(post_save, sender=Tenant)
+def update_occupancy_on_tenant_change(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to move the counters along when a Tenant changes building or household.
+
+    The building and household the tenant was loaded with (Tenant.from_db) are compared with the
+    saved ones before record_occupancy_event_on_tenant_save, connected further down, replaces them.
+    Tenants that weren't loaded from the database change nothing, as for the occupancy events.
+    """
+    if created or in_bulk_tenant_changes():
+        return
+    stored = getattr(instance, '_stored_occupancy', None)
+    if stored is None or None in stored[:2]:
+        return
+    building_id, number_of_people = stored[:2]
+    if building_id != instance.building_id:
+        adjust_occupancy(building_id, houses_delta=1, people_delta=-number_of_people)
+        adjust_occupancy(instance.building_id, houses_delta=-1, people_delta=instance.number_of_people)
+    elif number_of_people != instance.number_of_people:
+        adjust_occupancy(building_id, people_delta=instance.number_of_people - number_of_people)
 
 @receiver(post_delete, sender=Tenant)
-def update_available_houses_on_tenant_deletion(sender, instance, **kwargs):
+def update_occupancy_on_tenant_deletion(sender, instance, **kwargs):
+    """
+    Signal receiver function to free the house and remove the tenant's people from the counters on Tenant deletion.
+    """
+    if _deleting_building(kwargs.get('origin')) or in_bulk_tenant_changes():
+        return
+    adjust_occupancy(instance.building_id, houses_delta=1, people_delta=-instance.number_of_people)
+    _sync_cached_building(instance, 1)
+
+def _sync_cached_building(tenant, houses_delta):
     """
-    Signal receiver function to update available_houses on Tenant deletion.
+    Mirror a counter change on the tenant's already loaded building so callers don't see a stale value.
     """
-    instance.building.available_houses += 1
-    instance.building.save()
+    if Tenant.building.is_cached(tenant):
+        tenant.building.available_houses += houses_delta
 
 @receiver(post_save, sender=Building)
 def create_total_tenants(sender, instance, created, **kwargs):
@@ -38,33 +80,238 @@ def delete_total_tenants(sender, instance, **kwargs):
     """
     Signal receiver function to delete TotalTenants instance when a Building is deleted.
     """
-    try:
-        total_tenants = TotalTenants.objects.get(building=instance)
-        total_tenants.total_count = 0  # Set total_count to zero
-        total_tenants.save()  # Save the changes
-        total_tenants.delete()  # Delete the TotalTenants instance
-    except TotalTenants.DoesNotExist:
-        pass
+    TotalTenants.objects.filter(building=instance).delete()
+
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+def invalidate_navbar_buildings(sender, instance, **kwargs):
+    """
+    Signal receiver function to invalidate the cached navbar building list when a Building changes.
+    """
+    transaction.on_commit(lambda: bump_version(NAVBAR_NAMESPACE))
+
+@receiver(post_migrate)
+def install_tenant_search_triggers(sender, using, **kwargs):
+    """
+    Signal receiver function to restore the tenant search triggers after migrations, which drop them
+    when SQLite rebuilds the Tenant table.
+    """
+    if sender.name == 'Housing':
+        install_search_index(using)
+
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+def invalidate_amenity_catalog(sender, instance, **kwargs):
+    """
+    Signal receiver function to drop the process-level amenity name -> id map when the catalog changes.
+    """
+    clear_amenity_cache()
+
+@receiver(post_migrate)
+def invalidate_amenity_catalog_after_migrate(sender, **kwargs):
+    """
+    Signal receiver function to drop the process-level amenity name -> id map after migrate or flush,
+    which rewrite the catalog table without sending Amenity signals.
+    """
+    if sender.name == 'Housing':
+        clear_amenity_cache()
+
+def _deleting_building(origin):
+    """
+    Return True if a delete was started on a Building, so its tenants and summary row go away with it.
+    """
+    return isinstance(origin, Building) or (isinstance(origin, QuerySet) and origin.model is Building)
 
 @receiver(post_save, sender=Tenant)
-def update_total_tenants(sender, instance, created, **kwargs):
+def update_occupancy_summary_on_tenant_save(sender, instance, created, **kwargs):
     """
-    Signal receiver function to update TotalTenants when a new Tenant is created.
+    Signal receiver function to move the occupancy summary of the tenant's building by a created or changed Tenant.
+
+    As for the counters, an update is compared with the building, household and rooms the tenant
+    was loaded with; the summary of a tenant that wasn't loaded from the database is rebuilt.
     """
+    if in_bulk_tenant_changes():
+        return
+    current = (instance.building_id, instance.number_of_people, instance.number_of_rooms)
     if created:
-        building = instance.building
-        total_tenants, _ = TotalTenants.objects.get_or_create(building=building)
-        total_tenants.total_count += instance.number_of_people
-        total_tenants.save()
- 
-@receiver(pre_delete, sender=Tenant)
-def update_total_tenants_on_tenant_delete(sender, instance, **kwargs):
-    """
-    Signal receiver function to update TotalTenants when a Tenant is deleted.
-    """
-    building = instance.building
-    total_tenants, _ = TotalTenants.objects.get_or_create(building=building)
-    
-    # Subtract the number of people associated with the deleted tenant from total count
-    total_tenants.total_count -= instance.number_of_people
-    total_tenants.save()
+        adjust_tenant_totals(current[0], occupied_delta=1, people_delta=current[1], rooms_delta=current[2])
+        return
+    stored = getattr(instance, '_stored_occupancy', None)
+    if stored is None or None in stored:
+        rebuild_occupancy_summary([instance.building_id])
+    elif stored[0] != current[0]:
+        adjust_tenant_totals(stored[0], occupied_delta=-1, people_delta=-stored[1], rooms_delta=-stored[2])
+        adjust_tenant_totals(current[0], occupied_delta=1, people_delta=current[1], rooms_delta=current[2])
+    elif stored != current:
+        adjust_tenant_totals(current[0], people_delta=current[1] - stored[1], rooms_delta=current[2] - stored[2])
+
+@receiver(post_delete, sender=Tenant)
+def update_occupancy_summary_on_tenant_deletion(sender, instance, **kwargs):
+    """
+    Signal receiver function to take a deleted Tenant out of the occupancy summary of its building.
+    """
+    if _deleting_building(kwargs.get('origin')) or in_bulk_tenant_changes():
+        return
+    stored = getattr(instance, '_stored_occupancy', None)
+    if stored is None or None in stored:
+        rebuild_occupancy_summary([instance.building_id])
+        return
+    adjust_tenant_totals(stored[0], occupied_delta=-1, people_delta=-stored[1], rooms_delta=-stored[2])
+
+@receiver(post_save, sender=Building)
+def update_occupancy_summary_on_building_save(sender, instance, **kwargs):
+    """
+    Signal receiver function to rebuild the occupancy summary row of a Building when it is saved.
+    """
+    rebuild_occupancy_summary([instance.pk])
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_delete, sender=Tenant)
+@receiver(post_save, sender=Caretaker)
+@receiver(post_delete, sender=Caretaker)
+def invalidate_building_details_on_related_change(sender, instance, **kwargs):
+    """
+    Signal receiver function to invalidate the cached details page of the building a Tenant or Caretaker belongs to.
+    """
+    if _deleting_building(kwargs.get('origin')) or (sender is Tenant and in_bulk_tenant_changes()):
+        return
+    invalidate_building_details(instance.building_id)
+
+@receiver(post_save, sender=Building)
+@receiver(post_delete, sender=Building)
+def invalidate_building_details_on_building_change(sender, instance, **kwargs):
+    """
+    Signal receiver function to invalidate the cached details page of a Building when it changes.
+    """
+    invalidate_building_details(instance.pk)
+
+@receiver(m2m_changed, sender=Building.amenities.through)
+def invalidate_building_details_on_amenity_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal receiver function to invalidate the cached details pages of buildings whose amenities change.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        invalidate_building_details(instance.pk)
+    elif pk_set:
+        for building_id in pk_set:
+            invalidate_building_details(building_id)
+    else:
+        invalidate_all_building_details()
+
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+def invalidate_building_details_on_catalog_change(sender, instance, **kwargs):
+    """
+    Signal receiver function to invalidate every cached details page when an amenity is renamed or removed.
+    """
+    invalidate_all_building_details()
+
+@receiver(post_save, sender=Tenant)
+@receiver(post_save, sender=Caretaker)
+@receiver(post_delete, sender=Caretaker)
+def touch_building_on_related_change(sender, instance, created=False, **kwargs):
+    """
+    Signal receiver function to stamp the building's updated_at when a Caretaker changes or a Tenant is edited.
+
+    Tenant creation and deletion already stamp it through the occupancy counter update.
+    """
+    if sender is Tenant and (created or in_bulk_tenant_changes()):
+        return
+    if _deleting_building(kwargs.get('origin')):
+        return
+    touch_buildings([instance.building_id])
+
+@receiver(m2m_changed, sender=Building.amenities.through)
+def touch_building_on_amenity_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal receiver function to stamp updated_at of the buildings whose amenities change.
+
+    Clearing an amenity from every building is covered by the shared building details cache
+    version, which is part of the page ETag.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        touch_buildings([instance.pk])
+    elif pk_set:
+        touch_buildings(pk_set)
+
+@receiver(post_save, sender=Tenant)
+def claim_unit_on_tenant_save(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to assign a Tenant the unit of their house number when they sign up or change house.
+
+    Deleting a Tenant vacates the unit through the SET_NULL foreign key. Raises NoVacantUnit, which
+    rolls the save back, if no unit can be claimed.
+    """
+    if in_bulk_tenant_changes():
+        return
+    if not created:
+        if Unit.objects.filter(tenant=instance, number=instance.house_number).exists():
+            return
+        Unit.objects.filter(tenant=instance).update(tenant=None)
+    if not claim_unit(instance):
+        raise NoVacantUnit(f'No vacant unit for house number {instance.house_number} in building {instance.building_id}')
+
+@receiver(post_save, sender=Building)
+def sync_units_on_building_save(sender, instance, **kwargs):
+    """
+    Signal receiver function to create or remove units when a Building is created or its house count changes.
+    """
+    sync_units([instance.pk])
+
+@receiver(m2m_changed, sender=Building.amenities.through)
+def update_amenity_mask_on_amenity_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """
+    Signal receiver function to recompute the amenity mask of the buildings whose amenities change.
+    """
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_amenity_masks([instance.pk])
+    elif pk_set:
+        refresh_amenity_masks(pk_set)
+    else:
+        refresh_amenity_masks()
+
+@receiver(post_save, sender=Amenity)
+@receiver(post_delete, sender=Amenity)
+def update_amenity_masks_on_catalog_change(sender, instance, **kwargs):
+    """
+    Signal receiver function to recompute every amenity mask when an amenity is renamed or removed.
+    """
+    refresh_amenity_masks()
+
+@receiver(pre_save, sender=Building)
+def geocode_building_on_save(sender, instance, **kwargs):
+    """
+    Signal receiver function to fill in the coordinates of a Building from its location and keep its grid cell current.
+
+    Coordinates that are already set are kept; clearing them re-geocodes the location on the next save.
+    """
+    if instance.latitude is None or instance.longitude is None:
+        instance.latitude, instance.longitude = geocode(instance.location) or (None, None)
+    if instance.latitude is None:
+        instance.grid_cell = None
+    else:
+        instance.grid_cell = grid_cell(instance.latitude, instance.longitude)
+
+@receiver(post_save, sender=Tenant)
+def record_occupancy_event_on_tenant_save(sender, instance, created, **kwargs):
+    """
+    Signal receiver function to append the occupancy events of a Tenant moving in, changing building or changing household.
+    """
+    if in_bulk_tenant_changes():
+        return
+    record_tenant_saved(instance, created)
+
+@receiver(post_delete, sender=Tenant)
+def record_occupancy_event_on_tenant_deletion(sender, instance, **kwargs):
+    """
+    Signal receiver function to append the move-out event of a deleted Tenant, also when its building is deleted.
+    """
+    if in_bulk_tenant_changes():
+        return
+    record_tenant_deleted(instance)
@@ -0,0 +1,37 @@
+"""
+Atomic blocks that write.
+
+On the SQLite profile an atomic block begins with a deferred BEGIN, which takes the write lock
+only at the first write; when another connection committed in between, SQLite then fails the
+transaction with "database is locked" at once instead of waiting for the busy timeout. A
+write_atomic block begins with BEGIN <HOUSING_SQLITE_TRANSACTION_MODE>, IMMEDIATE by default,
+which takes the lock at BEGIN where the busy timeout applies. Plain atomic blocks, such as
+read-only ones, keep the deferred BEGIN so they don't hold the write lock.
+
+Other databases lock rows, not the database, and begin every transaction the same way.
+"""
+
+from contextlib import contextmanager
+
+from django.db import transaction
+
+
+@contextmanager
+def write_atomic(using=None, savepoint=True):
+    """
+    transaction.atomic for blocks that write, taking the SQLite write lock when the transaction begins.
+
+    Nested in another atomic block it is a plain atomic block: the transaction has begun already.
+    """
+    connection = transaction.get_connection(using)
+    immediate = hasattr(connection, 'begin_immediate') and not connection.in_atomic_block
+    if immediate:
+        connection.begin_immediate = True
+    try:
+        with transaction.atomic(using=using, savepoint=savepoint):
+            if immediate:
+                connection.begin_immediate = False
+            yield
+    finally:
+        if immediate:
+            connection.begin_immediate = False
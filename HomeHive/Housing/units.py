@@ -0,0 +1,122 @@
+"""
+The unit inventory: one Unit row per house of a building, the index of its vacancies.
+
+A unit is vacant while its tenant is null, and a partial index covers the vacant units only, so
+"next free unit", "list vacancies" and "is unit X taken" are index lookups that don't depend on
+the number of tenants. A tenant takes a unit with a single UPDATE that only matches the unit while
+it is vacant, which is the atomic claim concurrent sign-ups race on.
+
+The Tenant and Building signals keep units current row by row; sync_units brings any number of
+buildings in line with their tenants with set-based statements after bulk changes.
+"""
+
+from django.db import IntegrityError, connections, router
+from django.db.models import F, OuterRef, Subquery
+
+from Housing.models import Building, Tenant, Unit
+
+
+class NoVacantUnit(IntegrityError):
+    """
+    Raised when a tenant can't be given a unit because the building is full or their unit is
+    taken; it rolls the tenant write back like the constraint violations it stands beside.
+    """
+
+
+def vacant_units(building_id):
+    """
+    Return the vacant units of a building in position order.
+    """
+    return Unit.objects.filter(building_id=building_id, tenant__isnull=True).order_by('position')
+
+
+def next_free_unit(building_id):
+    """
+    Return the number of the first vacant unit of a building, or None if it is full.
+    """
+    return vacant_units(building_id).values_list('number', flat=True).first()
+
+
+def claim_unit(tenant):
+    """
+    Atomically assign a tenant the vacant unit carrying their house number.
+
+    A house number that no unit carries yet replaces the number of the first vacant unit.
+
+    :return: True if a unit was claimed, False if the unit is taken or the building is full.
+    """
+    vacant = Unit.objects.filter(building_id=tenant.building_id, tenant__isnull=True)
+    if vacant.filter(number=tenant.house_number).update(tenant=tenant):
+        return True
+    if Unit.objects.filter(building_id=tenant.building_id, number=tenant.house_number).exists():
+        return False
+    first = vacant.order_by('position').values('pk')[:1]
+    return bool(vacant.filter(pk__in=Subquery(first)).update(tenant=tenant, number=tenant.house_number))
+
+
+def create_missing_units(building_ids=None):
+    """
+    Insert the units for positions 1 to total_number_of_houses that buildings don't have yet,
+    with one INSERT ... SELECT over a generated series of positions.
+
+    :param building_ids: Optional iterable of building IDs; all buildings when None.
+    """
+    using = router.db_for_write(Unit)
+    quote = connections[using].ops.quote_name
+    unit_table, building_table = quote(Unit._meta.db_table), quote(Building._meta.db_table)
+    unit_building, number, position = (quote(Unit._meta.get_field(name).column) for name in ('building', 'number', 'position'))
+    total = quote(Building._meta.get_field('total_number_of_houses').column)
+
+    scope, params = '', []
+    if building_ids is not None:
+        params = list(building_ids)
+        if not params:
+            return
+        scope = f'AND b.{quote("id")} IN ({", ".join(["%s"] * len(params))})'
+    # A position is skipped when its generated number was given to a unit of a stray house number.
+    sql = f'''
+        WITH RECURSIVE seq(n) AS (
+            SELECT 1
+            UNION ALL
+            SELECT n + 1 FROM seq WHERE n < (SELECT MAX(b.{total}) FROM {building_table} b WHERE 1 = 1 {scope})
+        )
+        INSERT INTO {unit_table} ({unit_building}, {position}, {number})
+        SELECT b.{quote("id")}, seq.n, CAST(seq.n AS VARCHAR(10))
+        FROM {building_table} b JOIN seq ON seq.n <= b.{total}
+        WHERE NOT EXISTS (
+            SELECT 1 FROM {unit_table} u
+            WHERE u.{unit_building} = b.{quote("id")} AND (u.{position} = seq.n OR u.{number} = CAST(seq.n AS VARCHAR(10)))
+        ) {scope}
+    '''
+    with connections[using].cursor() as cursor:
+        cursor.execute(sql, params + params)
+
+
+def sync_units(building_ids=None):
+    """
+    Bring the units of buildings in line with their house count and tenants.
+
+    Missing units are created, units are assigned to the tenants with their house number,
+    vacant units beyond the house count are removed and tenants with a house number no unit
+    carries take over a vacant unit.
+
+    :param building_ids: Optional iterable of building IDs; all buildings when None.
+    """
+    units = Unit.objects.all()
+    tenants = Tenant.objects.all()
+    if building_ids is not None:
+        building_ids = list(building_ids)
+        units = units.filter(building_id__in=building_ids)
+        tenants = tenants.filter(building_id__in=building_ids)
+
+    create_missing_units(building_ids)
+    # Release the units whose tenant moved out, moved away or changed house number ...
+    units.filter(tenant__isnull=False).exclude(
+        tenant__building_id=F('building_id'), tenant__house_number=F('number'),
+    ).update(tenant=None)
+    # ... then hand every vacant unit to the tenant with its house number, if any.
+    matching = Tenant.objects.filter(building_id=OuterRef('building_id'), house_number=OuterRef('number')).values('pk')[:1]
+    units.filter(tenant__isnull=True).update(tenant=Subquery(matching))
+    units.filter(tenant__isnull=True, position__gt=F('building__total_number_of_houses')).delete()
+    for tenant in tenants.filter(units__isnull=True).only('pk', 'building_id', 'house_number'):
+        claim_unit(tenant)
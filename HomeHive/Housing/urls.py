@@ -1,20 +1,57 @@
+from django.conf import settings
 from django.urls import path
 
-from Housing import views
+from Housing import api, async_views, views
 from Housing.views import AddCaretakerToBuildingView, AddTenantToBuildingView, BuildingClassView, BuildingDetailView, BuildingFormView, DeleteBuildingView, DeleteCaretakerView, TenantDeleteView, TenantDetailView,UpdateBuildingView, UpdateCaretakerView, UpdateTenantView
 
-urlpatterns = [
-    path("", BuildingClassView.as_view(), name="building-view"),
-    path("register_building/", BuildingFormView.as_view(), name="building-reg_view"),
-    path("building/<int:building_id>/", BuildingDetailView.as_view(), name="building-details"),
-    path('building/<int:pk>/update/', UpdateBuildingView.as_view(), name='building-update'),
-    path('buildings/<int:pk>/delete/', DeleteBuildingView.as_view(), name='delete-building'),
-    path('building/<int:building_id>/tenant/create/', AddTenantToBuildingView.as_view(), name='add-tenant'),
-    path('building/<int:building_id>/caretaker/create/', AddCaretakerToBuildingView.as_view(), name='add-caretaker'),
-    path('caretakers/<int:pk>/update/', UpdateCaretakerView.as_view(), name='update-caretaker'),
-    path('caretakers/<int:pk>/delete/', DeleteCaretakerView.as_view(), name='delete-caretaker'),
-    path('tenant/<int:tenant_id>/', TenantDetailView.as_view(), name='tenant-detail'),
-    path('tenant/delete/<int:tenant_id>/', TenantDeleteView.as_view(), name='tenant-delete'),
-    path('update-tenant/<int:tenant_id>/', UpdateTenantView.as_view(), name='update-tenant'),
-    path('api/tenants/', views.get_tenant_id, name='get-tenant-id'),
-]
\ No newline at end of file
+
+def housing_urlpatterns(async_reads=False):
+    """
+    Return the URL patterns of the Housing application.
+
+    :param async_reads: Serve the read-heavy views by their async versions (see Housing.async_views), for ASGI.
+    """
+    if async_reads:
+        building_list, building_details, tenant_detail = (async_views.AsyncBuildingClassView, async_views.AsyncBuildingDetailView,
+                                                          async_views.AsyncTenantDetailView)
+    else:
+        building_list, building_details, tenant_detail = BuildingClassView, BuildingDetailView, TenantDetailView
+    reads = async_views if async_reads else views
+    return [
+        path("", building_list.as_view(), name="building-view"),
+        path("register_building/", BuildingFormView.as_view(), name="building-reg_view"),
+        path("building/<int:building_id>/", building_details.as_view(), name="building-details"),
+        path('building/<int:pk>/update/', UpdateBuildingView.as_view(), name='building-update'),
+        path('buildings/<int:pk>/delete/', DeleteBuildingView.as_view(), name='delete-building'),
+        path('building/<int:building_id>/tenant/create/', AddTenantToBuildingView.as_view(), name='add-tenant'),
+        path('building/<int:building_id>/caretaker/create/', AddCaretakerToBuildingView.as_view(), name='add-caretaker'),
+        path('caretakers/<int:pk>/update/', UpdateCaretakerView.as_view(), name='update-caretaker'),
+        path('caretakers/<int:pk>/delete/', DeleteCaretakerView.as_view(), name='delete-caretaker'),
+        path('tenant/<int:tenant_id>/', tenant_detail.as_view(), name='tenant-detail'),
+        path('tenant/delete/<int:tenant_id>/', TenantDeleteView.as_view(), name='tenant-delete'),
+        path('update-tenant/<int:tenant_id>/', UpdateTenantView.as_view(), name='update-tenant'),
+        path('api/tenants/', views.get_tenant_id, name='get-tenant-id'),
+        path('api/tenants/search/', views.search_tenants, name='search-tenants'),
+        path('api/tenants/move/', views.move_tenants, name='move-tenants'),
+        path('api/tenants/move-out/', views.move_out_tenants, name='move-out-tenants'),
+        path('api/buildings/', reads.list_buildings, name='list-buildings'),
+        path('api/buildings/search/', views.search_buildings, name='search-buildings'),
+        path('api/buildings/nearby/', views.nearby_buildings, name='nearby-buildings'),
+        path('api/buildings/<int:building_id>/tenants/', reads.lookup_building_tenants, name='lookup-building-tenants'),
+        path('api/buildings/<int:building_id>/vacancies/', views.building_vacancies, name='building-vacancies'),
+        path('api/buildings/<int:building_id>/units/<str:number>/', views.building_unit, name='building-unit'),
+        path('api/buildings/<int:building_id>/occupancy/', views.building_occupancy, name='building-occupancy'),
+        path('stats/queries/', views.query_stats, name='query-stats'),
+        path('analytics/', views.OccupancyAnalyticsView.as_view(), name='occupancy-analytics'),
+        path('api/v1/buildings/', api.BuildingResourceView.as_view(), name='api-buildings'),
+        path('api/v1/buildings/<int:pk>/', api.BuildingResourceView.as_view(), name='api-building'),
+        path('api/v1/tenants/', api.TenantResourceView.as_view(), name='api-tenants'),
+        path('api/v1/tenants/<int:pk>/', api.TenantResourceView.as_view(), name='api-tenant'),
+        path('api/v1/caretakers/', api.CaretakerResourceView.as_view(), name='api-caretakers'),
+        path('api/v1/caretakers/<int:pk>/', api.CaretakerResourceView.as_view(), name='api-caretaker'),
+        path('api/v1/total-tenants/', api.TotalTenantsResourceView.as_view(), name='api-total-tenants'),
+        path('api/v1/total-tenants/<int:pk>/', api.TotalTenantsResourceView.as_view(), name='api-total-tenant'),
+    ]
+
+
+urlpatterns = housing_urlpatterns(settings.HOUSING_ASYNC_VIEWS)
@@ -1,26 +1,422 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
 from django.shortcuts import get_object_or_404, redirect, render
-from django.http import HttpResponse, JsonResponse
+from django.http import Http404, HttpResponse, JsonResponse
+from django.utils.decorators import method_decorator
 from django.views import View
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from django.views.generic import DetailView
 from django.urls import reverse, reverse_lazy
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from Housing import analytics, geo, history, instrumentation, search, services, units
+from Housing.amenities import amenity_facets, filter_by_amenities, set_building_amenities
+from Housing.cache import cache_is_shared, get_version
+from Housing.context_processors import NAVBAR_NAMESPACE
+from Housing.counters import resize_building
 from Housing.forms import BuildingForm, CaretakerForm, TenantForm
-from django.db import transaction
+from Housing.fragments import BUILDING_DETAILS_NAMESPACE, get_building_details
+from Housing.pagination import InvalidCursor, keyset_page
+from Housing.transactions import write_atomic
+from django.db import IntegrityError
+from django.db.models import prefetch_related_objects
 
-from Housing.models import Amenity, Building, Caretaker, Tenant, TotalTenants
+from Housing.models import Building, Caretaker, Tenant, Unit
 
 def get_tenant_id(request):
     """
     Retrieve the tenant ID based on the house number provided in the request.
+
+    The lookup can be scoped with an optional building_id parameter; without it the house number
+    must be unique across all buildings.
     
     :param request: The HTTP request object.
-    :return: JsonResponse containing the tenant ID if found, or an error message if not found.
+    :return: JsonResponse containing the tenant ID if found, or an error message if not found or building_id is invalid.
     """
     house_number = request.GET.get('house_number')
+    tenants = Tenant.objects.filter(house_number=house_number)
+    if request.GET.get('building_id'):
+        try:
+            building_id = int(request.GET['building_id'])
+        except ValueError:
+            return JsonResponse({'error': 'Invalid building_id'}, status=400)
+        tenants = tenants.filter(building_id=building_id)
     try:
-        tenant = Tenant.objects.get(house_number=house_number)
+        tenant = tenants.only('id').get()
         return JsonResponse({'tenant_id': tenant.id})
     except Tenant.DoesNotExist:
         return JsonResponse({'error': 'Tenant not found'}, status=404)
+    except Tenant.MultipleObjectsReturned:
+        return JsonResponse({'error': 'House number exists in several buildings, pass building_id'}, status=409)
+
+MAX_LOOKUP_HOUSE_NUMBERS = 500
+
+def get_lookup_house_numbers(request):
+    """
+    Collect the house numbers of a lookup request from repeated house_number parameters and/or a
+    comma separated house_numbers parameter.
+
+    :return: A tuple (house_numbers, error_response); error_response is None when the request is valid.
+    """
+    house_numbers = request.GET.getlist('house_number')
+    for value in request.GET.getlist('house_numbers'):
+        house_numbers.extend(number for number in value.split(',') if number)
+    house_numbers = list(dict.fromkeys(number.strip() for number in house_numbers if number.strip()))
+
+    if not house_numbers:
+        return house_numbers, JsonResponse({'error': 'No house number given'}, status=400)
+    if len(house_numbers) > MAX_LOOKUP_HOUSE_NUMBERS:
+        return house_numbers, JsonResponse({'error': f'At most {MAX_LOOKUP_HOUSE_NUMBERS} house numbers per request'}, status=400)
+    return house_numbers, None
+
+def lookup_building_tenants(request, building_id):
+    """
+    Resolve one or more house numbers of a building to tenant IDs with a single query.
+
+    House numbers are passed as repeated house_number parameters and/or a comma separated
+    house_numbers parameter.
+
+    :param request: The HTTP request object.
+    :param building_id: The ID of the building the house numbers belong to.
+    :return: JsonResponse mapping each found house number to its tenant ID and listing the missing ones.
+    """
+    house_numbers, error = get_lookup_house_numbers(request)
+    if error:
+        return error
+
+    found = dict(
+        Tenant.objects.filter(building_id=building_id, house_number__in=house_numbers)
+        .values_list('house_number', 'id')
+    )
+    missing = [number for number in house_numbers if number not in found]
+    return JsonResponse({'building_id': building_id, 'tenants': found, 'missing': missing})
+
+VACANCIES_PAGE_SIZE = 100
+
+def building_vacancies(request, building_id):
+    """
+    List the vacant units of a building in position order, one keyset page at a time.
+
+    :param request: The HTTP request object with an optional cursor parameter.
+    :param building_id: The ID of the building.
+    :return: JsonResponse with the next free unit, a page of vacant unit numbers and the cursor of the next page.
+    """
+    try:
+        rows, next_cursor = keyset_page(units.vacant_units(building_id).values('number', 'position'), ('position',),
+                                        cursor=request.GET.get('cursor'), page_size=VACANCIES_PAGE_SIZE)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    return JsonResponse({'building_id': building_id, 'next_free': units.next_free_unit(building_id),
+                         'vacancies': [row['number'] for row in rows], 'next_cursor': next_cursor})
+
+def building_occupancy(request, building_id):
+    """
+    Report the occupancy of a building at a point in time from its latest snapshot and the events since.
+
+    :param request: The HTTP request object with an optional ISO 8601 "at" parameter; now when omitted.
+    :param building_id: The ID of the building; deleted buildings keep their history.
+    :return: JsonResponse with the occupied houses and people at that time, or 400 if "at" is invalid.
+    """
+    moment = timezone.now()
+    if request.GET.get('at'):
+        try:
+            moment = parse_datetime(request.GET['at'])
+        except ValueError:
+            moment = None
+        if moment is None:
+            return JsonResponse({'error': 'at must be an ISO 8601 date and time'}, status=400)
+        if timezone.is_naive(moment):
+            moment = timezone.make_aware(moment)
+    occupancy = history.occupancy_at(building_id, moment)
+    return JsonResponse({'building_id': building_id, 'at': moment.isoformat(), 'occupied_houses': occupancy['occupied_houses'],
+                         'total_people': occupancy['total_people'], 'events_replayed': occupancy['events_replayed']})
+
+def building_unit(request, building_id, number):
+    """
+    Tell whether a unit of a building is taken.
+
+    :param request: The HTTP request object.
+    :param building_id: The ID of the building.
+    :param number: The house number of the unit.
+    :return: JsonResponse with the unit's position, whether it is vacant and its tenant ID, or 404 if there is no such unit.
+    """
+    unit = Unit.objects.filter(building_id=building_id, number=number).values('number', 'position', 'tenant_id').first()
+    if unit is None:
+        return JsonResponse({'error': 'Unit not found'}, status=404)
+    return JsonResponse(dict(unit, vacant=unit['tenant_id'] is None))
+
+def search_tenants(request):
+    """
+    Search tenants by partial name, phone number or house number, ranked by relevance.
+
+    :param request: The HTTP request object with the q, optional building_id and page parameters.
+    :return: JsonResponse with one page of matching tenants.
+    """
+    query = request.GET.get('q', '').strip()
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+        building_id = int(request.GET['building_id']) if request.GET.get('building_id') else None
+    except ValueError:
+        return JsonResponse({'error': 'Invalid page or building_id'}, status=400)
+    if not query:
+        return JsonResponse({'error': 'No search query given'}, status=400)
+
+    results, has_next = search.search_tenants(query, building_id=building_id, page=page)
+    return JsonResponse({'results': results, 'page': page, 'has_next': has_next})
+
+MAX_BULK_TENANTS = 1000
+
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+def get_house_numbers(payload):
+    """
+    Validate the optional house_numbers mapping of a move request with the TenantForm field rules.
+
+    :return: A dictionary of tenant ID to cleaned house number.
+    :raises ValueError: If a key isn't a tenant ID or a house number is invalid.
+    """
+    house_numbers = payload.get('house_numbers') or {}
+    if not isinstance(house_numbers, dict):
+        raise ValueError('house_numbers must map tenant IDs to house numbers')
+    field = TenantForm.base_fields['house_number']
+    cleaned = {}
+    for pk, number in house_numbers.items():
+        if not pk.isdigit() or not isinstance(number, str):
+            raise ValueError('house_numbers must map tenant IDs to house numbers')
+        try:
+            cleaned[int(pk)] = field.clean(number)
+        except ValidationError as exc:
+            raise ValueError(f'Invalid house number {number!r}: {" ".join(exc.messages)}') from None
+    return cleaned
+
+def get_bulk_tenant_ids(request):
+    """
+    Parse the JSON body of a bulk tenant request and its list of tenant IDs.
+
+    :return: A tuple (payload, tenant_ids, error_response); error_response is None when the request is valid.
+    """
+    try:
+        payload = json.loads(request.body)
+        tenant_ids = payload['tenant_ids']
+    except (ValueError, TypeError, KeyError):
+        tenant_ids = None
+    if not isinstance(tenant_ids, list) or not all(_is_id(pk) for pk in tenant_ids):
+        return None, None, JsonResponse({'error': 'Expected a JSON body with a tenant_ids list of integers'}, status=400)
+    if not tenant_ids:
+        return None, None, JsonResponse({'error': 'No tenant given'}, status=400)
+    if len(tenant_ids) > MAX_BULK_TENANTS:
+        return None, None, JsonResponse({'error': f'At most {MAX_BULK_TENANTS} tenants per request'}, status=400)
+    return payload, tenant_ids, None
+
+@require_POST
+def move_tenants(request):
+    """
+    Move tenants to another building in one transaction.
+
+    :param request: The HTTP request object with a JSON body: tenant_ids, building_id and an
+                    optional house_numbers mapping of tenant ID to new house number.
+    :return: JsonResponse with the number of tenants moved, or the conflicting house numbers with status 409.
+    """
+    payload, tenant_ids, error = get_bulk_tenant_ids(request)
+    if error:
+        return error
+    if not _is_id(payload.get('building_id')):
+        return JsonResponse({'error': 'Invalid building_id'}, status=400)
+    try:
+        house_numbers = get_house_numbers(payload)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    building_id = payload['building_id']
+    try:
+        result = services.move_tenants(tenant_ids, building_id, house_numbers)
+    except services.TenantMoveError as exc:
+        return JsonResponse({'error': str(exc), 'conflicts': exc.conflicts}, status=409)
+    except Building.DoesNotExist:
+        return JsonResponse({'error': 'Building not found'}, status=404)
+    return JsonResponse(result)
+
+@require_POST
+def move_out_tenants(request):
+    """
+    Remove tenants that are moving out in one transaction.
+
+    :param request: The HTTP request object with a JSON body holding tenant_ids.
+    :return: JsonResponse with the number of tenants removed.
+    """
+    _, tenant_ids, error = get_bulk_tenant_ids(request)
+    if error:
+        return error
+    return JsonResponse(services.move_out_tenants(tenant_ids))
+
+def query_stats(request):
+    """
+    Return the per-route statistics collected by QueryStatsMiddleware in this process.
+
+    Only available to staff users. POST with reset=1 clears the statistics.
+
+    :param request: The HTTP request object.
+    :return: JsonResponse with the statistics snapshot.
+    """
+    if not request.user.is_staff:
+        return JsonResponse({'error': 'Forbidden'}, status=403)
+    if request.method == 'POST' and request.POST.get('reset') == '1':
+        instrumentation.registry.reset()
+    return JsonResponse(instrumentation.registry.snapshot())
+
+BUILDINGS_PAGE_SIZE = 24
+BUILDINGS_ORDERING = ('building_name', 'id')
+
+def get_buildings_page(request):
+    """
+    Return the page of buildings selected by the cursor parameter of the request, with the
+    amenities of only that page's buildings prefetched.
+
+    :param request: The HTTP request object.
+    :return: A tuple (buildings, next_cursor).
+    :raises InvalidCursor: If the cursor parameter is malformed.
+    """
+    buildings, next_cursor = keyset_page(
+        Building.objects.all(), BUILDINGS_ORDERING, cursor=request.GET.get('cursor'), page_size=BUILDINGS_PAGE_SIZE,
+    )
+    prefetch_related_objects(buildings, 'amenities')
+    return buildings, next_cursor
+
+def building_card(building):
+    """
+    Return the JSON representation of a building in the listing; amenities must be prefetched.
+    """
+    return {
+        'id': building.pk,
+        'building_name': building.building_name,
+        'owner': building.owner,
+        'location': building.location,
+        'total_number_of_houses': building.total_number_of_houses,
+        'available_houses': building.available_houses,
+        'amenities': [amenity.name for amenity in building.amenities.all()],
+        'url': reverse('building-details', kwargs={'building_id': building.pk}),
+    }
+
+def list_buildings(request):
+    """
+    Return one page of the building listing as JSON, for infinite scrolling on the main page.
+
+    :param request: The HTTP request object with an optional cursor parameter.
+    :return: JsonResponse with the buildings of the page and the cursor of the next page.
+    """
+    try:
+        buildings, next_cursor = get_buildings_page(request)
+    except InvalidCursor:
+        return JsonResponse({'error': 'Invalid cursor'}, status=400)
+    results = [building_card(building) for building in buildings]
+    return JsonResponse({'results': results, 'next_cursor': next_cursor})
+
+def search_buildings(request):
+    """
+    Filter buildings by amenities and count the matches per amenity.
+
+    Each of the all, any and none parameters takes a comma separated list of amenity names:
+    buildings must have all of the first, at least one of the second and none of the third.
+
+    :param request: The HTTP request object with the all, any, none and cursor parameters.
+    :return: JsonResponse with a page of matching buildings, the cursor of the next page, the
+             number of matches and the number of matches that have each amenity.
+    """
+    names = {param: [name.strip() for name in request.GET.get(param, '').split(',') if name.strip()]
+             for param in ('all', 'any', 'none')}
+    try:
+        buildings = filter_by_amenities(Building.objects.all(), required=names['all'], any_of=names['any'], excluded=names['none'])
+        page, next_cursor = keyset_page(buildings, BUILDINGS_ORDERING, cursor=request.GET.get('cursor'), page_size=BUILDINGS_PAGE_SIZE)
+    except (ValueError, InvalidCursor) as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    prefetch_related_objects(page, 'amenities')
+    total, facets = amenity_facets(buildings)
+    return JsonResponse({'results': [building_card(building) for building in page], 'next_cursor': next_cursor,
+                         'total': total, 'facets': facets})
+
+NEARBY_MAX_RESULTS = 100
+NEARBY_DEFAULT_RADIUS_KM = 2
+NEARBY_MAX_RADIUS_KM = 50
+
+def get_nearby_origin(request):
+    """
+    Read the point of a proximity query from the lat and lon parameters, or geocode the near parameter.
+
+    :return: A (latitude, longitude) tuple.
+    :raises ValueError: If the point is missing, malformed or out of range, or the place is unknown.
+    """
+    if request.GET.get('near'):
+        origin = geo.geocode(request.GET['near'])
+        if origin is None:
+            raise ValueError(f'Unknown place: {request.GET["near"]}')
+        return origin
+    try:
+        latitude, longitude = float(request.GET['lat']), float(request.GET['lon'])
+    except (KeyError, ValueError):
+        raise ValueError('Pass lat and lon, or near') from None
+    if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+        raise ValueError('lat must be within [-90, 90] and lon within [-180, 180]')
+    return latitude, longitude
+
+def nearby_buildings(request):
+    """
+    Find the buildings around a point, nearest first.
+
+    With k the k nearest buildings are returned, otherwise those within radius_km (at most
+    NEARBY_MAX_RESULTS of them). Both use the grid cell index before computing exact distances.
+
+    :param request: The HTTP request object with lat and lon (or near), and k or radius_km.
+    :return: JsonResponse with the query point and the matching buildings with their distance.
+    """
+    try:
+        latitude, longitude = get_nearby_origin(request)
+        if request.GET.get('k'):
+            k = int(request.GET['k'])
+            if not 1 <= k <= NEARBY_MAX_RESULTS:
+                raise ValueError(f'k must be between 1 and {NEARBY_MAX_RESULTS}')
+            rows = geo.nearest_buildings(latitude, longitude, k)
+        else:
+            radius_km = float(request.GET.get('radius_km', NEARBY_DEFAULT_RADIUS_KM))
+            if not 0 < radius_km <= NEARBY_MAX_RADIUS_KM:
+                raise ValueError(f'radius_km must be greater than 0 and at most {NEARBY_MAX_RADIUS_KM}')
+            rows = geo.buildings_within(latitude, longitude, radius_km, limit=NEARBY_MAX_RESULTS)
+    except ValueError as exc:
+        return JsonResponse({'error': str(exc)}, status=400)
+    results = [{
+        'id': row['pk'],
+        'building_name': row['building_name'],
+        'location': row['location'],
+        'available_houses': row['available_houses'],
+        'latitude': row['latitude'],
+        'longitude': row['longitude'],
+        'distance_km': round(row['distance_km'], 3),
+        'url': reverse('building-details', kwargs={'building_id': row['pk']}),
+    } for row in rows]
+    return JsonResponse({'origin': {'latitude': latitude, 'longitude': longitude}, 'results': results})
+
+class OccupancyAnalyticsView(View):
+    """
+    View class for displaying the portfolio occupancy analytics.
+    """
+    template_name = 'occupancy_analytics.html'
+
+    def get(self, request):
+        """
+        Render the analytics template with figures aggregated from the occupancy summary table.
+
+        :param request: The HTTP request object.
+        :return: Rendered HTML template with the portfolio, owner, location and building figures.
+        """
+        return render(request, self.template_name, {
+            'totals': analytics.portfolio_totals(),
+            'owners': analytics.occupancy_by_owner(),
+            'locations': analytics.vacancies_by_location(),
+            'buildings': analytics.least_occupied_buildings(),
+        })
 
 class BuildingClassView(View):
     """
@@ -30,35 +426,97 @@ class BuildingClassView(View):
 
     def get(self, request, *args, **kwargs):
         """
-        Retrieve all buildings and render the main template with the list of buildings.
+        Render the main template with one keyset-paginated page of buildings.
         
         :param request: The HTTP request object.
         :return: Rendered HTML template with the list of buildings.
         """
-        buildings = Building.objects.prefetch_related('amenities').all()
-        return render(request, self.template_name, {'buildings': buildings})
+        try:
+            buildings, next_cursor = get_buildings_page(request)
+        except InvalidCursor:
+            return redirect('building-view')
+        return render(request, self.template_name, {'buildings': buildings, 'next_cursor': next_cursor})
     
+def get_request_building_details(request, building_id):
+    """
+    Return the cached details of a building, looked up at most once per request; None if the building doesn't exist.
+    """
+    loaded = request.__dict__.setdefault('_housing_building_details', {})
+    if building_id not in loaded:
+        try:
+            loaded[building_id] = get_building_details(building_id)
+        except Building.DoesNotExist:
+            loaded[building_id] = None
+    return loaded[building_id]
+
+def get_tenant_updated_at(request, tenant_id):
+    """
+    Return the updated_at of a tenant, read at most once per request; None if the tenant doesn't exist.
+    """
+    loaded = request.__dict__.setdefault('_housing_tenant_updated_at', {})
+    if tenant_id not in loaded:
+        loaded[tenant_id] = Tenant.objects.filter(pk=tenant_id).values_list('updated_at', flat=True).first()
+    return loaded[tenant_id]
+
+def page_etag(request, key, updated_at, *namespaces):
+    """
+    Build the ETag of a page showing one row.
+
+    Besides the row's updated_at it covers the versions of the cache namespaces the page renders
+    from (e.g. the navbar) and the CSRF cookie, whose token the page embeds. Pages aren't validated
+    with a per-process cache, where those versions don't change with the other workers' writes.
+    """
+    if updated_at is None or not cache_is_shared():
+        return None
+    parts = [key, updated_at.isoformat(), *(get_version(namespace) for namespace in namespaces),
+             request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')]
+    return hashlib.md5(':'.join(str(part) for part in parts).encode('utf-8')).hexdigest()
+
+def building_details_last_modified(request, building_id):
+    # The cached building carries updated_at: every change that stamps it also invalidates the cache.
+    if not cache_is_shared():
+        return None
+    details = get_request_building_details(request, building_id)
+    return details['building'].updated_at if details else None
+
+def building_details_etag(request, building_id):
+    return page_etag(request, f'building-{building_id}', building_details_last_modified(request, building_id),
+                     NAVBAR_NAMESPACE, BUILDING_DETAILS_NAMESPACE)
+
+def tenant_detail_last_modified(request, tenant_id):
+    if not cache_is_shared():
+        return None
+    return get_tenant_updated_at(request, tenant_id)
+
+def tenant_detail_etag(request, tenant_id):
+    return page_etag(request, f'tenant-{tenant_id}', get_tenant_updated_at(request, tenant_id), NAVBAR_NAMESPACE)
+
 class BuildingDetailView(View):
     """
     View class for displaying details of a building.
     """
     template_name = 'building_details.html'
 
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(condition(etag_func=building_details_etag, last_modified_func=building_details_last_modified))
     def get(self, request, building_id):
         """
-        Retrieve details of the specified building and render the building details template.
+        Render the building details template from the cached building and fragments.
         
         :param request: The HTTP request object.
         :param building_id: The ID of the building to retrieve details for.
         :return: Rendered HTML template with the building details.
         """
-        building = get_object_or_404(Building, pk=building_id)
-        
-        # Fetch TotalTenants instance associated with the building
-        total_tenants = TotalTenants.objects.get(building=building)
-        buildings = Building.objects.prefetch_related('amenities').all()
-        # Pass building and total_tenants to the template
-        return render(request, self.template_name, {'building': building, 'total_tenants': total_tenants, 'buildings': buildings})
+        details = get_request_building_details(request, building_id)
+        if details is None:
+            raise Http404('No Building matches the given query.')
+        # The building and its rendered fragments come from the cache; only the page shell is rendered.
+        return render(request, self.template_name, {'building': details['building'], 'fragments': details['fragments']})
+
+# The columns an edit of a building writes: the form fields, the coordinates geocoded from the location and the
+# timestamp, never the occupancy counters.
+BUILDING_FORM_UPDATE_FIELDS = ('building_name', 'owner', 'location', 'total_number_of_houses',
+                               'latitude', 'longitude', 'grid_cell', 'updated_at')
 
 class UpdateBuildingView(View):
     """
@@ -74,15 +532,12 @@ class UpdateBuildingView(View):
         :param pk: The ID of the building to update.
         :return: Rendered HTML template with the building update form.
         """
-        building = Building.objects.prefetch_related('amenities').get(pk=pk)
-        available_amenities = building.amenities.all()  # Access prefetched amenities
-
-        # Pass the initial data containing the IDs of available amenities
-        initial_data = {'amenities': available_amenities.values_list('id', flat=True)}
+        building = get_object_or_404(Building, pk=pk)
+        selected_amenities = list(building.amenities.values_list('name', flat=True))
 
-        form = BuildingForm(instance=building, initial=initial_data)
-        buildings = Building.objects.prefetch_related('amenities').all()
-        return render(request, self.template_name, {'form': form, 'building': building, 'buildings': buildings})
+        # The form's amenity choices are the catalog names
+        form = BuildingForm(instance=building, initial={'amenities': selected_amenities})
+        return render(request, self.template_name, {'form': form, 'building': building, 'selected_amenities': selected_amenities})
 
     def post(self, request, pk):
         """
@@ -95,29 +550,26 @@ class UpdateBuildingView(View):
         building = get_object_or_404(Building, pk=pk)
         form = BuildingForm(request.POST, instance=building)
 
-        # Fetch all available amenities associated with the building
-        available_amenities = building.amenities.all()
-
         if form.is_valid():
-            updated_building = form.save(commit=False)
-            # Clear existing amenities of the building
-            updated_building.amenities.clear()
-
-            # Get the list of selected amenity names from the form data
-            selected_amenity_names = request.POST.getlist('amenities')
-
-            # Create or get Amenity objects based on selected names
-            for amenity_name in selected_amenity_names:
-                amenity, created = Amenity.objects.get_or_create(name=amenity_name)
-                updated_building.amenities.add(amenity)
-
-            # Save the updated building
-            updated_building.save()
+            with write_atomic():
+                # commit=False keeps the form from writing the amenity names as M2M primary keys
+                updated_building = form.save(commit=False)
+                if 'location' in form.changed_data:
+                    # Re-geocoded from the new location on save
+                    updated_building.latitude = updated_building.longitude = None
+                if 'total_number_of_houses' in form.changed_data:
+                    resize_building(updated_building.pk, updated_building.total_number_of_houses - form.initial['total_number_of_houses'])
+                    updated_building.refresh_from_db(fields=['available_houses'])
+                # The counters are left out: tenants signing up or leaving meanwhile change them with F() updates.
+                updated_building.save(update_fields=BUILDING_FORM_UPDATE_FIELDS)
+                # Apply only the difference to the building's amenities
+                set_building_amenities(updated_building, form.cleaned_data['amenities'])
 
             # Redirect to the building details page of the updated building
             return redirect(reverse('building-details', kwargs={'building_id': updated_building.pk}))
 
-        return render(request, self.template_name, {'form': form, 'building': building, 'available_amenities': available_amenities})
+        selected_amenities = request.POST.getlist('amenities')
+        return render(request, self.template_name, {'form': form, 'building': building, 'selected_amenities': selected_amenities})
 
 class BuildingFormView(View):
     """
@@ -131,8 +583,7 @@ class BuildingFormView(View):
         :return: Rendered HTML template with the building form.
         """
         form = BuildingForm()
-        buildings = Building.objects.prefetch_related('amenities').all()
-        return render(request, 'building_form.html', {'form': form, 'buildings': buildings})
+        return render(request, 'building_form.html', {'form': form})
 
     def post(self, request):
         """
@@ -143,24 +594,12 @@ class BuildingFormView(View):
         """
         form = BuildingForm(request.POST)
         if form.is_valid():
-            with transaction.atomic():
-                building = form.save(commit=False)  # Save the building instance
-
-                # Get the selected amenity names from the form
-                selected_amenities_names = form.cleaned_data['amenities']
-
-                # Create new amenities in the database if they don't exist
-                for amenity_name in selected_amenities_names:
-                    Amenity.objects.get_or_create(name=amenity_name)
-
-                # Query the Amenity model for instances based on selected names
-                selected_amenities = Amenity.objects.filter(name__in=selected_amenities_names)
-
-                # Save the building instance to get its ID
+            with write_atomic():
+                building = form.save(commit=False)
                 building.save()
 
-                # Add selected amenities to the building
-                building.amenities.add(*selected_amenities)
+                # Link the selected amenities from the catalog in one bulk insert
+                set_building_amenities(building, form.cleaned_data['amenities'])
 
                 return redirect('building-view')
         else:
@@ -178,14 +617,13 @@ class DeleteBuildingView(View):
         :param pk: The ID of the building to delete.
         :return: Redirect to the list of buildings view after deletion.
         """
-        building = get_object_or_404(Building, pk=pk)
-
-        # Use a transaction to ensure atomicity
-        with transaction.atomic():
-            # Delete the associated amenities
-            building.amenities.clear()
-            # Delete the building
-            building.delete()
+        building = get_object_or_404(Building.objects.only('pk'), pk=pk)
+        if building.tenants.count() > settings.HOUSING_BACKGROUND_DELETE_TENANTS:
+            # Deleted in chunks after the response, so the request doesn't hold the write lock;
+            # reconcile_occupancy finishes the deletion if the worker stops before it does.
+            services.delete_building_in_background(building.pk)
+        else:
+            services.delete_building(building.pk)
 
         return redirect('building-view')
 
@@ -195,6 +633,8 @@ class TenantDetailView(View):
     """
     template_name = 'tenant_detail.html'
 
+    @method_decorator(cache_control(private=True, no_cache=True))
+    @method_decorator(condition(etag_func=tenant_detail_etag, last_modified_func=tenant_detail_last_modified))
     def get(self, request, tenant_id):
         """
         Retrieve details of the specified tenant and render the tenant details template.
@@ -204,8 +644,7 @@ class TenantDetailView(View):
         :return: Rendered HTML template with the tenant details.
         """
         tenant = get_object_or_404(Tenant, pk=tenant_id)
-        buildings = Building.objects.prefetch_related('amenities').all()
-        return render(request, self.template_name, {'tenant': tenant, 'buildings': buildings})
+        return render(request, self.template_name, {'tenant': tenant})
 
 class UpdateTenantView(View):
     """
@@ -223,8 +662,7 @@ class UpdateTenantView(View):
         """
         tenant = get_object_or_404(Tenant, pk=tenant_id)
         form = TenantForm(instance=tenant)
-        buildings = Building.objects.prefetch_related('amenities').all()
-        return render(request, self.template_name, {'form': form, 'tenant_id': tenant_id, 'buildings': buildings})
+        return render(request, self.template_name, {'form': form, 'tenant_id': tenant_id})
 
     def post(self, request, tenant_id):
         """
@@ -237,7 +675,11 @@ class UpdateTenantView(View):
         tenant = get_object_or_404(Tenant, pk=tenant_id)
         form = TenantForm(request.POST, instance=tenant)
         if form.is_valid():
-            form.save()
+            try:
+                form.save()
+            except IntegrityError:
+                form.add_error('house_number', f'House number {tenant.house_number} is occupied.')
+                return render(request, self.template_name, {'form': form, 'tenant_id': tenant_id})
             return redirect('tenant-detail', tenant_id=tenant_id)
         return render(request, self.template_name, {'form': form, 'tenant_id': tenant_id})
 
@@ -273,9 +715,8 @@ class AddTenantToBuildingView(View):
         :return: Rendered HTML template with the add tenant form.
         """
         building = get_object_or_404(Building, pk=building_id)
-        form = TenantForm()
-        buildings = Building.objects.prefetch_related('amenities').all()
-        return render(request, self.template_name, {'form': form, 'building': building, 'buildings': buildings})
+        form = TenantForm(initial={'house_number': units.next_free_unit(building_id)})
+        return render(request, self.template_name, {'form': form, 'building': building})
 
     def post(self, request, building_id):
         """
@@ -283,20 +724,28 @@ class AddTenantToBuildingView(View):
         
         :param request: The HTTP request object.
         :param building_id: The ID of the building.
-        :return: Redirect to the building details page after adding the tenant.
+        :return: Redirect to the building details page after adding the tenant, or the form with an
+                 error if the house number is occupied or the building is full.
         """
         building = get_object_or_404(Building, pk=building_id)
         form = TenantForm(request.POST)
-        if form.is_valid():
+        if form.is_valid() and building.available_houses <= 0:
+            form.add_error(None, 'The building is full.')
+        elif form.is_valid():
             house_number = form.cleaned_data['house_number']
-            if Tenant.objects.filter(building=building, house_number=house_number).exists():
-                form.add_error('house_number', f'House number {house_number} is occupied.')
-                return render(request, self.template_name, {'form': form, 'building': building})
-            else:
-                tenant = form.save(commit=False)
-                tenant.building = building
+            tenant = form.save(commit=False)
+            tenant.building = building
+            try:
                 tenant.save()
-                return redirect('building-details', building_id=building_id)
+            except IntegrityError:
+                # The constraints decide, so concurrent sign-ups can't both win: either the house number
+                # was taken or the last vacant house was.
+                if Tenant.objects.filter(building=building, house_number=house_number).exists():
+                    form.add_error('house_number', f'House number {house_number} is occupied.')
+                else:
+                    form.add_error(None, 'The building is full.')
+                return render(request, self.template_name, {'form': form, 'building': building})
+            return redirect('building-details', building_id=building_id)
         return render(request, self.template_name, {'form': form, 'building': building})
     
 class AddCaretakerToBuildingView(View):
@@ -315,8 +764,7 @@ class AddCaretakerToBuildingView(View):
         """
         building = get_object_or_404(Building, pk=building_id)
         form = CaretakerForm()
-        buildings = Building.objects.prefetch_related('amenities').all()
-        return render(request, self.template_name, {'form': form, 'building': building, 'buildings': buildings})
+        return render(request, self.template_name, {'form': form, 'building': building})
 
     def post(self, request, building_id):
         """
@@ -352,8 +800,7 @@ class UpdateCaretakerView(View):
         caretaker = get_object_or_404(Caretaker, pk=pk)
         building = caretaker.building
         form = CaretakerForm(instance=caretaker)
-        buildings = Building.objects.prefetch_related('amenities').all()
-        return render(request, self.template_name, {'form': form, 'building': building, 'caretaker': caretaker, 'buildings': buildings})
+        return render(request, self.template_name, {'form': form, 'building': building, 'caretaker': caretaker})
 
     def post(self, request, pk):
         """
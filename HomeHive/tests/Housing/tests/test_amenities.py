@@ -0,0 +1,60 @@
+import re
+
+from django.db import connection
+from django.db.models.signals import m2m_changed
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing.amenities import get_amenity_ids, set_building_amenities
+from Housing.choices import AmenityChoices
+from Housing.models import Amenity, Building
+
+@pytest.mark.django_db
+class TestAmenityCatalog:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        self.client = Client()
+        self.building = Building.objects.create(owner='John Doe', location='Sample Location', total_number_of_houses=3, available_houses=3)
+
+    def test_catalog_is_seeded(self):
+        assert set(Amenity.objects.values_list('name', flat=True)) >= {name for name, _ in AmenityChoices.CHOICES}
+        get_amenity_ids(['gym'])
+        with CaptureQueriesContext(connection) as ctx:
+            ids = get_amenity_ids(['gym', 'wifi'])
+        assert len(ctx.captured_queries) == 0
+        assert ids == {'gym': Amenity.objects.get(name='gym').pk, 'wifi': Amenity.objects.get(name='wifi').pk}
+
+    def test_set_building_amenities_writes_the_difference(self):
+        set_building_amenities(self.building, ['gym', 'wifi', 'pool'])
+        received = []
+        handler = lambda sender, action, pk_set, **kwargs: received.append((action, pk_set))
+        m2m_changed.connect(handler, sender=Building.amenities.through)
+        try:
+            with CaptureQueriesContext(connection) as ctx:
+                set_building_amenities(self.building, ['gym', 'parking'])
+        finally:
+            m2m_changed.disconnect(handler, sender=Building.amenities.through)
+
+        assert sorted(self.building.amenities.values_list('name', flat=True)) == ['gym', 'parking']
+        statements = [q['sql'].split()[0] for q in ctx.captured_queries]
+        assert statements.count('SELECT') == 1
+        assert statements.count('DELETE') == 1
+        assert statements.count('INSERT') == 1
+        ids = get_amenity_ids(['wifi', 'pool', 'parking'])
+        assert ('post_remove', {ids['wifi'], ids['pool']}) in received
+        assert ('post_add', {ids['parking']}) in received
+
+    def test_update_building_view_applies_amenities(self):
+        set_building_amenities(self.building, ['gym'])
+        response = self.client.post(reverse('building-update', kwargs={'pk': self.building.pk}), {
+            'building_name': 'Sunrise', 'owner': 'John Doe', 'location': 'Sample Location',
+            'total_number_of_houses': 3, 'amenities': ['wifi', 'gym'],
+        })
+        assert response.status_code == 302
+        assert sorted(self.building.amenities.values_list('name', flat=True)) == ['gym', 'wifi']
+        response = self.client.get(reverse('building-update', kwargs={'pk': self.building.pk}))
+        assert re.search(r'value="wifi"\s+checked', response.content.decode('utf-8'))
+        assert not re.search(r'value="pool"\s+checked', response.content.decode('utf-8'))
@@ -0,0 +1,69 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing.amenities import AMENITY_BITS, amenity_mask, get_amenity_ids, refresh_amenity_masks, set_building_amenities
+from Housing.models import Amenity, Building
+
+@pytest.mark.django_db
+class TestAmenitySearch:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        self.client = Client()
+        self.buildings = {}
+        for name, amenities in (('Acacia', ['gym', 'parking', 'elevator']), ('Baobab', ['gym', 'parking']),
+                                ('Cedar', ['pool']), ('Daisy', [])):
+            building = Building.objects.create(building_name=name, owner='John Doe', location='Kilimani', total_number_of_houses=2, available_houses=2)
+            set_building_amenities(building, amenities)
+            self.buildings[name] = building
+
+    def mask(self, name):
+        return Building.objects.get(pk=self.buildings[name].pk).amenity_mask
+
+    def search(self, **params):
+        return self.client.get(reverse('search-buildings'), params).json()
+
+    def test_mask_follows_amenities(self):
+        assert self.mask('Acacia') == amenity_mask(['gym', 'parking', 'elevator'])
+        assert self.mask('Daisy') == 0
+
+        set_building_amenities(self.buildings['Acacia'], ['wifi'])
+        assert self.mask('Acacia') == AMENITY_BITS['wifi']
+        self.buildings['Cedar'].amenities.clear()
+        assert self.mask('Cedar') == 0
+        Amenity.objects.get(pk=get_amenity_ids(['gym'])['gym']).building_set.add(self.buildings['Daisy'])
+        assert self.mask('Daisy') == AMENITY_BITS['gym']
+
+        Amenity.objects.filter(name='gym').delete()
+        assert self.mask('Baobab') == AMENITY_BITS['parking']
+
+    def test_refresh_repairs_masks(self):
+        Building.objects.update(amenity_mask=0)
+        refresh_amenity_masks()
+        assert self.mask('Baobab') == amenity_mask(['gym', 'parking'])
+
+    def test_filters_and_facets(self):
+        data = self.search(all='gym,parking')
+        assert [row['building_name'] for row in data['results']] == ['Acacia', 'Baobab']
+        assert data['total'] == 2
+        assert data['facets']['gym'] == 2 and data['facets']['elevator'] == 1 and data['facets']['pool'] == 0
+
+        assert [row['building_name'] for row in self.search(any='elevator,pool')['results']] == ['Acacia', 'Cedar']
+        assert [row['building_name'] for row in self.search(all='gym', none='elevator')['results']] == ['Baobab']
+        data = self.search()
+        assert data['total'] == 4 and data['facets']['parking'] == 2
+
+        response = self.client.get(reverse('search-buildings'), {'all': 'gym,moat'})
+        assert response.status_code == 400
+        assert 'moat' in response.json()['error']
+
+    def test_search_does_not_join_amenities(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.search(all='gym,parking', none='pool')
+        # The page, its prefetched amenities and the facet counts.
+        assert len(ctx.captured_queries) == 3
+        assert '"Housing_building_amenities"' not in ctx.captured_queries[0]['sql']
+        assert '"Housing_building_amenities"' not in ctx.captured_queries[2]['sql']
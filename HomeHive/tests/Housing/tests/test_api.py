@@ -0,0 +1,48 @@
+import json
+
+from django.urls import reverse
+import pytest
+
+from Housing.models import Building, Caretaker, Tenant
+
+@pytest.mark.django_db
+class TestReadOnlyApi:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        self.client = Client()
+        self.building = Building.objects.create(owner='John Doe', location='Sample Location', total_number_of_houses=5, available_houses=5)
+        self.other = Building.objects.create(owner='Jane Doe', location='Other Location', total_number_of_houses=5, available_houses=5)
+        for building in (self.building, self.other):
+            for number in ('A1', 'A2'):
+                Tenant.objects.create(name='Jane', house_number=number, phone_number='0712345678',
+                                      building=building, number_of_rooms=1, number_of_people=2)
+        Caretaker.objects.create(name='Sam', phone_number='0712345678', building=self.building)
+
+    def test_field_selection_filtering_and_pagination(self):
+        response = self.client.get(reverse('api-tenants'), {'building': self.other.pk, 'fields': 'house_number', 'page_size': 1})
+        data = response.json()
+        assert data['results'] == [{'house_number': 'A1'}]
+
+        data = self.client.get(reverse('api-tenants'), {'building': self.other.pk, 'fields': 'house_number',
+                                                        'page_size': 1, 'cursor': data['next_cursor']}).json()
+        assert data == {'results': [{'house_number': 'A2'}], 'next_cursor': None}
+
+    def test_invalid_parameters(self):
+        assert self.client.get(reverse('api-buildings'), {'fields': 'secret'}).status_code == 400
+        assert self.client.get(reverse('api-buildings'), {'min_available': 'many'}).status_code == 400
+
+    def test_detail(self):
+        response = self.client.get(reverse('api-building', kwargs={'pk': self.building.pk}))
+        assert response.json()['available_houses'] == 3
+        assert self.client.get(reverse('api-caretaker', kwargs={'pk': 0})).status_code == 404
+        response = self.client.get(reverse('api-total-tenants'), {'building': self.building.pk, 'fields': 'total_count'})
+        assert response.json()['results'] == [{'total_count': 4}]
+
+    def test_ndjson_export_streams(self):
+        response = self.client.get(reverse('api-tenants'), {'format': 'ndjson', 'fields': 'id,building_id'})
+        assert response.streaming
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).decode('utf-8').splitlines()]
+        assert len(rows) == 4
+        assert set(rows[0]) == {'id', 'building_id'}
@@ -0,0 +1,107 @@
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.http import HttpResponse
+from django.urls import resolve, reverse
+import pytest
+
+from Housing.instrumentation import registry
+from Housing.management.benchmark import read_urlconf
+from Housing.middleware import QueryStatsMiddleware, ReplicaReadMiddleware
+from Housing.models import Amenity, Building, Caretaker, Tenant
+
+@pytest.mark.django_db
+class TestAsyncViews:
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path):
+        from django.test import Client
+
+        self.client = Client()
+        self.settings = settings
+        # Pages are only validated with a cache shared by the worker processes.
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path)}}
+        self.building = Building.objects.create(building_name='Acacia', owner='John Doe', location='Sample Location', total_number_of_houses=5, available_houses=5)
+        self.building.amenities.add(Amenity.objects.get(name='gym'))
+        Caretaker.objects.create(name='Otieno', phone_number='0712345678', building=self.building)
+        self.tenant = Tenant.objects.create(name='Jane', house_number='A1', phone_number='0712345678',
+                                            building=self.building, number_of_rooms=1, number_of_people=2)
+        self.pages = [reverse('building-view'), reverse('building-details', kwargs={'building_id': self.building.pk}),
+                      reverse('tenant-detail', kwargs={'tenant_id': self.tenant.pk})]
+
+    def serve_async(self, async_reads=True):
+        # As under ASGI, where HomeHive/asgi.py turns on HOUSING_ASYNC_VIEWS.
+        self.settings.ROOT_URLCONF = read_urlconf(async_reads)
+
+    def page_templates(self, response):
+        # Fragment templates only render when the building details cache is cold.
+        return {template.name for template in response.templates if not template.name.startswith('building_details_')}
+
+    def test_canonical_routes_serve_async_views(self):
+        for url in (*self.pages, reverse('list-buildings'), reverse('lookup-building-tenants', kwargs={'building_id': 1})):
+            assert not iscoroutinefunction(resolve(url).func)
+        self.serve_async()
+        for url in (*self.pages, reverse('list-buildings'), reverse('lookup-building-tenants', kwargs={'building_id': 1})):
+            assert iscoroutinefunction(resolve(url).func)
+
+    def test_pages_match_sync_views(self):
+        sync_responses = [self.client.get(url) for url in self.pages]
+        self.serve_async()
+        for url, sync_response in zip(self.pages, sync_responses):
+            async_response = self.client.get(url)
+            assert async_response.status_code == 200
+            assert self.page_templates(async_response) == self.page_templates(sync_response)
+            for name in ('Acacia', 'Otieno', 'Jane'):
+                assert (name in sync_response.content.decode()) == (name in async_response.content.decode())
+
+    def test_building_details_context(self):
+        self.serve_async()
+        response = self.client.get(reverse('building-details', kwargs={'building_id': self.building.pk}))
+        assert 'Total Tenants: 2' in response.context['fragments']['total_tenants']
+        assert response.context['navbar_buildings'] == [{'pk': self.building.pk, 'building_name': 'Acacia'}]
+
+    def test_conditional_gets(self):
+        self.serve_async()
+        for url in self.pages[1:]:
+            # The first view sets the CSRF cookie, which is part of the ETag of later views.
+            self.client.get(url)
+            response = self.client.get(url)
+            assert response.has_header('Last-Modified') and 'no-cache' in response['Cache-Control']
+            assert self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code == 304
+
+    def test_missing_objects_return_404(self):
+        self.serve_async()
+        assert self.client.get(reverse('building-details', kwargs={'building_id': 0})).status_code == 404
+        assert self.client.get(reverse('tenant-detail', kwargs={'tenant_id': 0})).status_code == 404
+
+    def test_json_endpoints_match_sync_views(self):
+        kwargs, params = {'building_id': self.building.pk}, {'house_numbers': 'A1,B2'}
+        listing = self.client.get(reverse('list-buildings')).json()
+        lookup = self.client.get(reverse('lookup-building-tenants', kwargs=kwargs), params).json()
+        self.serve_async()
+        assert self.client.get(reverse('list-buildings')).json() == listing
+        assert self.client.get(reverse('lookup-building-tenants', kwargs=kwargs), params).json() == lookup
+        assert lookup['tenants'] == {'A1': self.tenant.pk}
+
+    def test_invalid_cursor(self):
+        self.serve_async()
+        assert self.client.get(reverse('list-buildings'), {'cursor': 'bad'}).status_code == 400
+        assert self.client.get(reverse('building-view'), {'cursor': 'bad'}).status_code == 302
+
+    def test_middleware_stays_async(self):
+        self.settings.HOUSING_QUERY_STATS = True
+        self.settings.HOUSING_READ_REPLICAS = ['replica1']
+
+        async def view(request):
+            return HttpResponse()
+
+        for middleware in (QueryStatsMiddleware, ReplicaReadMiddleware):
+            assert iscoroutinefunction(middleware(view))
+            assert not iscoroutinefunction(middleware(lambda request: HttpResponse()))
+
+    def test_query_stats_count_queries_of_async_views(self):
+        from django.test import AsyncClient
+
+        self.settings.HOUSING_QUERY_STATS = True
+        self.serve_async()
+        registry.reset()
+        response = async_to_sync(AsyncClient().get)(reverse('tenant-detail', kwargs={'tenant_id': self.tenant.pk}))
+        assert response.status_code == 200
+        assert registry.snapshot()['routes']['tenant-detail']['queries']['max'] >= 2
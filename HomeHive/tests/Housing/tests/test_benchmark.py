@@ -0,0 +1,39 @@
+from django.core.management import call_command
+import pytest
+
+from Housing.amenities import clear_amenity_cache
+
+from Housing.management.benchmark import ROUTE_REQUESTS, compare_results, route_names, run_benchmark
+from Housing.datagen import generate_dataset
+from Housing.models import Building, Tenant
+
+@pytest.mark.django_db
+class TestBenchmark:
+    def test_every_route_has_a_request_spec(self):
+        assert set(route_names()) <= set(ROUTE_REQUESTS)
+
+    def test_benchmark_runs_every_route_without_changing_data(self):
+        generate_dataset(5, houses_per_building=4, occupancy=0.5)
+        results = run_benchmark(iterations=2)
+
+        assert set(results) == set(route_names())
+        assert all(result['status'] < 500 for result in results.values())
+        assert Building.objects.count() == 5
+        assert Tenant.objects.count() == 10
+
+    def test_consecutive_sizes_reseed_after_flush(self):
+        # benchmark_views flushes the database between sizes, which recreates the amenity catalog.
+        try:
+            for size in (2, 3):
+                call_command('flush', interactive=False, verbosity=0)
+                generate_dataset(size, houses_per_building=4, occupancy=0.5)
+            assert Building.objects.count() == 3
+            assert Building.amenities.through.objects.exists()
+        finally:
+            clear_amenity_cache()
+
+    def test_compare_detects_regressions(self):
+        baseline = {'sizes': {'10': {'building-view': {'p95_ms': 10.0, 'queries': 3}}}}
+        current = {'sizes': {'10': {'building-view': {'p95_ms': 14.0, 'queries': 4}}}}
+        assert len(compare_results(current, baseline, threshold=0.25)) == 2
+        assert compare_results(current, baseline, threshold=0.5) == ['10 buildings, building-view: queries 3 -> 4']
@@ -0,0 +1,91 @@
+import datetime
+from decimal import Decimal
+
+from django.core.management import CommandError, call_command
+import pytest
+
+from Housing import billing, services
+from Housing.datagen import TENANT_FIELDS, insert_rows
+from Housing.models import Building, Invoice, RentRate, Tenant
+
+PERIOD = datetime.date(2026, 10, 1)
+
+@pytest.mark.django_db
+class TestBilling:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.acacia = Building.objects.create(building_name='Acacia', owner='John Doe', location='Kilimani', total_number_of_houses=10, available_houses=10)
+        self.baobab = Building.objects.create(building_name='Baobab', owner='John Doe', location='Kilimani', total_number_of_houses=10, available_houses=10)
+        for building in (self.acacia, self.baobab):
+            insert_rows(Tenant, TENANT_FIELDS, [('Jane', str(number), '0712345678', building.pk, number, 2) for number in range(1, 5)])
+        RentRate.objects.create(base_amount=Decimal('10000'), per_room=Decimal('2500'))
+        RentRate.objects.create(building=self.baobab, base_amount=Decimal('5000'), per_person=Decimal('1000'))
+
+    def amounts(self, building):
+        return list(Invoice.objects.filter(building=building, period=PERIOD).order_by('house_number').values_list('house_number', 'amount'))
+
+    def test_rates_per_building_room_and_person(self):
+        assert billing.run_billing(PERIOD) == {'invoices': 8, 'unpriced': 0}
+        assert self.amounts(self.acacia) == [('1', Decimal('12500')), ('2', Decimal('15000')), ('3', Decimal('17500')), ('4', Decimal('20000'))]
+        assert {amount for _, amount in self.amounts(self.baobab)} == {Decimal('7000')}
+
+        RentRate.objects.filter(building__isnull=True).delete()
+        Invoice.objects.all().delete()
+        assert billing.run_billing(PERIOD) == {'invoices': 4, 'unpriced': 4}
+
+    def test_runs_are_idempotent_and_chunked(self):
+        assert [bounds for bounds in billing.tenant_chunks(3)][-1][1] is None
+        assert billing.run_billing(PERIOD, chunk_size=3) == {'invoices': 8, 'unpriced': 0}
+        assert billing.run_billing(PERIOD, chunk_size=3) == {'invoices': 0, 'unpriced': 0}
+
+        Tenant.objects.create(name='Joe', house_number='9', phone_number='0712345678', building=self.acacia, number_of_rooms=1, number_of_people=1)
+        assert billing.run_billing(PERIOD)['invoices'] == 1
+        assert billing.run_billing(PERIOD.replace(month=11))['invoices'] == 9
+        assert Invoice.objects.count() == 18
+
+    def test_counts_only_the_invoices_inserted(self, monkeypatch):
+        load_rates = billing.load_rates
+
+        def racing_run(building_ids):
+            # Another run invoices a tenant after this one has read the tenants to bill.
+            tenant = Tenant.objects.order_by('pk').first()
+            Invoice.objects.create(tenant=tenant, building_id=tenant.building_id, period=PERIOD, house_number=tenant.house_number,
+                                   number_of_rooms=tenant.number_of_rooms, number_of_people=tenant.number_of_people, amount=Decimal('1'))
+            return load_rates(building_ids)
+
+        monkeypatch.setattr(billing, 'load_rates', racing_run)
+        assert billing.bill_tenants(PERIOD) == (7, 0)
+        assert Invoice.objects.filter(period=PERIOD).count() == 8
+
+    def test_counts_only_the_invoices_of_the_period(self, monkeypatch):
+        bulk_create = Invoice.objects.bulk_create
+
+        def racing_insert(invoices, **kwargs):
+            created = bulk_create(invoices, **kwargs)
+            # A run for the next month invoices a tenant of the range before this one counts.
+            tenant = Tenant.objects.order_by('pk').first()
+            Invoice.objects.create(tenant=tenant, building_id=tenant.building_id, period=PERIOD.replace(month=11),
+                                   house_number=tenant.house_number, number_of_rooms=tenant.number_of_rooms,
+                                   number_of_people=tenant.number_of_people, amount=Decimal('1'))
+            return created
+
+        monkeypatch.setattr(Invoice.objects, 'bulk_create', racing_insert)
+        assert billing.bill_tenants(PERIOD) == (8, 0)
+
+    def test_invoices_outlive_tenants_and_buildings(self):
+        billing.run_billing(PERIOD)
+        tenant = Tenant.objects.filter(building=self.acacia).first()
+        services.move_out_tenants([tenant.pk])
+        assert Invoice.objects.filter(tenant__isnull=True, building=self.acacia).count() == 1
+
+        services.delete_building(self.acacia.pk, chunk_size=2)
+        services.delete_building(self.baobab.pk)
+        assert Invoice.objects.count() == 8
+        assert not Invoice.objects.filter(tenant__isnull=False).exists()
+        assert not RentRate.objects.filter(building__isnull=False).exists()
+
+    def test_command(self, capsys):
+        call_command('run_billing', '--period', '2026-10', '--chunk-size', '5')
+        assert 'Issued 8 invoices for 2026-10.' in capsys.readouterr().out
+        with pytest.raises(CommandError):
+            call_command('run_billing', '--period', 'October')
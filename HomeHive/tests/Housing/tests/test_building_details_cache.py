@@ -0,0 +1,99 @@
+import re
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing.amenities import set_building_amenities
+from Housing.models import Building, Caretaker, Tenant
+
+@pytest.mark.django_db
+class TestBuildingDetailsCache:
+    @pytest.fixture(autouse=True)
+    def setup(self, django_capture_on_commit_callbacks, settings, tmp_path):
+        from django.test import Client
+
+        # A cache shared by the worker processes, like Redis or Memcached in production.
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path)}}
+        self.client = Client()
+        self.capture = django_capture_on_commit_callbacks
+        with self.capture(execute=True):
+            self.building = Building.objects.create(building_name='Sunrise', owner='John Doe', location='Sample Location', total_number_of_houses=3, available_houses=3)
+            self.caretaker = Caretaker.objects.create(name='Otieno', phone_number='0712345678', building=self.building)
+        self.url = reverse('building-details', kwargs={'building_id': self.building.pk})
+
+    def page(self):
+        return self.client.get(self.url).content.decode('utf-8')
+
+    def test_repeat_views_run_no_queries(self):
+        self.page()
+        with CaptureQueriesContext(connection) as ctx:
+            content = self.page()
+        assert 'Sunrise' in content and 'Otieno' in content
+        assert len(ctx.captured_queries) == 0
+
+    def test_csrf_token_is_not_cached(self):
+        from django.test import Client
+
+        tokens = set()
+        for client in (self.client, Client(), Client()):
+            content = client.get(self.url).content.decode('utf-8')
+            tokens.update(re.findall(r'name="csrfmiddlewaretoken" value="([^"]+)"', content))
+        assert len(tokens) == 3
+
+    def test_changes_invalidate_the_page(self):
+        self.page()
+        with self.capture(execute=True):
+            tenant = Tenant.objects.create(name='Jane', house_number='A1', phone_number='0712345678',
+                                           building=self.building, number_of_rooms=1, number_of_people=4)
+        content = self.page()
+        assert 'Total Tenants: 4' in content
+        assert 'Available Houses:</strong> 2' in content
+
+        with self.capture(execute=True):
+            tenant.delete()
+            self.caretaker.name = 'Wafula'
+            self.caretaker.save()
+        content = self.page()
+        assert 'Total Tenants: 0' in content and 'Wafula' in content
+
+        with self.capture(execute=True):
+            set_building_amenities(self.building, ['gym'])
+        assert 'gym' in self.page()
+
+        with self.capture(execute=True):
+            self.caretaker.delete()
+        assert 'Wafula' not in self.page()
+
+    def page_on(self, worker):
+        # Each worker process has its own connection to the cache.
+        caches['default'] = worker
+        return self.page()
+
+    def edit_on(self, worker, name):
+        caches['default'] = worker
+        with self.capture(execute=True):
+            self.caretaker.name = name
+            self.caretaker.save()
+
+    def test_changes_invalidate_the_page_on_every_worker(self):
+        first, second = caches.create_connection('default'), caches.create_connection('default')
+        self.page_on(first)
+        with CaptureQueriesContext(connection) as ctx:
+            assert 'Otieno' in self.page_on(second)
+        assert len(ctx.captured_queries) == 0
+
+        self.edit_on(first, 'Wafula')
+        assert 'Wafula' in self.page_on(second)
+
+    def test_per_process_cache_is_not_used(self):
+        first, second = LocMemCache('first-worker', {}), LocMemCache('second-worker', {})
+        assert 'Otieno' in self.page_on(second)
+        self.edit_on(first, 'Wafula')
+        assert 'Wafula' in self.page_on(second)
+
+    def test_missing_building_returns_404(self):
+        assert self.client.get(reverse('building-details', kwargs={'building_id': 0})).status_code == 404
@@ -0,0 +1,60 @@
+from asgiref.sync import async_to_sync
+from django.db import connection
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing import async_views, views
+from Housing.pagination import encode_cursor
+from Housing.models import Amenity, Building
+
+@pytest.mark.django_db
+class TestBuildingListing:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        from django.test import Client
+
+        self.client = Client()
+        monkeypatch.setattr(views, 'BUILDINGS_PAGE_SIZE', 2)
+        gym = Amenity.objects.get(name='gym')
+        # Two buildings share a name so the id tie-breaker is exercised.
+        for name in ('Cedar', 'Acacia', 'Baobab', 'Acacia', 'Dove'):
+            building = Building.objects.create(building_name=name, owner='John Doe', location='Sample Location', total_number_of_houses=3, available_houses=3)
+            building.amenities.add(gym)
+
+    def test_json_pages_cover_every_building_once(self):
+        names, cursor, pages = [], None, 0
+        while True:
+            params = {'cursor': cursor} if cursor else {}
+            with CaptureQueriesContext(connection) as ctx:
+                data = self.client.get(reverse('list-buildings'), params).json()
+            # One query for the page and one for its amenities, however deep the page is.
+            assert len(ctx.captured_queries) == 2
+            names += [row['building_name'] for row in data['results']]
+            assert all(row['amenities'] == ['gym'] for row in data['results'])
+            pages += 1
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        assert names == ['Acacia', 'Acacia', 'Baobab', 'Cedar', 'Dove']
+        assert pages == 3
+
+    def test_main_page_renders_first_page(self):
+        response = self.client.get(reverse('building-view'))
+        assert response.status_code == 200
+        assert [building.building_name for building in response.context['buildings']] == ['Acacia', 'Acacia']
+        assert response.context['next_cursor'] in response.content.decode('utf-8')
+
+    def test_invalid_cursor(self):
+        assert self.client.get(reverse('list-buildings'), {'cursor': 'nope'}).status_code == 400
+
+    def test_cursor_values_must_fit_the_ordering(self):
+        for key in (['a', 'x'], [None, 1], ['a', {'k': 1}], [['a'], 1]):
+            cursor = encode_cursor(key)
+            assert self.client.get(reverse('list-buildings'), {'cursor': cursor}).status_code == 400
+            assert self.client.get(reverse('search-buildings'), {'cursor': cursor}).status_code == 400
+            request = RequestFactory().get(reverse('list-buildings'), {'cursor': cursor})
+            assert async_to_sync(async_views.list_buildings)(request).status_code == 400
+            assert self.client.get(reverse('building-view'), {'cursor': cursor}).status_code == 302
+        assert self.client.get(reverse('list-buildings'), {'cursor': encode_cursor(['Acacia', '1'])}).status_code == 200
@@ -0,0 +1,141 @@
+import json
+
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing import services
+from Housing.counters import find_occupancy_drift
+from Housing.models import Building, BuildingOccupancySummary, Tenant, TotalTenants
+
+@pytest.mark.django_db
+class TestBulkTenantOperations:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        cache.clear()
+        self.client = Client()
+        self.source = Building.objects.create(building_name='Acacia', owner='John Doe', location='Kilimani', total_number_of_houses=10, available_houses=10)
+        self.target = Building.objects.create(building_name='Baobab', owner='John Doe', location='Westlands', total_number_of_houses=4, available_houses=4)
+        self.tenants = [self.add_tenant(self.source, str(number), people=number) for number in range(1, 6)]
+        self.add_tenant(self.target, '1', people=2)
+
+    def add_tenant(self, building, house_number, people):
+        return Tenant.objects.create(name='Jane', house_number=house_number, phone_number='0712345678',
+                                     building=building, number_of_rooms=1, number_of_people=people)
+
+    def counters(self, building):
+        building.refresh_from_db()
+        return building.available_houses, TotalTenants.objects.get(building=building).total_count
+
+    def post(self, name, payload):
+        return self.client.post(reverse(name), json.dumps(payload), content_type='application/json')
+
+    def test_move_applies_one_delta_per_building(self):
+        moved = [tenant.pk for tenant in self.tenants[1:4]]
+        result = services.move_tenants(moved, self.target.pk, house_numbers={self.tenants[1].pk: '5'})
+
+        assert result == {'moved': 3, 'missing': []}
+        assert self.counters(self.source) == (8, 6)
+        assert self.counters(self.target) == (0, 2 + 2 + 3 + 4)
+        assert sorted(Tenant.objects.filter(building=self.target).values_list('house_number', flat=True)) == ['1', '3', '4', '5']
+        assert BuildingOccupancySummary.objects.get(building=self.target).occupied_houses == 4
+        assert find_occupancy_drift() == []
+
+    def test_tenants_swap_house_numbers_within_a_building(self):
+        first, last = self.tenants[0], self.tenants[4]
+        response = self.post('move-tenants', {'tenant_ids': [first.pk, last.pk], 'building_id': self.source.pk,
+                                              'house_numbers': {first.pk: '5', last.pk: '1'}})
+        assert response.json() == {'moved': 2, 'missing': []}
+        assert Tenant.objects.get(pk=first.pk).house_number == '5'
+        assert Tenant.objects.get(pk=last.pk).house_number == '1'
+        assert self.counters(self.source) == (5, 15)
+        assert find_occupancy_drift() == []
+
+    def test_query_count_does_not_grow_with_tenants(self):
+        with CaptureQueriesContext(connection) as one:
+            services.move_out_tenants([self.tenants[0].pk])
+        with CaptureQueriesContext(connection) as many:
+            services.move_out_tenants([tenant.pk for tenant in self.tenants[1:]])
+        assert len(many.captured_queries) == len(one.captured_queries)
+        assert self.counters(self.source) == (10, 0)
+        assert find_occupancy_drift() == []
+
+    def test_conflicts_change_nothing(self):
+        response = self.post('move-tenants', {'tenant_ids': [self.tenants[0].pk, self.tenants[1].pk], 'building_id': self.target.pk})
+        assert response.status_code == 409
+        assert response.json()['conflicts'] == ['1']
+
+        response = self.post('move-tenants', {'tenant_ids': [tenant.pk for tenant in self.tenants], 'building_id': self.target.pk,
+                                              'house_numbers': {self.tenants[0].pk: '9'}})
+        assert response.status_code == 409
+        assert 'available houses' in response.json()['error']
+        assert Tenant.objects.filter(building=self.source).count() == 5
+        assert self.counters(self.target) == (3, 2)
+
+    def test_endpoints(self):
+        response = self.post('move-tenants', {'tenant_ids': [self.tenants[0].pk, 0], 'building_id': self.target.pk,
+                                              'house_numbers': {self.tenants[0].pk: '2'}})
+        assert response.json() == {'moved': 1, 'missing': [0]}
+        details = self.client.get(reverse('building-details', kwargs={'building_id': self.target.pk}))
+        assert details.context['building'].available_houses == 2
+
+        response = self.post('move-out-tenants', {'tenant_ids': [self.tenants[1].pk]})
+        assert response.json() == {'moved_out': 1, 'missing': []}
+        assert self.counters(self.source) == (7, 3 + 4 + 5)
+
+        assert self.post('move-out-tenants', {'tenant_ids': []}).status_code == 400
+        assert self.post('move-tenants', {'tenant_ids': [self.tenants[2].pk], 'building_id': 0}).status_code == 404
+        assert self.client.get(reverse('move-out-tenants')).status_code == 405
+
+    def test_bulk_requests_are_validated(self):
+        tenant = self.tenants[0]
+        for payload in ({'tenant_ids': str(tenant.pk), 'building_id': self.target.pk},
+                        {'tenant_ids': [str(tenant.pk)], 'building_id': self.target.pk},
+                        {'tenant_ids': [True], 'building_id': self.target.pk},
+                        {'tenant_ids': [tenant.pk], 'building_id': 'x'},
+                        {'tenant_ids': [tenant.pk], 'building_id': self.target.pk, 'house_numbers': {tenant.pk: None}},
+                        {'tenant_ids': [tenant.pk], 'building_id': self.target.pk, 'house_numbers': {tenant.pk: ' '}},
+                        {'tenant_ids': [tenant.pk], 'building_id': self.target.pk, 'house_numbers': {tenant.pk: 'A' * 11}},
+                        {'tenant_ids': [tenant.pk], 'building_id': self.target.pk, 'house_numbers': {'x': '2'}},
+                        {'tenant_ids': [tenant.pk], 'building_id': self.target.pk, 'house_numbers': ['2']}):
+            assert self.post('move-tenants', payload).status_code == 400
+        assert self.post('move-out-tenants', {'tenant_ids': '123'}).status_code == 400
+        assert self.post('move-out-tenants', [tenant.pk]).status_code == 400
+        assert Tenant.objects.get(pk=tenant.pk).building_id == self.source.pk
+
+    def test_tenant_update_adjusts_people_count(self):
+        tenant = self.tenants[0]
+        response = self.client.post(reverse('update-tenant', kwargs={'tenant_id': tenant.pk}), {
+            'name': 'Jane', 'phone_number': '0712345678', 'house_number': '1', 'number_of_rooms': 1, 'number_of_people': 6,
+        })
+        assert response.status_code == 302
+        assert self.counters(self.source) == (5, 20)
+
+        response = self.client.post(reverse('update-tenant', kwargs={'tenant_id': tenant.pk}), {
+            'name': 'Jane', 'phone_number': '0712345678', 'house_number': '2', 'number_of_rooms': 1, 'number_of_people': 6,
+        })
+        assert response.status_code == 200
+        assert 'House number 2 is occupied.' in response.context['form'].errors['house_number']
+        assert find_occupancy_drift() == []
+
+    def test_every_tenant_save_adjusts_the_counters(self):
+        # Saves outside the update view, as from the admin or a service.
+        tenant = Tenant.objects.get(pk=self.tenants[0].pk)
+        tenant.number_of_people = 7
+        tenant.save()
+        tenant.save()
+        moved = Tenant.objects.get(pk=self.tenants[1].pk)
+        moved.building, moved.house_number = self.target, '2'
+        moved.save()
+
+        response = self.client.get(reverse('api-total-tenants'), {'building': self.source.pk})
+        assert response.json()['results'][0]['total_count'] == 7 + 3 + 4 + 5
+        response = self.client.get(reverse('api-total-tenants'), {'building': self.target.pk})
+        assert response.json()['results'][0]['total_count'] == 2 + 2
+        assert self.counters(self.source) == (6, 19)
+        assert self.counters(self.target) == (2, 4)
+        assert find_occupancy_drift() == []
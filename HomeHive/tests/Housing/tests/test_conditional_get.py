@@ -0,0 +1,81 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing.amenities import set_building_amenities
+from Housing.models import Building, Caretaker, Tenant
+
+@pytest.mark.django_db
+class TestConditionalGet:
+    @pytest.fixture(autouse=True)
+    def setup(self, django_capture_on_commit_callbacks, settings, tmp_path):
+        from django.test import Client
+
+        # Pages are only validated with a cache shared by the worker processes.
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path)}}
+        self.client = Client()
+        self.capture = django_capture_on_commit_callbacks
+        with self.capture(execute=True):
+            self.building = Building.objects.create(building_name='Sunrise', owner='John Doe', location='Sample Location', total_number_of_houses=3, available_houses=3)
+            self.caretaker = Caretaker.objects.create(name='Otieno', phone_number='0712345678', building=self.building)
+            self.tenant = Tenant.objects.create(name='Jane', house_number='A1', phone_number='0712345678',
+                                                building=self.building, number_of_rooms=1, number_of_people=2)
+        self.building_url = reverse('building-details', kwargs={'building_id': self.building.pk})
+        self.tenant_url = reverse('tenant-detail', kwargs={'tenant_id': self.tenant.pk})
+
+    def etag(self, url):
+        # The first view sets the CSRF cookie, which is part of the ETag of later views.
+        self.client.get(url)
+        response = self.client.get(url)
+        assert response.status_code == 200
+        assert response.has_header('Last-Modified')
+        assert 'no-cache' in response['Cache-Control']
+        return response['ETag']
+
+    def revalidate(self, url, etag):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_building_page_is_not_modified(self):
+        etag = self.etag(self.building_url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.revalidate(self.building_url, etag)
+        assert response.status_code == 304
+        assert not response.templates
+        assert len(ctx.captured_queries) == 0
+
+    def test_related_changes_modify_building_page(self):
+        changes = [
+            self.caretaker.save,
+            lambda: set_building_amenities(self.building, ['gym']),
+            lambda: Tenant.objects.create(name='Joe', house_number='A2', phone_number='0712345678',
+                                          building=self.building, number_of_rooms=1, number_of_people=1),
+            lambda: Building.objects.create(owner='Jane Doe', location='Other Location', total_number_of_houses=1, available_houses=1),
+        ]
+        for change in changes:
+            etag = self.etag(self.building_url)
+            with self.capture(execute=True):
+                change()
+            response = self.revalidate(self.building_url, etag)
+            assert response.status_code == 200
+            assert response['ETag'] != etag
+
+    def test_caretaker_change_stamps_building(self):
+        before = Building.objects.get(pk=self.building.pk).updated_at
+        self.caretaker.save()
+        assert Building.objects.get(pk=self.building.pk).updated_at > before
+
+    def test_tenant_page(self):
+        etag = self.etag(self.tenant_url)
+        response = self.revalidate(self.tenant_url, etag)
+        assert response.status_code == 304
+
+        self.tenant.number_of_rooms = 2
+        self.tenant.save()
+        response = self.revalidate(self.tenant_url, etag)
+        assert response.status_code == 200
+        assert 'Number of Rooms: 2' in response.content.decode('utf-8')
+
+    def test_missing_rows_return_404(self):
+        assert self.client.get(reverse('building-details', kwargs={'building_id': 0})).status_code == 404
+        assert self.client.get(reverse('tenant-detail', kwargs={'tenant_id': 0})).status_code == 404
@@ -0,0 +1,85 @@
+from django.db import connection
+from django.db.models.signals import pre_save
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing.models import Building, Tenant, TotalTenants
+
+@pytest.mark.django_db
+class TestOccupancyCounters:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        self.client = Client()
+        self.building = Building.objects.create(owner='John Doe', location='Sample Location', total_number_of_houses=3, available_houses=3)
+
+    def add_tenant(self, house_number, people=2):
+        return Tenant.objects.create(name='Jane', house_number=house_number, phone_number='0712345678',
+                                     building=self.building, number_of_rooms=1, number_of_people=people)
+
+    def test_tenant_creation_and_deletion_update_counters(self):
+        first = self.add_tenant('A1', people=2)
+        self.add_tenant('A2', people=3)
+        self.building.refresh_from_db()
+        assert self.building.available_houses == 1
+        assert TotalTenants.objects.get(building=self.building).total_count == 5
+
+        first.delete()
+        self.building.refresh_from_db()
+        assert self.building.available_houses == 2
+        assert TotalTenants.objects.get(building=self.building).total_count == 3
+
+    def test_counter_updates_do_not_reload_the_building(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.add_tenant('A1')
+        writes = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE'))]
+        summary_writes = [sql for sql in writes if '"Housing_buildingoccupancysummary"' in sql]
+        unit_writes = [sql for sql in writes if '"Housing_unit"' in sql]
+        event_writes = [sql for sql in writes if '"Housing_occupancyevent"' in sql]
+        # Every statement of a sign-up, so that more write amplification shows: the savepoint around the tenant
+        # insert, one UPDATE per counter, the occupancy summary, the unit claim and the move-in event.
+        assert len(ctx.captured_queries) == 10
+        assert len(writes) == 7
+        assert len(summary_writes) == 1
+        assert len(event_writes) == 1
+        # No unit is numbered A1, so claiming one tries the number first and then renames the first vacant unit.
+        assert len(unit_writes) == 2
+        assert not any('SELECT' in q['sql'] and '"Housing_building"' in q['sql'] for q in ctx.captured_queries)
+
+    def test_stale_instance_does_not_overwrite_counter(self):
+        stale = Building.objects.get(pk=self.building.pk)
+        self.add_tenant('A1')
+        Tenant.objects.create(name='Joe', house_number='A2', phone_number='0712345678',
+                              building=stale, number_of_rooms=1, number_of_people=1)
+        self.building.refresh_from_db()
+        assert self.building.available_houses == 1
+
+    def update_building(self, total_number_of_houses):
+        return self.client.post(reverse('building-update', kwargs={'pk': self.building.pk}), {
+            'building_name': 'Sunrise', 'owner': 'John Doe', 'location': 'Sample Location', 'total_number_of_houses': total_number_of_houses,
+        })
+
+    def test_building_edit_does_not_overwrite_counter(self):
+        def sign_up_meanwhile(sender, instance, **kwargs):
+            pre_save.disconnect(sign_up_meanwhile, sender=Building)
+            self.add_tenant('A1')
+
+        # A tenant signs up between the form loading the building and saving it.
+        pre_save.connect(sign_up_meanwhile, sender=Building)
+        try:
+            assert self.update_building(3).status_code == 302
+        finally:
+            pre_save.disconnect(sign_up_meanwhile, sender=Building)
+        self.building.refresh_from_db()
+        assert (self.building.building_name, self.building.available_houses) == ('Sunrise', 2)
+
+    def test_building_resize_moves_available_houses(self):
+        self.add_tenant('A1')
+        self.update_building(5)
+        self.building.refresh_from_db()
+        assert self.building.available_houses == 4
+        self.update_building(1)
+        self.building.refresh_from_db()
+        assert self.building.available_houses == 0
@@ -0,0 +1,59 @@
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+import pytest
+
+from Housing.management.benchmark import run_write_benchmark
+from Housing.models import Building, Tenant, TotalTenants
+from Housing.transactions import write_atomic
+
+@pytest.mark.django_db
+class TestDatabaseProfile:
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_sqlite_pragmas_are_applied(self):
+        assert self.pragma('synchronous') == 1  # NORMAL
+        assert self.pragma('busy_timeout') == 20000
+        assert self.pragma('cache_size') == -65536
+
+    def test_tracked_database_is_not_switched_to_wal(self, settings):
+        # The journal mode is stored in the database file.
+        assert 'journal_mode' not in settings.HOUSING_SQLITE_PRAGMAS
+
+@pytest.mark.django_db(transaction=True)
+class TestWriteTransactions:
+    def test_write_transactions_begin_immediate(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with write_atomic():
+                with write_atomic():
+                    Building.objects.update(available_houses=0)
+        assert ctx.captured_queries[0]['sql'] == 'BEGIN IMMEDIATE'
+        assert ctx.captured_queries[1]['sql'].startswith('SAVEPOINT')
+
+    def test_other_transactions_begin_deferred(self):
+        with CaptureQueriesContext(connection) as ctx:
+            with transaction.atomic():
+                Tenant.objects.exists()
+            with transaction.atomic():
+                Tenant.objects.exists()
+        assert [query['sql'] for query in ctx.captured_queries if query['sql'].startswith('BEGIN')] == ['BEGIN', 'BEGIN']
+
+    def test_tenant_save_begins_immediate(self):
+        building = Building.objects.create(owner='John Doe', location='Sample Location', total_number_of_houses=2,
+                                           available_houses=2)
+        with CaptureQueriesContext(connection) as ctx:
+            Tenant.objects.create(name='Jane', house_number='A1', phone_number='0712345678',
+                                  building=building, number_of_rooms=1, number_of_people=2)
+        assert ctx.captured_queries[0]['sql'] == 'BEGIN IMMEDIATE'
+
+    def test_write_benchmark_counts_tenants(self):
+        # The in-memory test database shares one cache between connections, whose table locks
+        # don't honour the busy timeout, so concurrency itself is benchmarked on a file database
+        # by the benchmark_writes command.
+        result = run_write_benchmark(threads=1, tenants_per_thread=5)
+        assert (result['written'], result['failed']) == (5, 0)
+        building = Building.objects.get()
+        assert building.available_houses == 0
+        assert TotalTenants.objects.get(building=building).total_count == 5
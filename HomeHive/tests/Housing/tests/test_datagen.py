@@ -0,0 +1,31 @@
+from django.db.models import Count, F, Sum
+import pytest
+
+from Housing.datagen import generate_dataset
+from Housing.models import Building, Tenant, TotalTenants
+from Housing.search import search_tenants
+
+@pytest.mark.django_db
+class TestGenerateDataset:
+    def test_dataset_respects_invariants(self):
+        counts = generate_dataset(20, houses_per_building=(2, 8), occupancy=0.5, amenities_per_building=(1, 3), seed=7)
+
+        assert Building.objects.count() == counts['buildings'] == 20
+        assert Tenant.objects.count() == counts['tenants']
+        assert Building.amenities.through.objects.count() == counts['amenity_links']
+        assert not Building.objects.filter(available_houses__gt=F('total_number_of_houses')).exists()
+        assert not Tenant.objects.values('building', 'house_number').annotate(n=Count('id')).filter(n__gt=1).exists()
+        for building in Building.objects.annotate(occupied=Count('tenants'), people=Sum('tenants__number_of_people')):
+            assert building.available_houses == building.total_number_of_houses - building.occupied
+            assert TotalTenants.objects.get(building=building).total_count == (building.people or 0)
+
+        tenant = Tenant.objects.first()
+        results, _ = search_tenants(tenant.phone_number)
+        assert tenant.pk in [row['id'] for row in results]
+
+    def test_same_seed_same_data(self):
+        generate_dataset(3, houses_per_building=4, seed=1)
+        first = list(Tenant.objects.order_by('pk').values_list('name', 'phone_number', 'house_number'))
+        Building.objects.all().delete()
+        generate_dataset(3, houses_per_building=4, seed=1)
+        assert list(Tenant.objects.order_by('pk').values_list('name', 'phone_number', 'house_number')) == first
@@ -0,0 +1,89 @@
+import io
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing import services
+from Housing.amenities import set_building_amenities
+from Housing.datagen import TENANT_FIELDS, insert_rows
+from Housing.models import Building, BuildingOccupancySummary, Caretaker, Tenant, TotalTenants
+
+@pytest.mark.django_db
+class TestDeleteBuilding:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        cache.clear()
+        self.client = Client()
+        self.building = self.create_building('Acacia', tenants=50)
+        self.other = self.create_building('Baobab', tenants=3)
+
+    def create_building(self, name, tenants):
+        building = Building.objects.create(building_name=name, owner='John Doe', location='Kilimani',
+                                           total_number_of_houses=tenants, available_houses=tenants)
+        insert_rows(Tenant, TENANT_FIELDS, [('Jane', str(number), '0712345678', building.pk, 1, 2) for number in range(tenants)])
+        Caretaker.objects.create(name='Caretaker', phone_number='0712345678', building=building)
+        set_building_amenities(building, ['wifi', 'parking'])
+        return building
+
+    def assert_deleted(self, building):
+        assert not Building.objects.filter(pk=building.pk).exists()
+        for model in (Tenant, Caretaker, TotalTenants, BuildingOccupancySummary, Building.amenities.through):
+            assert not model.objects.filter(building_id=building.pk).exists()
+        assert Tenant.objects.filter(building=self.other).count() == 3
+        assert TotalTenants.objects.filter(building=self.other).exists()
+
+    def test_view_deletes_with_a_few_statements(self, django_capture_on_commit_callbacks):
+        self.client.get(reverse('building-view'))
+        with CaptureQueriesContext(connection) as ctx, django_capture_on_commit_callbacks(execute=True):
+            response = self.client.post(reverse('delete-building', kwargs={'pk': self.building.pk}))
+        assert response.status_code == 302
+        assert len(ctx.captured_queries) < 25
+        self.assert_deleted(self.building)
+        assert 'Acacia' not in self.client.get(reverse('building-view')).content.decode()
+
+    def test_chunked_delete(self):
+        assert services.delete_building(self.building.pk, chunk_size=20)
+        self.assert_deleted(self.building)
+        assert not services.delete_building(self.building.pk)
+
+    def test_large_building_is_deleted_in_background(self, settings, monkeypatch):
+        settings.HOUSING_BACKGROUND_DELETE_TENANTS = 10
+        started = []
+        monkeypatch.setattr(services, 'delete_building_in_background', started.append)
+        self.client.post(reverse('delete-building', kwargs={'pk': self.other.pk}))
+        self.client.post(reverse('delete-building', kwargs={'pk': self.building.pk}))
+        assert started == [self.building.pk]
+        assert not Building.objects.filter(pk=self.other.pk).exists()
+
+    def test_interrupted_background_delete_is_finished_by_reconcile(self, monkeypatch):
+        class StoppedWorker:
+            # The worker stops before the thread gets to run.
+            def __init__(self, target, **kwargs):
+                pass
+
+            def start(self):
+                pass
+
+        monkeypatch.setattr(services.threading, 'Thread', StoppedWorker)
+        services.delete_building_in_background(self.building.pk)
+        assert Building.objects.get(pk=self.building.pk).pending_deletion
+        assert not Building.objects.get(pk=self.other.pk).pending_deletion
+
+        call_command('reconcile_occupancy', '--dry-run', stdout=io.StringIO())
+        assert Building.objects.filter(pk=self.building.pk).exists()
+        out = io.StringIO()
+        call_command('reconcile_occupancy', stdout=out)
+        assert 'Deleted 1 buildings pending deletion.' in out.getvalue()
+        self.assert_deleted(self.building)
+
+    def test_cascade_skips_tenant_counter_maintenance(self):
+        with CaptureQueriesContext(connection) as ctx:
+            self.building.delete()
+        updates = [q['sql'] for q in ctx.captured_queries if q['sql'].startswith('UPDATE')]
+        assert not any('"Housing_building"' in sql or '"Housing_totaltenants"' in sql for sql in updates)
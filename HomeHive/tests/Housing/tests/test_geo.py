@@ -0,0 +1,72 @@
+import random
+
+from django.core.management import call_command
+from django.db import connection
+from django.urls import reverse
+import pytest
+
+from Housing import geo
+from Housing.models import Building
+
+@pytest.mark.django_db
+class TestProximitySearch:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        self.client = Client()
+        self.kilimani = Building.objects.create(building_name='Acacia', owner='John Doe', location='Kilimani', total_number_of_houses=2, available_houses=2)
+        self.westlands = Building.objects.create(building_name='Baobab', owner='John Doe', location='Westlands, Nairobi', total_number_of_houses=2, available_houses=2)
+        self.unknown = Building.objects.create(building_name='Cedar', owner='John Doe', location='Atlantis', total_number_of_houses=2, available_houses=2)
+
+    def test_buildings_are_geocoded_on_save(self):
+        assert (self.kilimani.latitude, self.kilimani.longitude) == geo.geocode('kilimani')
+        assert self.kilimani.grid_cell == geo.grid_cell(self.kilimani.latitude, self.kilimani.longitude)
+        assert (self.westlands.latitude, self.westlands.longitude) == geo.geocode('Westlands')
+        assert self.unknown.latitude is None and self.unknown.grid_cell is None
+
+        response = self.client.post(reverse('building-update', kwargs={'pk': self.kilimani.pk}), {
+            'building_name': 'Acacia', 'owner': 'John Doe', 'location': 'Karen', 'total_number_of_houses': 2,
+        })
+        assert response.status_code == 302
+        self.kilimani.refresh_from_db()
+        assert (self.kilimani.latitude, self.kilimani.longitude) == geo.geocode('Karen')
+
+    def test_geocode_command_fills_bulk_written_rows(self):
+        Building.objects.update(latitude=None, longitude=None, grid_cell=None)
+        call_command('geocode_buildings')
+        self.westlands.refresh_from_db()
+        assert self.westlands.grid_cell == geo.grid_cell(*geo.geocode('Westlands'))
+
+    def test_queries_match_a_full_scan(self):
+        rng = random.Random(1)
+        Building.objects.bulk_create([
+            Building(building_name=f'Court {index}', owner='John Doe', location='Nairobi', total_number_of_houses=1, available_houses=1,
+                     latitude=lat, longitude=lon, grid_cell=geo.grid_cell(lat, lon))
+            for index, (lat, lon) in enumerate((-1.29 + rng.uniform(-0.3, 0.3), 36.82 + rng.uniform(-0.3, 0.3)) for _ in range(400))
+        ])
+        points = list(Building.objects.filter(latitude__isnull=False).values_list('pk', 'latitude', 'longitude'))
+        origin = (-1.3, 36.8)
+        by_distance = sorted(points, key=lambda point: (geo.distance_km(*origin, point[1], point[2]), point[0]))
+
+        within = [row['pk'] for row in geo.buildings_within(*origin, 5)]
+        assert within == [pk for pk, lat, lon in by_distance if geo.distance_km(*origin, lat, lon) <= 5]
+        assert [row['pk'] for row in geo.nearest_buildings(*origin, 25)] == [pk for pk, _, _ in by_distance[:25]]
+        if connection.vendor == 'sqlite':
+            # Radius queries read the candidates from the grid index alone.
+            sql, params = geo.candidate_sql(*origin, 5)
+            with connection.cursor() as cursor:
+                cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+                plan = ' '.join(str(row) for row in cursor.fetchall())
+            assert 'COVERING INDEX building_grid_idx' in plan
+
+    def test_endpoint(self):
+        response = self.client.get(reverse('nearby-buildings'), {'near': 'Kilimani', 'k': 1})
+        assert [row['building_name'] for row in response.json()['results']] == ['Acacia']
+        assert response.json()['results'][0]['distance_km'] == 0
+
+        response = self.client.get(reverse('nearby-buildings'), {'lat': -1.29, 'lon': 36.79, 'radius_km': 10})
+        assert [row['building_name'] for row in response.json()['results']] == ['Acacia', 'Baobab']
+
+        for params in ({'near': 'Atlantis'}, {'lat': 95, 'lon': 0}, {'lat': 'x'}, {'near': 'Karen', 'k': 0}, {'near': 'Karen', 'radius_km': 500}):
+            assert self.client.get(reverse('nearby-buildings'), params).status_code == 400
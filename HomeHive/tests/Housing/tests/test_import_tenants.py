@@ -0,0 +1,66 @@
+import json
+from io import StringIO
+
+from django.core.management import call_command
+import pytest
+
+from Housing.models import Building, Tenant, TotalTenants
+
+@pytest.mark.django_db
+class TestImportTenants:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.building = Building.objects.create(owner='John Doe', location='Sample Location', total_number_of_houses=3, available_houses=3)
+
+    def test_import_csv(self, tmp_path):
+        path = tmp_path / 'tenants.csv'
+        path.write_text(
+            'name,phone_number,house_number,number_of_rooms,number_of_people\n'
+            'Jane,0712345678,A1,2,3\n'
+            'Joe,0712345679,A2,1,1\n'
+            'Dup,0712345670,A1,1,1\n'
+            'Bad,123,A3,1,1\n'
+        )
+        stderr = StringIO()
+        call_command('import_tenants', str(path), building=self.building.pk, chunk_size=2, stdout=StringIO(), stderr=stderr)
+
+        assert sorted(Tenant.objects.values_list('house_number', flat=True)) == ['A1', 'A2']
+        assert 'Row 3: house number A1 is occupied' in stderr.getvalue()
+        assert 'Row 4: phone_number' in stderr.getvalue()
+        self.building.refresh_from_db()
+        assert self.building.available_houses == 1
+        assert TotalTenants.objects.get(building=self.building).total_count == 4
+
+    def test_import_ndjson_respects_capacity(self, tmp_path):
+        path = tmp_path / 'tenants.ndjson'
+        rows = [{'name': f'T{i}', 'phone_number': '0712345678', 'house_number': str(i), 'number_of_rooms': 1,
+                 'number_of_people': 1, 'building': self.building.pk} for i in range(5)]
+        path.write_text('\n'.join(json.dumps(row) for row in rows))
+        call_command('import_tenants', str(path), stdout=StringIO(), stderr=StringIO())
+
+        assert Tenant.objects.count() == 3
+        self.building.refresh_from_db()
+        assert self.building.available_houses == 0
+
+    def test_counters_cover_chunks_committed_before_a_failure(self, tmp_path, monkeypatch):
+        from Housing.management.commands.import_tenants import Command
+
+        path = tmp_path / 'tenants.ndjson'
+        rows = [{'name': f'T{i}', 'phone_number': '0712345678', 'house_number': str(i), 'number_of_rooms': 1,
+                 'number_of_people': 2, 'building': self.building.pk} for i in range(2)]
+        path.write_text('\n'.join(json.dumps(row) for row in rows))
+        import_chunk = Command.import_chunk
+
+        def fail_after_first_chunk(command, chunk):
+            if command.imported:
+                raise RuntimeError('Connection lost')
+            import_chunk(command, chunk)
+
+        monkeypatch.setattr(Command, 'import_chunk', fail_after_first_chunk)
+        with pytest.raises(RuntimeError):
+            call_command('import_tenants', str(path), chunk_size=1, stdout=StringIO(), stderr=StringIO())
+
+        assert Tenant.objects.count() == 1
+        self.building.refresh_from_db()
+        assert self.building.available_houses == 2
+        assert TotalTenants.objects.get(building=self.building).total_count == 2
@@ -0,0 +1,79 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing import context_processors
+from Housing.models import Building
+
+@pytest.mark.django_db
+class TestNavbarBuildings:
+    @pytest.fixture(autouse=True)
+    def setup(self, django_capture_on_commit_callbacks, settings, tmp_path):
+        from django.test import Client
+
+        # A cache shared by the worker processes, like Redis or Memcached in production.
+        settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': str(tmp_path)}}
+        self.client = Client()
+        with django_capture_on_commit_callbacks(execute=True):
+            self.building = Building.objects.create(building_name='Sunrise', owner='John Doe', location='Sample Location', total_number_of_houses=3, available_houses=3)
+
+    def test_navbar_is_cached(self):
+        response = self.client.get(reverse('building-reg_view'))
+        assert 'Sunrise' in response.content.decode('utf-8')
+
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('building-reg_view'))
+        assert 'Sunrise' in response.content.decode('utf-8')
+        assert len(ctx.captured_queries) == 0
+
+    def test_navbar_is_invalidated_on_building_changes(self, django_capture_on_commit_callbacks):
+        self.client.get(reverse('building-reg_view'))
+
+        with django_capture_on_commit_callbacks(execute=True):
+            self.building.building_name = 'Sunset'
+            self.building.save()
+        assert 'Sunset' in self.client.get(reverse('building-reg_view')).content.decode('utf-8')
+
+        with django_capture_on_commit_callbacks(execute=True):
+            self.building.delete()
+        assert 'Sunset' not in self.client.get(reverse('building-reg_view')).content.decode('utf-8')
+
+    def test_navbar_lists_a_bounded_number_of_buildings(self, django_capture_on_commit_callbacks, monkeypatch):
+        monkeypatch.setattr(context_processors, 'NAVBAR_MAX_BUILDINGS', 2)
+        with django_capture_on_commit_callbacks(execute=True):
+            for name in ('Acacia', 'Baobab'):
+                Building.objects.create(building_name=name, owner='John Doe', location='Sample Location', total_number_of_houses=3, available_houses=3)
+        content = self.client.get(reverse('building-reg_view')).content.decode('utf-8')
+        assert 'Acacia' in content and 'Baobab' in content and 'Sunrise' not in content
+        assert 'All Buildings' in content
+
+    def render_on(self, worker):
+        # Each worker process has its own connection to the cache.
+        caches['default'] = worker
+        return self.client.get(reverse('building-reg_view')).content.decode('utf-8')
+
+    def test_invalidation_reaches_every_worker(self, django_capture_on_commit_callbacks):
+        first, second = caches.create_connection('default'), caches.create_connection('default')
+        self.render_on(first)
+        with CaptureQueriesContext(connection) as ctx:
+            assert 'Sunrise' in self.render_on(second)
+        assert len(ctx.captured_queries) == 0
+
+        caches['default'] = first
+        with django_capture_on_commit_callbacks(execute=True):
+            self.building.building_name = 'Sunset'
+            self.building.save()
+        assert 'Sunset' in self.render_on(second)
+
+    def test_per_process_cache_is_not_used(self, django_capture_on_commit_callbacks):
+        first, second = LocMemCache('first-worker', {}), LocMemCache('second-worker', {})
+        assert 'Sunrise' in self.render_on(second)
+
+        caches['default'] = first
+        with django_capture_on_commit_callbacks(execute=True):
+            self.building.building_name = 'Sunset'
+            self.building.save()
+        assert 'Sunset' in self.render_on(second)
@@ -0,0 +1,98 @@
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing import analytics
+from Housing.models import Building, BuildingOccupancySummary, Tenant
+
+@pytest.mark.django_db
+class TestOccupancyAnalytics:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        self.client = Client()
+        self.first = Building.objects.create(building_name='Acacia', owner='John Doe', location='Kilimani', total_number_of_houses=4, available_houses=4)
+        self.second = Building.objects.create(building_name='Baobab', owner='John Doe', location='Westlands', total_number_of_houses=2, available_houses=2)
+        self.third = Building.objects.create(building_name='Cedar', owner='Jane Doe', location='Kilimani', total_number_of_houses=5, available_houses=5)
+        self.add_tenant(self.first, 'A1', rooms=2, people=3)
+        self.add_tenant(self.first, 'A2', rooms=1, people=1)
+        self.add_tenant(self.second, 'B1', rooms=2, people=4)
+
+    def add_tenant(self, building, house_number, rooms, people):
+        return Tenant.objects.create(name='Jane', house_number=house_number, phone_number='0712345678',
+                                     building=building, number_of_rooms=rooms, number_of_people=people)
+
+    def summary(self, building):
+        row = BuildingOccupancySummary.objects.get(building=building)
+        return row.total_houses, row.occupied_houses, row.total_people, row.total_rooms
+
+    def test_signals_keep_summary_current(self):
+        assert self.summary(self.first) == (4, 2, 4, 3)
+        assert self.summary(self.third) == (5, 0, 0, 0)
+
+        tenant = Tenant.objects.get(building=self.first, house_number='A1')
+        tenant.number_of_people = 5
+        tenant.save()
+        assert self.summary(self.first) == (4, 2, 6, 3)
+        tenant.delete()
+        assert self.summary(self.first) == (4, 1, 1, 1)
+
+        self.third.owner = 'John Doe'
+        self.third.save()
+        assert BuildingOccupancySummary.objects.get(building=self.third).owner == 'John Doe'
+
+        self.second.delete()
+        assert not BuildingOccupancySummary.objects.filter(building_id=self.second.pk).exists()
+
+    def test_tenant_changes_move_the_summary_without_recounting(self):
+        tenant = Tenant.objects.get(building=self.first, house_number='A1')
+        tenant.number_of_rooms = 3
+        tenant.number_of_people = 2
+        with CaptureQueriesContext(connection) as ctx:
+            tenant.save()
+        assert self.summary(self.first) == (4, 2, 3, 4)
+        summary_updates = [query['sql'] for query in ctx.captured_queries if 'UPDATE "Housing_buildingoccupancysummary"' in query['sql']]
+        assert len(summary_updates) == 1
+        assert '"Housing_tenant"' not in summary_updates[0]
+
+        tenant.building = self.third
+        tenant.house_number = 'C1'
+        tenant.save()
+        assert (self.summary(self.first), self.summary(self.third)) == ((4, 1, 1, 1), (5, 1, 2, 3))
+
+        Tenant.objects.get(pk=tenant.pk).delete()
+        assert self.summary(self.third) == (5, 0, 0, 0)
+
+        # A tenant that wasn't loaded from the database has its building's row rebuilt.
+        Tenant(pk=Tenant.objects.get(house_number='A2').pk, name='Jane', house_number='A2', phone_number='0712345678',
+               building=self.first, number_of_rooms=4, number_of_people=1).save()
+        assert self.summary(self.first) == (4, 1, 1, 4)
+
+    def test_rebuild_matches_incremental_updates(self):
+        expected = {row.pk: self.summary(row.building_id) for row in BuildingOccupancySummary.objects.all()}
+        BuildingOccupancySummary.objects.all().delete()
+        call_command('rebuild_occupancy_summary')
+        assert {row.pk: self.summary(row.building_id) for row in BuildingOccupancySummary.objects.all()} == expected
+
+    def test_aggregates(self):
+        totals = analytics.portfolio_totals()
+        assert (totals['buildings'], totals['houses'], totals['occupied'], totals['vacant']) == (3, 11, 3, 8)
+        assert totals['people_per_room'] == pytest.approx(8 / 5)
+
+        owners = {row['owner']: row for row in analytics.occupancy_by_owner()}
+        assert owners['John Doe']['occupancy_rate'] == pytest.approx(50.0)
+        assert owners['Jane Doe']['occupancy_rate'] == pytest.approx(0.0)
+
+        locations = analytics.vacancies_by_location()
+        assert [(row['location'], row['vacant']) for row in locations] == [('Kilimani', 7), ('Westlands', 1)]
+        assert [row['building_name'] for row in analytics.least_occupied_buildings()] == ['Cedar', 'Acacia', 'Baobab']
+
+    def test_dashboard_queries_do_not_touch_tenants(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('occupancy-analytics'))
+        assert response.status_code == 200
+        assert 'Kilimani' in response.content.decode()
+        assert not any('"Housing_tenant"' in query['sql'] for query in ctx.captured_queries)
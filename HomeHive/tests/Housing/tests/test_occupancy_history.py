@@ -0,0 +1,128 @@
+import datetime
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+import pytest
+
+from Housing import history, services
+from Housing.models import Building, OccupancyEvent, OccupancySnapshot, Tenant
+
+@pytest.mark.django_db
+class TestOccupancyHistory:
+    @pytest.fixture(autouse=True)
+    def setup(self, monkeypatch):
+        from django.test import Client
+
+        self.client = Client()
+        # Every event of these tests is committed before the snapshots are taken.
+        monkeypatch.setattr(history, 'SNAPSHOT_GRACE', datetime.timedelta(0))
+        self.acacia = Building.objects.create(building_name='Acacia', owner='John Doe', location='Kilimani', total_number_of_houses=10, available_houses=10)
+        self.baobab = Building.objects.create(building_name='Baobab', owner='John Doe', location='Kilimani', total_number_of_houses=10, available_houses=10)
+
+    def add_tenant(self, building, house_number, people=2):
+        return Tenant.objects.create(name='Jane', house_number=house_number, phone_number='0712345678', building=building,
+                                     number_of_rooms=1, number_of_people=people)
+
+    def occupancy(self, building, moment=None):
+        figures = history.occupancy_at(building.pk, moment or timezone.now())
+        return figures['occupied_houses'], figures['total_people']
+
+    def test_tenant_changes_are_recorded(self):
+        jane = self.add_tenant(self.acacia, '1', people=2)
+        self.add_tenant(self.acacia, '2', people=3)
+        after_move_in = timezone.now()
+
+        jane = Tenant.objects.get(pk=jane.pk)
+        jane.number_of_people = 4
+        jane.save()
+        jane.building = self.baobab
+        jane.save()
+        after_move = timezone.now()
+
+        Tenant.objects.get(pk=jane.pk).delete()
+        assert list(OccupancyEvent.objects.filter(tenant_id=jane.pk).order_by('pk').values_list('building_id', 'kind', 'occupied_delta', 'people_delta')) == [
+            (self.acacia.pk, OccupancyEvent.MOVE_IN, 1, 2),
+            (self.acacia.pk, OccupancyEvent.CHANGE, 0, 2),
+            (self.acacia.pk, OccupancyEvent.MOVE_OUT, -1, -4),
+            (self.baobab.pk, OccupancyEvent.MOVE_IN, 1, 4),
+            (self.baobab.pk, OccupancyEvent.MOVE_OUT, -1, -4),
+        ]
+        assert self.occupancy(self.acacia, after_move_in) == (2, 5)
+        assert self.occupancy(self.acacia, after_move) == (1, 3)
+        assert self.occupancy(self.baobab, after_move) == (1, 4)
+        assert self.occupancy(self.baobab) == (0, 0)
+
+    def test_bulk_operations_are_recorded(self):
+        tenants = [self.add_tenant(self.acacia, str(number)) for number in range(1, 6)]
+        services.move_tenants([tenants[0].pk, tenants[1].pk], self.baobab.pk)
+        services.move_out_tenants([tenants[2].pk])
+        assert self.occupancy(self.acacia) == (2, 4)
+        assert self.occupancy(self.baobab) == (2, 4)
+
+        services.delete_building(self.acacia.pk, chunk_size=1)
+        services.delete_building(self.baobab.pk)
+        assert self.occupancy(self.acacia) == (0, 0)
+        assert self.occupancy(self.baobab) == (0, 0)
+
+    def test_snapshots_bound_the_replay(self):
+        for number in range(1, 6):
+            self.add_tenant(self.acacia, str(number))
+        assert history.occupancy_at(self.acacia.pk, timezone.now())['events_replayed'] == 5
+
+        assert history.take_snapshots() == 1
+        assert history.take_snapshots() == 0
+        self.add_tenant(self.acacia, '6')
+        with CaptureQueriesContext(connection) as queries:
+            figures = history.occupancy_at(self.acacia.pk, timezone.now())
+        assert len(queries) == 2
+        assert (figures['occupied_houses'], figures['total_people'], figures['events_replayed']) == (6, 12, 1)
+
+        history.take_snapshots()
+        assert list(OccupancySnapshot.objects.filter(building=self.acacia).order_by('taken_at')
+                    .values_list('occupied_houses', 'total_people')) == [(5, 10), (6, 12)]
+
+    def test_snapshots_leave_out_events_that_may_be_uncommitted(self, monkeypatch):
+        monkeypatch.setattr(history, 'SNAPSHOT_GRACE', datetime.timedelta(minutes=10))
+        self.add_tenant(self.acacia, '1')
+        OccupancyEvent.objects.update(occurred_at=timezone.now() - datetime.timedelta(hours=1))
+        assert history.take_snapshots() == 1
+        assert OccupancySnapshot.objects.get().taken_at <= timezone.now() - history.SNAPSHOT_GRACE
+
+        # A writer that stamped its event before the snapshot but committed after it.
+        history.record_events([history.move_in_event(self.acacia.pk, None, 3)])
+        OccupancyEvent.objects.filter(people_delta=3).update(occurred_at=timezone.now() - datetime.timedelta(seconds=1))
+        history.take_snapshots()
+        assert self.occupancy(self.acacia) == (2, 5)
+        assert history.compact_events(timezone.now()) == (0, 1)
+        assert self.occupancy(self.acacia) == (2, 5)
+
+    def test_compaction_keeps_recent_history(self):
+        tenants = [self.add_tenant(self.acacia, str(number)) for number in range(1, 4)]
+        horizon = timezone.now()
+        Tenant.objects.get(pk=tenants[0].pk).delete()
+        self.add_tenant(self.baobab, '1', people=5)
+
+        assert history.compact_events(horizon) == (1, 3)
+        assert OccupancyEvent.objects.count() == 2
+        assert self.occupancy(self.acacia, horizon) == (3, 6)
+        assert self.occupancy(self.acacia) == (2, 4)
+        assert self.occupancy(self.baobab) == (1, 5)
+
+        call_command('snapshot_occupancy')
+        call_command('compact_occupancy_events', '--keep-days', '0')
+        assert not OccupancyEvent.objects.exists()
+        assert self.occupancy(self.acacia) == (2, 4)
+        assert self.occupancy(self.baobab) == (1, 5)
+
+    def test_endpoint(self):
+        self.add_tenant(self.acacia, '1', people=3)
+        response = self.client.get(reverse('building-occupancy', kwargs={'building_id': self.acacia.pk}))
+        assert (response.json()['occupied_houses'], response.json()['total_people']) == (1, 3)
+
+        earlier = (timezone.now() - datetime.timedelta(days=1)).isoformat()
+        response = self.client.get(reverse('building-occupancy', kwargs={'building_id': self.acacia.pk}), {'at': earlier})
+        assert response.json()['occupied_houses'] == 0
+        assert self.client.get(reverse('building-occupancy', kwargs={'building_id': self.acacia.pk}), {'at': 'yesterday'}).status_code == 400
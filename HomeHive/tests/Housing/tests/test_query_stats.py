@@ -0,0 +1,49 @@
+import json
+from io import StringIO
+
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.urls import reverse
+import pytest
+
+from Housing.instrumentation import registry
+from Housing.models import Building
+
+@pytest.mark.django_db
+class TestQueryStats:
+    @pytest.fixture(autouse=True)
+    def setup(self, settings, tmp_path):
+        from django.test import Client
+
+        settings.HOUSING_QUERY_STATS = True
+        settings.HOUSING_QUERY_STATS_DIR = str(tmp_path)
+        settings.HOUSING_QUERY_STATS_DUMP_EVERY = 1
+        registry.reset()
+        self.client = Client()
+        self.building = Building.objects.create(owner='John Doe', location='Sample Location', total_number_of_houses=3, available_houses=3)
+
+    def test_requests_are_recorded_per_route(self):
+        for _ in range(3):
+            self.client.get(reverse('building-details', kwargs={'building_id': self.building.pk}))
+        routes = registry.snapshot()['routes']
+        stats = routes['building-details']
+        assert stats['requests'] == 3
+        assert stats['queries']['max'] >= 3
+        assert stats['wall_ms']['count'] == 3
+
+    def test_stats_endpoint_is_staff_only(self):
+        assert self.client.get(reverse('query-stats')).status_code == 403
+        User.objects.create_user('admin', password='secret', is_staff=True)
+        self.client.login(username='admin', password='secret')
+        self.client.get(reverse('building-view'))
+        response = self.client.get(reverse('query-stats'))
+        assert response.status_code == 200
+        assert 'building-view' in response.json()['routes']
+
+    def test_command_merges_dumped_statistics(self, tmp_path):
+        self.client.get(reverse('building-view'))
+        stdout = StringIO()
+        call_command('query_stats', dir=str(tmp_path), stdout=stdout)
+        output = json.loads(stdout.getvalue())
+        assert output['processes'] == 1
+        assert output['routes']['building-view']['requests'] == 1
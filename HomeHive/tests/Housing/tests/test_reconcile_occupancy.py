@@ -0,0 +1,69 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.utils import timezone
+import pytest
+
+from Housing.models import Building, JobCheckpoint, Tenant, TotalTenants
+
+@pytest.mark.django_db
+class TestReconcileOccupancy:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        self.buildings = [Building.objects.create(owner='John Doe', location='Sample Location', total_number_of_houses=4, available_houses=4)
+                          for _ in range(3)]
+        for building in self.buildings:
+            for number in ('A1', 'A2'):
+                Tenant.objects.create(name='Jane', house_number=number, phone_number='0712345678',
+                                      building=building, number_of_rooms=1, number_of_people=3)
+
+    def reconcile(self, *args):
+        out = StringIO()
+        call_command('reconcile_occupancy', *args, stdout=out)
+        return out.getvalue()
+
+    def test_consistent_counters_report_no_drift(self):
+        assert 'all buildings: 0 with drifted counters' in self.reconcile()
+
+    def test_drift_is_reported_and_repaired(self):
+        first, second, third = self.buildings
+        Building.objects.filter(pk=first.pk).update(available_houses=4)
+        TotalTenants.objects.filter(building=second).update(total_count=1)
+        TotalTenants.objects.filter(building=third).delete()
+
+        output = self.reconcile('--dry-run')
+        assert '3 with drifted counters' in output
+        assert f'building {first.pk}: available_houses 4 -> 2' in output
+        assert Building.objects.get(pk=first.pk).available_houses == 4
+
+        self.reconcile()
+        assert [Building.objects.get(pk=b.pk).available_houses for b in self.buildings] == [2, 2, 2]
+        assert [TotalTenants.objects.get(building=b).total_count for b in self.buildings] == [6, 6, 6]
+        assert '0 with drifted counters' in self.reconcile()
+
+    def test_incremental_run_only_checks_changed_buildings(self):
+        first, second, _ = self.buildings
+        self.reconcile('--incremental')
+        assert JobCheckpoint.objects.filter(name='reconcile_occupancy').exists()
+
+        # Drift on an untouched building goes unnoticed until a full run.
+        old = timezone.now() - timedelta(days=1)
+        Building.objects.filter(pk=first.pk).update(available_houses=4, updated_at=old)
+        Tenant.objects.filter(building=first).update(updated_at=old)
+        JobCheckpoint.objects.filter(name='reconcile_occupancy').update(last_run_at=timezone.now() - timedelta(hours=1))
+        Tenant.objects.filter(building=second, house_number='A1').update(number_of_people=5, updated_at=timezone.now())
+
+        output = self.reconcile('--incremental')
+        assert '1 with drifted counters' in output
+        assert f'building {second.pk}' in output
+        assert TotalTenants.objects.get(building=second).total_count == 8
+        assert Building.objects.get(pk=first.pk).available_houses == 4
+
+        self.reconcile()
+        assert Building.objects.get(pk=first.pk).available_houses == 2
+
+    def test_invalid_since(self):
+        with pytest.raises(CommandError):
+            self.reconcile('--since', 'yesterday')
@@ -0,0 +1,86 @@
+import sqlite3
+
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import transaction
+from django.http import HttpResponse
+from django.test import RequestFactory
+import pytest
+
+from Housing.management.commands.refresh_sqlite_replica import copy_sqlite_database
+from Housing.middleware import ReplicaReadMiddleware
+from Housing.models import Building
+from Housing.routers import ReplicaRouter, primary_reads, replica_reads
+
+class TestReplicaRouter:
+    @pytest.fixture(autouse=True)
+    def setup(self, settings):
+        settings.HOUSING_READ_REPLICAS = ['replica1']
+        self.router = ReplicaRouter()
+
+    def test_reads_go_to_the_replica_until_the_first_write(self):
+        assert self.router.db_for_read(Building) == 'default'
+        with replica_reads():
+            assert self.router.db_for_read(Building) == 'replica1'
+            with primary_reads():
+                assert self.router.db_for_read(Building) == 'default'
+            assert self.router.db_for_write(Building) == 'default'
+            assert self.router.db_for_read(Building) == 'default'
+
+    def test_related_reads_follow_the_instance(self):
+        building = Building(pk=1)
+        building._state.db = 'default'
+        with replica_reads():
+            assert self.router.db_for_read(Building, instance=building) == 'default'
+
+    def test_replicas_are_not_migrated(self):
+        assert self.router.allow_migrate('replica1', 'Housing') is False
+        assert self.router.allow_migrate('default', 'Housing') is None
+
+    @pytest.mark.django_db(transaction=True)
+    def test_reads_in_a_transaction_use_the_primary(self):
+        with replica_reads():
+            with transaction.atomic():
+                assert self.router.db_for_read(Building) == 'default'
+
+class TestReplicaReadMiddleware:
+    @pytest.fixture(autouse=True)
+    def setup(self, settings):
+        settings.HOUSING_READ_REPLICAS = ['replica1']
+        self.settings = settings
+
+    def respond(self, request, write=False):
+        router = ReplicaRouter()
+
+        def view(request):
+            if write:
+                router.db_for_write(Building)
+            return HttpResponse(router.db_for_read(Building))
+
+        return ReplicaReadMiddleware(view)(request)
+
+    def test_get_reads_from_replica(self):
+        response = self.respond(RequestFactory().get('/'))
+        assert response.content == b'replica1'
+        assert 'housing_read_primary' not in response.cookies
+
+    def test_writes_pin_the_client_to_the_primary(self):
+        factory = RequestFactory()
+        response = self.respond(factory.post('/'), write=True)
+        assert response.content == b'default'
+        assert response.cookies['housing_read_primary']['max-age'] == 5
+
+        factory.cookies['housing_read_primary'] = '1'
+        assert self.respond(factory.get('/')).content == b'default'
+
+    def test_not_used_without_replicas(self):
+        self.settings.HOUSING_READ_REPLICAS = []
+        with pytest.raises(MiddlewareNotUsed):
+            ReplicaReadMiddleware(lambda request: HttpResponse())
+
+def test_copy_sqlite_database(tmp_path):
+    source = sqlite3.connect(tmp_path / 'primary.sqlite3')
+    source.execute('CREATE TABLE t (x)')
+    source.executemany('INSERT INTO t VALUES (?)', [(n,) for n in range(100)])
+    source.commit()
+    copy_sqlite_database(source, str(tmp_path / 'replica.sqlite3'), pages=1)
+    assert sqlite3.connect(tmp_path / 'replica.sqlite3').execute('SELECT COUNT(*) FROM t').fetchone() == (100,)
@@ -0,0 +1,79 @@
+import logging
+
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing.checks import check_duplicate_house_numbers
+from Housing.models import Building, Tenant
+
+@pytest.mark.django_db
+class TestTenantLookup:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        self.client = Client()
+        self.first = Building.objects.create(owner='John Doe', location='Sample Location', total_number_of_houses=5, available_houses=5)
+        self.second = Building.objects.create(owner='Jane Doe', location='Other Location', total_number_of_houses=5, available_houses=5)
+        self.tenants = {
+            (building.pk, number): Tenant.objects.create(name='Jane', house_number=number, phone_number='0712345678',
+                                                         building=building, number_of_rooms=1, number_of_people=1)
+            for building in (self.first, self.second) for number in ('A1', 'A2')
+        }
+
+    def test_house_number_is_unique_per_building(self):
+        with pytest.raises(IntegrityError):
+            Tenant.objects.create(name='Joe', house_number='A1', phone_number='0712345678',
+                                  building=self.first, number_of_rooms=1, number_of_people=1)
+
+    def test_batch_lookup_uses_one_query(self):
+        url = reverse('lookup-building-tenants', kwargs={'building_id': self.second.pk})
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, {'house_number': 'A1', 'house_numbers': 'A2,B9'})
+        assert response.status_code == 200
+        assert response.json()['tenants'] == {
+            'A1': self.tenants[(self.second.pk, 'A1')].pk,
+            'A2': self.tenants[(self.second.pk, 'A2')].pk,
+        }
+        assert response.json()['missing'] == ['B9']
+        assert len(ctx.captured_queries) == 1
+
+    def test_unscoped_lookup_reports_ambiguous_house_number(self):
+        response = self.client.get(reverse('get-tenant-id'), {'house_number': 'A1'})
+        assert response.status_code == 409
+        response = self.client.get(reverse('get-tenant-id'), {'house_number': 'A1', 'building_id': self.first.pk})
+        assert response.json() == {'tenant_id': self.tenants[(self.first.pk, 'A1')].pk}
+        assert self.client.get(reverse('get-tenant-id'), {'house_number': 'A1', 'building_id': 'x'}).status_code == 400
+
+@pytest.mark.django_db(transaction=True)
+class TestDuplicateHouseNumbers:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.db.migrations.executor import MigrationExecutor
+
+        self.executor = MigrationExecutor(connection)
+        self.before = [('Housing', '0010_alter_building_total_number_of_houses')]
+        self.executor.migrate(self.before)
+        yield
+        self.executor.loader.build_graph()
+        self.executor.migrate(self.executor.loader.graph.leaf_nodes())
+
+    def test_check_reports_duplicates_the_migration_renumbers(self, caplog):
+        apps = self.executor.loader.project_state(self.before).apps
+        OldBuilding, OldTenant = apps.get_model('Housing', 'Building'), apps.get_model('Housing', 'Tenant')
+        building = OldBuilding.objects.create(owner='John Doe', location='Sample Location', total_number_of_houses=5, available_houses=3)
+        _, second = (OldTenant.objects.create(name='Jane', house_number='A1', phone_number='0712345678', building_id=building.pk,
+                                              number_of_rooms=1, number_of_people=1) for _ in range(2))
+
+        warnings = check_duplicate_house_numbers(None, databases=['default'])
+        assert [warning.id for warning in warnings] == ['Housing.W001']
+        assert "2 tenants of building %d share house number 'A1'" % building.pk in warnings[0].msg
+
+        self.executor.loader.build_graph()
+        with caplog.at_level(logging.WARNING):
+            self.executor.migrate([('Housing', '0011_tenant_unique_house_number_per_building')])
+        assert list(OldTenant.objects.order_by('pk').values_list('house_number', flat=True)) == ['A1', f'A1-{second.pk}']
+        assert f"renumbered to 'A1-{second.pk}'" in caplog.text
+        assert check_duplicate_house_numbers(None, databases=['default']) == []
@@ -0,0 +1,46 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.urls import reverse
+import pytest
+
+from Housing.models import Building, Tenant
+
+@pytest.mark.django_db
+class TestTenantSearch:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        self.client = Client()
+        self.building = Building.objects.create(owner='John Doe', location='Sample Location', total_number_of_houses=5, available_houses=5)
+        self.jane = Tenant.objects.create(name='Jane Wanjiku', house_number='A1', phone_number='0712345678',
+                                          building=self.building, number_of_rooms=1, number_of_people=1)
+        self.joe = Tenant.objects.create(name='Joe Otieno', house_number='B7', phone_number='0798765432',
+                                         building=self.building, number_of_rooms=1, number_of_people=1)
+
+    def search(self, **params):
+        response = self.client.get(reverse('search-tenants'), params)
+        assert response.status_code == 200
+        return [row['id'] for row in response.json()['results']]
+
+    def test_prefix_search_on_name_phone_and_house_number(self):
+        assert self.search(q='wanj') == [self.jane.pk]
+        assert self.search(q='0798') == [self.joe.pk]
+        assert self.search(q='b7') == [self.joe.pk]
+        assert self.search(q='jo OR') == []
+
+    def test_index_follows_updates_and_deletes(self):
+        self.jane.name = 'Janet Achieng'
+        self.jane.save()
+        assert self.search(q='wanj') == []
+        assert self.search(q='achi') == [self.jane.pk]
+
+        self.joe.delete()
+        assert self.search(q='otieno') == []
+
+    def test_rebuild_command_and_pagination(self):
+        call_command('rebuild_tenant_search', stdout=StringIO())
+        response = self.client.get(reverse('search-tenants'), {'q': '07', 'page': 1})
+        assert response.json()['has_next'] is False
+        assert len(response.json()['results']) == 2
@@ -0,0 +1,152 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+import pytest
+
+from Housing import services, units
+from Housing.datagen import generate_dataset
+from Housing.models import Building, Tenant, Unit
+
+@pytest.mark.django_db
+class TestUnitInventory:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.test import Client
+
+        cache.clear()
+        self.client = Client()
+        self.building = Building.objects.create(owner='John Doe', location='Kilimani', total_number_of_houses=4, available_houses=4)
+
+    def add_tenant(self, house_number, building=None):
+        return Tenant.objects.create(name='Jane', house_number=house_number, phone_number='0712345678',
+                                     building=building or self.building, number_of_rooms=1, number_of_people=1)
+
+    def inventory(self, building=None):
+        return list(Unit.objects.filter(building=building or self.building).order_by('position').values_list('number', 'tenant_id'))
+
+    def test_units_follow_house_count(self):
+        assert self.inventory() == [('1', None), ('2', None), ('3', None), ('4', None)]
+        tenant = self.add_tenant('4')
+
+        self.building.refresh_from_db()
+        self.building.total_number_of_houses, self.building.available_houses = 6, 5
+        self.building.save()
+        assert [number for number, _ in self.inventory()] == ['1', '2', '3', '4', '5', '6']
+
+        self.building.total_number_of_houses, self.building.available_houses = 2, 1
+        self.building.save()
+        # The occupied unit stays until its tenant leaves.
+        assert self.inventory() == [('1', None), ('2', None), ('4', tenant.pk)]
+
+    def test_tenants_claim_and_release_units(self):
+        first = self.add_tenant('1')
+        assert units.next_free_unit(self.building.pk) == '2'
+
+        stray = self.add_tenant('A1')
+        assert self.inventory() == [('1', first.pk), ('A1', stray.pk), ('3', None), ('4', None)]
+
+        first.house_number = '4'
+        first.save()
+        assert self.inventory() == [('1', None), ('A1', stray.pk), ('3', None), ('4', first.pk)]
+
+        first.delete()
+        assert list(units.vacant_units(self.building.pk).values_list('number', flat=True)) == ['1', '3', '4']
+
+    def test_claim_is_exclusive(self):
+        first, second = self.add_tenant('3'), self.add_tenant('4')
+        Unit.objects.filter(building=self.building).update(tenant=None)
+        # Two sign-ups racing for house 2: only the first claim matches the vacant unit.
+        first.house_number = second.house_number = '2'
+        assert units.claim_unit(first)
+        assert not units.claim_unit(second)
+        assert Unit.objects.get(building=self.building, number='2').tenant_id == first.pk
+
+    def test_lookups_use_the_vacancy_index(self):
+        self.add_tenant('1')
+        plan = units.vacant_units(self.building.pk).values_list('number', flat=True)[:1].explain()
+        if connection.vendor == 'sqlite':
+            assert 'unit_vacancy_idx' in plan
+        with CaptureQueriesContext(connection) as ctx:
+            units.next_free_unit(self.building.pk)
+        assert len(ctx.captured_queries) == 1
+
+    def test_bulk_paths_keep_units_in_sync(self):
+        generate_dataset(5, houses_per_building=6, occupancy=0.5, seed=3)
+        for building in Building.objects.exclude(pk=self.building.pk):
+            assert Unit.objects.filter(building=building).count() == building.total_number_of_houses
+            assert Unit.objects.filter(building=building, tenant__isnull=True).count() == building.available_houses
+        assert not Tenant.objects.filter(units__isnull=True).exists()
+
+        tenant = Tenant.objects.exclude(building=self.building).first()
+        services.move_tenants([tenant.pk], self.building.pk)
+        assert Unit.objects.get(tenant=tenant).building_id == self.building.pk
+        services.move_out_tenants([tenant.pk])
+        assert self.inventory() == [('1', None), ('2', None), ('3', None), ('4', None)]
+
+    def test_endpoints(self):
+        tenant = self.add_tenant('1')
+        response = self.client.get(reverse('building-vacancies', kwargs={'building_id': self.building.pk}))
+        assert response.json() == {'building_id': self.building.pk, 'next_free': '2', 'vacancies': ['2', '3', '4'], 'next_cursor': None}
+
+        response = self.client.get(reverse('building-unit', kwargs={'building_id': self.building.pk, 'number': '1'}))
+        assert response.json() == {'number': '1', 'position': 1, 'tenant_id': tenant.pk, 'vacant': False}
+        assert self.client.get(reverse('building-unit', kwargs={'building_id': self.building.pk, 'number': '9'})).status_code == 404
+
+        response = self.client.get(reverse('add-tenant', kwargs={'building_id': self.building.pk}))
+        assert response.context['form'].initial['house_number'] == '2'
+        response = self.client.post(reverse('add-tenant', kwargs={'building_id': self.building.pk}), {
+            'name': 'Joe', 'phone_number': '0712345678', 'house_number': '1', 'number_of_rooms': 1, 'number_of_people': 1,
+        })
+        assert 'House number 1 is occupied.' in response.context['form'].errors['house_number']
+
+    def test_full_building_is_not_reported_as_occupied(self):
+        for number in ('1', '2', '3', '4'):
+            self.add_tenant(number)
+        data = {'name': 'Joe', 'phone_number': '0712345678', 'house_number': '9', 'number_of_rooms': 1, 'number_of_people': 1}
+        response = self.client.post(reverse('add-tenant', kwargs={'building_id': self.building.pk}), data)
+        assert response.context['form'].non_field_errors() == ['The building is full.']
+        assert 'The building is full.' in response.content.decode()
+
+        # Counters that still show a free house don't hide a missing unit either.
+        Building.objects.filter(pk=self.building.pk).update(available_houses=1)
+        with pytest.raises(units.NoVacantUnit):
+            self.add_tenant('9')
+        response = self.client.post(reverse('add-tenant', kwargs={'building_id': self.building.pk}), data)
+        assert response.context['form'].non_field_errors() == ['The building is full.']
+        assert not response.context['form'].errors.get('house_number')
+        assert Tenant.objects.filter(building=self.building).count() == 4
+
+@pytest.mark.django_db(transaction=True)
+class TestUnitMigration:
+    @pytest.fixture(autouse=True)
+    def setup(self):
+        from django.db.migrations.executor import MigrationExecutor
+
+        self.executor = MigrationExecutor(connection)
+        self.executor.migrate([('Housing', '0016_occupancy_summary')])
+        yield
+        self.executor.loader.build_graph()
+        self.executor.migrate(self.executor.loader.graph.leaf_nodes())
+
+    def test_oversubscribed_building_gets_a_unit_for_every_tenant(self):
+        apps = self.executor.loader.project_state([('Housing', '0016_occupancy_summary')]).apps
+        OldBuilding, OldTenant = apps.get_model('Housing', 'Building'), apps.get_model('Housing', 'Tenant')
+        building = OldBuilding.objects.create(owner='John Doe', location='Kilimani', total_number_of_houses=2, available_houses=0)
+        for house_number in ('1', 'A', 'B'):
+            OldTenant.objects.create(name='Jane', house_number=house_number, phone_number='0712345678',
+                                     building_id=building.pk, number_of_rooms=1, number_of_people=1)
+
+        self.executor.loader.build_graph()
+        self.executor.migrate([('Housing', '0017_unit')])
+        OldUnit = self.executor.loader.project_state([('Housing', '0017_unit')]).apps.get_model('Housing', 'Unit')
+        tenants = dict(OldTenant.objects.values_list('house_number', 'pk'))
+        assert list(OldUnit.objects.order_by('position').values_list('position', 'number', 'tenant_id')) == [
+            (1, '1', tenants['1']), (2, 'A', tenants['A']), (3, 'B', tenants['B'])]
+
+        # The tenants past the house count can be saved again.
+        self.executor.loader.build_graph()
+        self.executor.migrate(self.executor.loader.graph.leaf_nodes())
+        tenant = Tenant.objects.get(pk=tenants['B'])
+        tenant.number_of_people = 2
+        tenant.save()